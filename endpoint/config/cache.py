@@ -1,5 +1,28 @@
+import asyncio
+import hashlib
+import httpx
+import logging
+import time
+import uuid
+from functools import wraps
+from inspect import Parameter, Signature, isawaitable, iscoroutinefunction
+from typing import Any, Awaitable, Callable, Type
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.dependencies.utils import get_typed_return_annotation, get_typed_signature
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.coder import Coder
+from fastapi_cache.types import Backend, KeyBuilder
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
 from endpoint.config import get_config
 
+logger = logging.getLogger(__name__)
+
 
 CHARTS_CACHE_TIMEOUT = int(get_config("CHARTS_CACHE_TIMEOUT"))
 
@@ -17,3 +40,461 @@ DB_CACHE_TIMEOUT = int(get_config("DB_CACHE_TIMEOUT"))  # database calls cache
 DAILY_CACHE_TIMEOUT = int(get_config("DAILY_CACHE_TIMEOUT"))
 
 LONG_CACHE_TIMEOUT = int(get_config("LONG_CACHE_TIMEOUT"))
+
+
+# RESPONSE CACHE
+
+# "memory" ( per worker ) or "redis" ( shared by all workers, needs the redis package )
+CACHE_BACKEND = str(get_config("CACHE_BACKEND")).lower()
+CACHE_REDIS_URL = get_config("CACHE_REDIS_URL")
+# max seconds a worker waits for another one computing the same cache key
+CACHE_LOCK_TIMEOUT = int(get_config("CACHE_LOCK_TIMEOUT"))
+# seconds an expired response of a stale-while-revalidate route is still served
+CACHE_STALE_TIMEOUT = int(get_config("CACHE_STALE_TIMEOUT"))
+# routes ( path + query ) precomputed at startup and every CACHE_WARMUP_INTERVAL seconds
+CACHE_WARMUP_ROUTES = get_config("CACHE_WARMUP_ROUTES")
+CACHE_WARMUP_INTERVAL = int(get_config("CACHE_WARMUP_INTERVAL"))
+
+_BACKEND: Backend | None = None
+
+
+def get_cache_backend() -> Backend:
+    """Response cache backend shared by all apps ( and by all workers when using redis )"""
+    global _BACKEND
+    if _BACKEND is None:
+        if CACHE_BACKEND == "redis":
+            try:
+                from redis import asyncio as aioredis
+                from fastapi_cache.backends.redis import RedisBackend
+            except ImportError as e:
+                # each worker would compute its own responses
+                raise RuntimeError(
+                    " CACHE_BACKEND is redis but the redis package is not installed"
+                ) from e
+            _BACKEND = RedisBackend(aioredis.from_url(CACHE_REDIS_URL))
+        elif CACHE_BACKEND == "memory":
+            _BACKEND = InMemoryBackend()
+        else:
+            raise ValueError(
+                f" Unknown CACHE_BACKEND {CACHE_BACKEND} ( memory or redis )"
+            )
+    return _BACKEND
+
+
+def init_cache(prefix: str = ""):
+    """Initialize the response cache ( first app initialized sets the prefix )"""
+    FastAPICache.init(
+        get_cache_backend(), prefix=prefix, key_builder=stable_key_builder
+    )
+
+
+def _stable_repr(item: Any) -> str:
+    """repr without memory addresses ( bound router builders ), equal in all workers"""
+    if type(item).__repr__ is object.__repr__:
+        attributes = sorted(
+            (k, repr(v)) for k, v in vars(item).items() if not k.startswith("_")
+        )
+        return f"{type(item).__qualname__}({attributes})"
+    return repr(item)
+
+
+def stable_key_builder(
+    func: Callable,
+    namespace: str = "",
+    *,
+    request: Request | None = None,
+    response: Response | None = None,
+    args: tuple = (),
+    kwargs: dict | None = None,
+) -> str:
+    """fastapi_cache default key builder, using stable identities for arguments"""
+    cache_key = hashlib.md5(
+        f"{func.__module__}:{func.__qualname__}:{[_stable_repr(x) for x in args]}:{kwargs or {}}".encode()
+    ).hexdigest()
+    return f"{namespace}:{cache_key}"
+
+
+# computations in progress in this worker { <cache key>: Task }
+_IN_FLIGHT: dict[str, asyncio.Task] = {}
+# response cache counters of this worker
+_STATS = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "remote_waits": 0}
+
+
+def cache_stats() -> dict:
+    """Response cache counters of this worker"""
+    return {**_STATS, "in_flight": len(_IN_FLIGHT)}
+
+
+async def _acquire_lock(backend: Backend, key: str) -> str | None:
+    """Lock the computation of a cache key across workers ( shared backends only )
+
+    Returns:
+        str | None: lock token or None when another worker holds the lock
+    """
+    if (redis := getattr(backend, "redis", None)) is None:
+        return "local"
+    token = uuid.uuid4().hex
+    try:
+        if await redis.set(f"{key}:lock", token, nx=True, px=CACHE_LOCK_TIMEOUT * 1000):
+            return token
+        return None
+    except Exception as e:
+        logger.warning(f" Unable to lock cache key {key}: {e}")
+        return "local"
+
+
+async def _release_lock(backend: Backend, key: str, token: str):
+    if (redis := getattr(backend, "redis", None)) is None or token == "local":
+        return
+    try:
+        # delete only our own lock
+        await redis.eval(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end",
+            1,
+            f"{key}:lock",
+            token,
+        )
+    except Exception as e:
+        logger.warning(f" Unable to unlock cache key {key}: {e}")
+
+
+async def _wait_for_value(backend: Backend, key: str) -> bytes | None:
+    """Wait for the worker holding the key lock to cache its value"""
+    redis = backend.redis
+    deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+    delay = 0.05
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1)
+        if (value := await backend.get(key)) is not None:
+            return value
+        if not await redis.exists(f"{key}:lock"):
+            # finished ( or failed )
+            return await backend.get(key)
+    return None
+
+
+async def _compute_and_set(
+    backend: Backend,
+    key: str,
+    compute: Callable[[], Awaitable],
+    coder: Type[Coder],
+    expire: int | None,
+    return_type: Any,
+) -> tuple[Any, bytes]:
+    """Compute a cache key value, once across workers
+
+    Returns:
+        tuple[Any, bytes]: result and its encoded value
+    """
+    token = await _acquire_lock(backend, key)
+    if token is None:
+        # another worker is computing it
+        _STATS["remote_waits"] += 1
+        if (encoded := await _wait_for_value(backend, key)) is not None:
+            return coder.decode_as_type(encoded, type_=return_type), encoded
+
+    try:
+        result = await compute()
+        encoded = coder.encode(result)
+        try:
+            await backend.set(key, encoded, expire)
+        except Exception:
+            logger.warning(f" Error setting cache key {key} in backend", exc_info=True)
+        return result, encoded
+    finally:
+        if token is not None:
+            await _release_lock(backend, key, token)
+
+
+def _single_flight(key: str, factory: Callable[[], Awaitable]) -> asyncio.Task:
+    """Task computing a cache key, shared by all concurrent requests of this worker
+
+    The task is not bound to any request: it finishes ( and caches its value ) even when
+    the requests waiting for it are cancelled.
+    """
+    if (task := _IN_FLIGHT.get(key)) is not None:
+        _STATS["coalesced"] += 1
+        return task
+
+    _STATS["misses"] += 1
+    task = _IN_FLIGHT[key] = asyncio.ensure_future(factory())
+
+    def _done(task: asyncio.Task):
+        _IN_FLIGHT.pop(key, None)
+        # mark the exception as retrieved ( may have no waiters left )
+        if not task.cancelled():
+            task.exception()
+
+    task.add_done_callback(_done)
+    return task
+
+
+def _locate_param(
+    signature: Signature, dep: Parameter, to_inject: list[Parameter]
+) -> Parameter:
+    """Existing parameter of the same type or dep ( to be injected )"""
+    param = next(
+        (p for p in signature.parameters.values() if p.annotation is dep.annotation),
+        None,
+    )
+    if param is None:
+        to_inject.append(dep)
+        param = dep
+    return param
+
+
+class uncached_result(Exception):
+    """Raised by a cached route to return a result without caching it ( i.e. partial results )
+
+    All requests awaiting the computation get the result and headers, uncached.
+    """
+
+    def __init__(self, result: Any, headers: dict[str, str] | None = None):
+        super().__init__("uncached result")
+        self.result = result
+        self.headers = headers or {}
+
+
+def _uncached(e: uncached_result, response: Response | None) -> Any:
+    if response:
+        response.headers.update({"Cache-Control": "no-store", **e.headers})
+    return e.result
+
+
+def _uncacheable(request: Request | None) -> bool:
+    if not FastAPICache.get_enable():
+        return True
+    if request is None:
+        return False
+    if request.method != "GET":
+        return True
+    return request.headers.get("Cache-Control") == "no-store"
+
+
+def cache(
+    expire: int | None = None,
+    coder: Type[Coder] | None = None,
+    key_builder: KeyBuilder | None = None,
+    namespace: str = "",
+    stale: int | None = None,
+):
+    """fastapi_cache cache decorator with single-flight computation
+
+    Concurrent requests of a missing ( or expired ) key await one computation: in this
+    worker through a shared task and, with a shared backend, across workers through a key lock.
+
+    Args:
+        stale (int | None, optional): stale-while-revalidate seconds. Expired values are
+            kept this long more, and served while a background task refreshes them.
+    """
+    injected_request = Parameter(
+        name="__fastapi_cache_request", annotation=Request, kind=Parameter.KEYWORD_ONLY
+    )
+    injected_response = Parameter(
+        name="__fastapi_cache_response",
+        annotation=Response,
+        kind=Parameter.KEYWORD_ONLY,
+    )
+
+    def wrapper(func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+        signature = get_typed_signature(func)
+        to_inject: list[Parameter] = []
+        request_param = _locate_param(signature, injected_request, to_inject)
+        response_param = _locate_param(signature, injected_response, to_inject)
+        return_type = get_typed_return_annotation(func)
+
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            copy_kwargs = kwargs.copy()
+            request: Request | None = copy_kwargs.pop(request_param.name, None)
+            response: Response | None = copy_kwargs.pop(response_param.name, None)
+
+            async def compute():
+                call_kwargs = kwargs.copy()
+                # do not pass injected parameters to the route function
+                call_kwargs.pop(injected_request.name, None)
+                call_kwargs.pop(injected_response.name, None)
+                if iscoroutinefunction(func):
+                    return await func(*args, **call_kwargs)
+                return await run_in_threadpool(func, *args, **call_kwargs)
+
+            if _uncacheable(request):
+                try:
+                    return await compute()
+                except uncached_result as e:
+                    return _uncached(e, response)
+
+            _coder = coder or FastAPICache.get_coder()
+            _expire = expire or FastAPICache.get_expire()
+            _stale = stale or 0
+            backend = FastAPICache.get_backend()
+            cache_status_header = FastAPICache.get_cache_status_header()
+            cache_key = (key_builder or FastAPICache.get_key_builder())(
+                func,
+                f"{FastAPICache.get_prefix()}:{namespace}",
+                request=request,
+                response=response,
+                args=args,
+                kwargs=copy_kwargs,
+            )
+            if isawaitable(cache_key):
+                cache_key = await cache_key
+
+            ttl, cached = 0, None
+            if request is None or request.headers.get("Cache-Control") != "no-cache":
+                try:
+                    ttl, cached = await backend.get_with_ttl(cache_key)
+                except Exception:
+                    logger.warning(
+                        f" Error retrieving cache key {cache_key} from backend",
+                        exc_info=True,
+                    )
+
+            def refresh() -> asyncio.Task:
+                # stale values are kept in the backend past their expiration
+                return _single_flight(
+                    cache_key,
+                    lambda: _compute_and_set(
+                        backend,
+                        cache_key,
+                        compute,
+                        _coder,
+                        _expire + _stale if _expire else None,
+                        return_type,
+                    ),
+                )
+
+            if cached is None:
+                # cache miss: compute once
+                try:
+                    result, encoded = await asyncio.shield(refresh())
+                except uncached_result as e:
+                    if response:
+                        response.headers[cache_status_header] = "MISS"
+                    return _uncached(e, response)
+                if response:
+                    response.headers.update(
+                        {
+                            "Cache-Control": f"max-age={_expire}",
+                            "ETag": _etag(encoded),
+                            cache_status_header: "MISS",
+                        }
+                    )
+                return result
+
+            if _stale and ttl <= _stale:
+                # expired: serve it while refreshing in the background
+                _STATS["stale_hits"] += 1
+                refresh()
+                max_age, status = 0, "STALE"
+            else:
+                _STATS["hits"] += 1
+                max_age, status = ttl - _stale, "HIT"
+
+            if response:
+                etag = _etag(cached)
+                response.headers.update(
+                    {
+                        "Cache-Control": f"max-age={max_age}",
+                        "ETag": etag,
+                        cache_status_header: status,
+                    }
+                )
+                if request and request.headers.get("if-none-match") == etag:
+                    response.status_code = HTTP_304_NOT_MODIFIED
+                    return response
+
+            return _coder.decode_as_type(cached, type_=return_type)
+
+        # injected parameters go before **kwargs
+        parameters = list(signature.parameters.values())
+        variadic = [p for p in parameters if p.kind is Parameter.VAR_KEYWORD]
+        inner.__signature__ = signature.replace(
+            parameters=[
+                *(p for p in parameters if p.kind is not Parameter.VAR_KEYWORD),
+                *to_inject,
+                *variadic,
+            ]
+        )
+        return inner
+
+    return wrapper
+
+
+def _etag(encoded: bytes) -> str:
+    """Weak ETag, equal in all workers"""
+    return f"W/{hashlib.md5(encoded).hexdigest()}"
+
+
+class CacheWarmer:
+    """Precompute cached routes at startup and every interval
+
+    Routes are requested through the app itself with a "no-cache" header, so their
+    values are recomputed and stored before expiring ( one route at a time ).
+    """
+
+    def __init__(
+        self,
+        app: FastAPI,
+        routes: list[str] | None = None,
+        interval: int | None = None,
+    ):
+        self.app = app
+        self.routes = _config_list(CACHE_WARMUP_ROUTES) if routes is None else routes
+        self.interval = interval or CACHE_WARMUP_INTERVAL
+        self._task: asyncio.Task | None = None
+
+    async def warm(self):
+        """Request all routes once"""
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.app),
+            base_url="http://cache-warmer",
+            timeout=None,
+        ) as client:
+            for route in self.routes:
+                _startime = time.monotonic()
+                try:
+                    response = await client.get(
+                        route, headers={"Cache-Control": "no-cache"}
+                    )
+                    if response.status_code >= 400:
+                        logger.warning(
+                            f" Cache warm-up of {route} returned {response.status_code}"
+                        )
+                    else:
+                        logger.debug(
+                            f" Cache warm-up of {route} took {time.monotonic()-_startime:,.2f} seconds"
+                        )
+                except Exception as e:
+                    logger.warning(f" Cache warm-up of {route} failed: {e}")
+
+    async def _run(self):
+        while True:
+            await self.warm()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.routes and self._task is None:
+            logger.info(
+                f" Warming up {len(self.routes)} cached routes every {self.interval} seconds"
+            )
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _config_list(value: list | str | None) -> list[str]:
+    """Config list ( yaml list or comma separated env var )"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [x.strip() for x in value.split(",") if x.strip()]
+    return list(value)
@@ -5,6 +5,11 @@ from starlette.types import ASGIApp, Scope, Receive, Send, Message
 from starlette.datastructures import MutableHeaders
 
 from endpoint.config.version import GIT_BRANCH, APP_VERSION, get_version_info
+from sources.common.database.common.db_executor import (
+    reset_request_concurrency,
+    set_request_concurrency,
+)
+from sources.common.general.memo import reset_request_memo, set_request_memo
 
 
 logger = logging.getLogger(__name__)
@@ -65,7 +70,15 @@ class BaseMiddleware:
             # return message
             return send(message)
 
-        await self.app(scope, receive, send_wrapper)
+        # limit the concurrent database calls this request can issue
+        _db_concurrency_token = set_request_concurrency()
+        # compute identical lookups of this request once
+        _memo_token = set_request_memo()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_request_memo(_memo_token)
+            reset_request_concurrency(_db_concurrency_token)
 
     def build_headers(self, start_time: Any | None = None) -> dict:
         headers = {}
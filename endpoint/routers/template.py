@@ -2,7 +2,7 @@ import re
 
 from fastapi import APIRouter, Response, status
 from fastapi.routing import APIRoute
-from fastapi_cache.decorator import cache
+from endpoint.config.cache import cache
 
 
 class router_builder_baseTemplate:
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import logging
+
+from sources.common.database.index_setup import (
+    index_advice_report,
+    setup_database_indexes,
+)
+from sources.common.general.enums import Chain
+from sources.mongo.bins.helpers import local_database_helper
+
+logging.basicConfig(
+    format="[%(asctime)s:%(levelname)s:%(name)s]:%(message)s",
+    datefmt="%Y/%m/%d %I:%M:%S",
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+
+
+async def main(
+    chains: list[Chain], report: bool, latest_status: bool, user_chains: bool
+):
+    # create and verify indexes
+    for db_name, collections in (await setup_database_indexes(chains=chains)).items():
+        for coll_name, missing in collections.items():
+            if missing:
+                logger.error(f" {db_name}.{coll_name} missing indexes: {missing}")
+        logger.info(f" {db_name} indexes verified")
+
+    if latest_status:
+        # rebuild the last status of each hypervisor
+        for chain in chains:
+            try:
+                await local_database_helper(network=chain).refresh_latest_status(
+                    full=True
+                )
+                logger.info(f" {chain.database_name} latest status rebuilt")
+            except Exception as e:
+                logger.error(
+                    f" Unable to rebuild {chain.database_name} latest status. error-> {e}"
+                )
+
+    if user_chains:
+        # rebuild the global user to chains index
+        for chain in chains:
+            try:
+                await local_database_helper(network=chain).refresh_user_chains(
+                    network=chain.database_name
+                )
+                logger.info(f" {chain.database_name} user chains rebuilt")
+            except Exception as e:
+                logger.error(
+                    f" Unable to rebuild {chain.database_name} user chains. error-> {e}"
+                )
+
+    if not report:
+        return
+
+    # index advice
+    for chain in chains:
+        for item in await index_advice_report(chain=chain):
+            if item["collscan"]:
+                logger.warning(
+                    f" {chain.database_name} {item['name']} on {item['collection']} is doing a COLLSCAN -> stages: {item['stages']}"
+                )
+            else:
+                logger.info(
+                    f" {chain.database_name} {item['name']} on {item['collection']} uses indexes {item['indexes']}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create and verify database indexes ( run once per deployment )"
+    )
+    parser.add_argument(
+        "--chains",
+        nargs="*",
+        default=[],
+        help="chain database names to setup. Defaults to all",
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="explain the hot aggregations and report the ones doing full collection scans",
+    )
+    parser.add_argument(
+        "--latest-status",
+        action="store_true",
+        help="rebuild the last status of each hypervisor ( latest_status collection )",
+    )
+    parser.add_argument(
+        "--user-chains",
+        action="store_true",
+        help="rebuild the chains and hypervisors of each user ( global user_chains collection )",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        main(
+            chains=[
+                chain
+                for chain in Chain
+                if not args.chains or chain.database_name in args.chains
+            ],
+            report=args.report,
+            latest_status=args.latest_status,
+            user_chains=args.user_chains,
+        )
+    )
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Awaitable, Callable
+
+from sources.mongo.bins.helpers import global_database_helper
+
+logger = logging.getLogger(__name__)
+
+# max seconds and chain queries spent closing the gap around a timestamp
+_FIRST_BLOCK_TIMEOUT = 15
+_FIRST_BLOCK_QUERIES = 100
+# seconds before retrying a failed database load
+_LOAD_RETRY_SECONDS = 60
+
+
+class BlockTimestampIndex:
+    """Sorted block <-> timestamp index of a chain
+
+    Known block/timestamp pairs come from the global database "blocks" collection,
+    subgraph _meta responses and previously resolved lookups. Lookups bisect the
+    index and only query the chain to close the gap between the two closest known blocks.
+    """
+
+    def __init__(self, network: str):
+        self.network = network
+        # blocks and their timestamps, sorted by block
+        self._blocks = array("q")
+        self._timestamps = array("q")
+        self._loaded = False
+        self._load_retry_at = 0.0
+        self._lock = asyncio.Lock()
+        # blocks added from on-chain queries ( not saved to database yet )
+        self._fetched = set()
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def add(self, block: int, timestamp: int):
+        """Add a known block/timestamp pair to the index"""
+        block, timestamp = int(block), int(timestamp)
+        idx = bisect_left(self._blocks, block)
+        if idx < len(self._blocks) and self._blocks[idx] == block:
+            return
+        self._blocks.insert(idx, block)
+        self._timestamps.insert(idx, timestamp)
+
+    def timestamp(self, block: int) -> int | None:
+        """Timestamp of a block, when known"""
+        idx = bisect_left(self._blocks, block)
+        if idx < len(self._blocks) and self._blocks[idx] == block:
+            return self._timestamps[idx]
+        return None
+
+    async def load(self):
+        """Load the known blocks of the global database ( once, retried after
+        _LOAD_RETRY_SECONDS when failed )
+        """
+        if self._loaded or time.monotonic() < self._load_retry_at:
+            return
+        async with self._lock:
+            if self._loaded or time.monotonic() < self._load_retry_at:
+                return
+            try:
+                # sorted: build the arrays in one pass, streaming the items
+                blocks, timestamps = array("q"), array("q")
+                async for item in global_database_helper().stream_items_from_database(
+                    collection_name="blocks",
+                    find={"network": self.network},
+                    projection={"_id": 0, "block": 1, "timestamp": 1},
+                    sort=[("block", 1)],
+                ):
+                    block = int(item["block"])
+                    if blocks and blocks[-1] >= block:
+                        continue
+                    blocks.append(block)
+                    timestamps.append(int(item["timestamp"]))
+            except Exception as e:
+                logger.error(
+                    f" Unable to load {self.network} blocks from database. Retrying in {_LOAD_RETRY_SECONDS} seconds. error-> {e}"
+                )
+                self._load_retry_at = time.monotonic() + _LOAD_RETRY_SECONDS
+                return
+
+            # pairs added while loading
+            known = list(zip(self._blocks, self._timestamps))
+            self._blocks, self._timestamps = blocks, timestamps
+            for block, timestamp in known:
+                self.add(block=block, timestamp=timestamp)
+            self._loaded = True
+
+    async def block_from_timestamp(
+        self,
+        timestamp: int,
+        get_block: Callable[[int | str], Awaitable],
+        inexact_mode: str = "before",
+        eq_timestamp_position: str = "first",
+    ) -> int:
+        """Block number of a timestamp
+
+        Args:
+            timestamp (int):
+            get_block (Callable[[int | str], Awaitable]): on-chain block data getter ( block number or 'latest' ), used to fill index gaps
+            inexact_mode (str): "before" or "after" -> when no block has the exact timestamp, choose the block before or after it
+            eq_timestamp_position (str): "first" or "last" block to choose when a timestamp corresponds to multiple blocks
+
+        Returns:
+            int: block number
+        """
+        if inexact_mode not in ("before", "after"):
+            raise ValueError(f" Inexact method chosen is not valid:->  {inexact_mode}")
+
+        await self.load()
+
+        result = await self._block_from_timestamp(
+            timestamp=timestamp,
+            get_block=get_block,
+            inexact_mode=inexact_mode,
+            eq_timestamp_position=eq_timestamp_position,
+        )
+
+        # persist blocks resolved on-chain for the next process
+        if result in self._fetched:
+            self._fetched.discard(result)
+            try:
+                await global_database_helper().set_block(
+                    network=self.network,
+                    block=result,
+                    timestamp=self.timestamp(result),
+                )
+            except Exception as e:
+                logger.debug(
+                    f" Unable to save {self.network} block {result}. error-> {e}"
+                )
+
+        return result
+
+    async def _block_from_timestamp(
+        self,
+        timestamp: int,
+        get_block: Callable[[int | str], Awaitable],
+        inexact_mode: str,
+        eq_timestamp_position: str,
+    ) -> int:
+        # first block with a timestamp greater or equal than timestamp
+        first_block = await self._first_block(
+            timestamp=timestamp, get_block=get_block, strict=False
+        )
+        if first_block is None:
+            # timestamp is after the chain head: the last block is the closest
+            return self._blocks[-1]
+
+        if self.timestamp(first_block) == timestamp:
+            # exact
+            if eq_timestamp_position == "last":
+                next_block = await self._first_block(
+                    timestamp=timestamp, get_block=get_block, strict=True
+                )
+                return (
+                    (next_block - 1) if next_block is not None else self._blocks[-1]
+                )
+            return first_block
+
+        if inexact_mode == "after" or first_block <= 1:
+            return first_block
+        return first_block - 1
+
+    async def _first_block(
+        self,
+        timestamp: int,
+        get_block: Callable[[int | str], Awaitable],
+        strict: bool,
+    ) -> int | None:
+        """First block with a timestamp greater ( strict ) or equal than timestamp
+
+            Gives up after _FIRST_BLOCK_TIMEOUT seconds or _FIRST_BLOCK_QUERIES chain queries,
+            returning the closest known block after the timestamp.
+
+        Returns:
+            int | None: None when the timestamp is after the chain head
+        """
+        bisect = bisect_right if strict else bisect_left
+        head_checked = False
+        iteration = 0
+        deadline = time.monotonic() + _FIRST_BLOCK_TIMEOUT
+        while True:
+            idx = bisect(self._timestamps, timestamp)
+
+            if (
+                iteration >= _FIRST_BLOCK_QUERIES or time.monotonic() > deadline
+            ) and 0 < idx < len(self._blocks):
+                # safe exit: an eternity to find the block
+                logger.warning(
+                    f" {self.network} block of timestamp {timestamp} not found after {iteration} queries. Using closest block {self._blocks[idx]}"
+                )
+                return self._blocks[idx]
+
+            if idx == len(self._blocks):
+                # no known block after timestamp: add the chain head
+                if head_checked:
+                    return None
+                await self._fetch(get_block, "latest")
+                head_checked = True
+                continue
+
+            if idx == 0:
+                # no known block before timestamp: add the first block
+                if self._blocks[0] <= 1:
+                    return self._blocks[0]
+                await self._fetch(get_block, 1)
+                continue
+
+            lo_block, hi_block = self._blocks[idx - 1], self._blocks[idx]
+            if hi_block - lo_block <= 1:
+                return hi_block
+
+            # close the gap: interpolate, alternating with bisection to bound the queries
+            lo_ts, hi_ts = self._timestamps[idx - 1], self._timestamps[idx]
+            if iteration % 2 == 0 and hi_ts > lo_ts:
+                block = lo_block + int(
+                    (timestamp - lo_ts) / (hi_ts - lo_ts) * (hi_block - lo_block)
+                )
+            else:
+                block = (lo_block + hi_block) // 2
+            await self._fetch(get_block, min(max(block, lo_block + 1), hi_block - 1))
+            iteration += 1
+
+    async def _fetch(
+        self, get_block: Callable[[int | str], Awaitable], block: int | str
+    ):
+        block_data = await get_block(block)
+        if block_data is None:
+            raise ValueError(f" Unable to get {self.network} block {block} data")
+        self.add(block=block_data.number, timestamp=block_data.timestamp)
+        self._fetched.add(block_data.number)
+
+
+# process-wide indexes { <network>: BlockTimestampIndex }
+_BLOCK_INDEXES: dict[str, BlockTimestampIndex] = {}
+
+
+def get_block_index(network: str) -> BlockTimestampIndex:
+    """Block/timestamp index of a network ( chain database name )"""
+    if network not in _BLOCK_INDEXES:
+        _BLOCK_INDEXES[network] = BlockTimestampIndex(network=network)
+    return _BLOCK_INDEXES[network]
@@ -1,7 +1,10 @@
 import logging
 import asyncio
 import sys
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
 
 from sources.subgraph.bins.enums import Chain, Protocol
 from pymongo import DESCENDING, ASCENDING
@@ -10,6 +13,17 @@ from sources.common.database.common.collections_common import db_collections_com
 
 logger = logging.getLogger(__name__)
 
+# min seconds between latest_status refreshes of a database ( triggered by reads )
+_LATEST_STATUS_REFRESH = 60
+# seconds of already merged status items merged again on each refresh
+_LATEST_STATUS_MARGIN = 120
+# last latest_status refresh of each database { (<mongo url>, <db name>): <monotonic time> }
+_LATEST_STATUS_REFRESHED: dict[tuple[str, str], float] = {}
+# latest_status refreshes running in background { (<mongo url>, <db name>): Task }
+_LATEST_STATUS_REFRESHING: dict[tuple[str, str], asyncio.Task] = {}
+# seconds of already merged user operations merged again on each user_chains refresh
+_USER_CHAINS_MARGIN = 120
+
 
 # web3 database related classes
 
@@ -29,6 +43,13 @@ class database_global(db_collections_common):
                 address:
                 price:
                 }
+    "user_chains":
+        item-> {id: <network>_<user address>
+                user: user address ( user_address or shadowed_user_address )
+                network:
+                hypervisors: hypervisor addresses with user operations
+                last_oid: last user operation merged
+                }
     """
 
     def __init__(
@@ -41,7 +62,10 @@ class database_global(db_collections_common):
             db_collections = {
                 "blocks": {
                     "mono_indexes": {"id": True, "network": False, "block": False},
-                    "multi_indexes": [],
+                    "multi_indexes": [
+                        [("network", ASCENDING), ("block", ASCENDING)],
+                        [("network", ASCENDING), ("timestamp", ASCENDING)],
+                    ],
                 },
                 "usd_prices": {
                     "mono_indexes": {
@@ -59,7 +83,7 @@ class database_global(db_collections_common):
                     ],
                 },
                 "current_usd_prices": {
-                    "mono_indexes": {"id": True, "address": False},
+                    "mono_indexes": {"id": True, "address": False, "network": False},
                     "multi_indexes": [
                         [
                             ("address", ASCENDING),
@@ -67,6 +91,12 @@ class database_global(db_collections_common):
                         ],
                     ],
                 },
+                "user_chains": {
+                    "mono_indexes": {"id": True, "user": False},
+                    "multi_indexes": [
+                        [("network", ASCENDING), ("last_oid", DESCENDING)],
+                    ],
+                },
                 "configuration": {
                     "mono_indexes": {"id": True},
                     "multi_indexes": [],
@@ -178,9 +208,11 @@ class database_global(db_collections_common):
         Returns:
             dict:
         """
-        return await self.query_items_from_database(
-            query=self.query_blocks_closest(network=network, block=block),
+        return await self._get_closest(
             collection_name="usd_prices",
+            field="block",
+            value=block,
+            key={"address": address, "network": network},
         )
 
     async def get_timestamp(
@@ -194,9 +226,11 @@ class database_global(db_collections_common):
         )
 
     async def get_closest_timestamp(self, network: str, block: int) -> dict:
-        return await self.query_items_from_database(
-            query=self.query_blocks_closest(network=network, block=block),
+        return await self._get_closest(
             collection_name="blocks",
+            field="block",
+            value=block,
+            key={"network": network},
         )
 
     async def get_block(
@@ -208,12 +242,55 @@ class database_global(db_collections_common):
             collection_name="blocks", find={"network": network, "timestamp": timestamp}
         )
 
+    async def get_user_networks(self, user_address: str) -> dict[str, list[str]]:
+        """Networks with user operations of the address
+
+        Returns:
+            dict[str, list[str]]: { <network>: <hypervisor addresses> }
+        """
+        return {
+            item["network"]: item["hypervisors"]
+            for item in await self.get_items_from_database(
+                collection_name="user_chains",
+                find={"user": user_address},
+                projection={"_id": 0, "network": 1, "hypervisors": 1},
+            )
+        }
+
+    async def get_user_chains_watermark(self, network: str) -> ObjectId | None:
+        """Last user operation merged into user_chains for the network ( None when not indexed )"""
+        last = await self.get_items_from_database(
+            collection_name="user_chains",
+            find={"network": network},
+            projection={"_id": 0, "last_oid": 1},
+            sort=[("last_oid", -1)],
+            limit=1,
+        )
+        return last[0]["last_oid"] if last else None
+
     async def get_closest_block(self, network: str, timestamp: int) -> dict:
-        return await self.query_items_from_database(
-            query=self.query_blocks_closest(network=network, timestamp=timestamp),
+        return await self._get_closest(
             collection_name="blocks",
+            field="timestamp",
+            value=timestamp,
+            key={"network": network},
         )
 
+    async def _get_closest(
+        self, collection_name: str, field: str, value: int, key: dict
+    ) -> list[dict]:
+        """Closest item to <value> in the query_blocks_closest output format
+
+        Returns:
+            list[dict]: [{"diff": <difference>, "doc": <item>}] or empty
+        """
+        item = (
+            await self.get_nearest_items(
+                collection_name=collection_name, field=field, value=value, keys=[key]
+            )
+        )[0]
+        return [{"diff": abs(item[field] - value), "doc": item}] if item else []
+
     async def get_all_block_timestamp(self, network: str) -> list:
         """get all blocks and timestamps from database
             sorted by block
@@ -354,6 +431,11 @@ class database_local(db_collections_common):
 
                 }
 
+    "latest_status":
+        item-> last "status" item of each hypervisor ( unique by address ), with
+                id: <status id> ( copied from the status item )
+                status_oid: <status _id>
+
     "user_status":
         item-> {id: <wallet_address>_<block_number>
                 network:
@@ -399,7 +481,10 @@ class database_local(db_collections_common):
                         "address": False,
                         "timestamp": False,
                     },
-                    "multi_indexes": [],
+                    "multi_indexes": [
+                        [("address", ASCENDING), ("block", DESCENDING)],
+                        [("address", ASCENDING), ("timestamp", DESCENDING)],
+                    ],
                 },
                 "user_operations": {
                     "mono_indexes": {
@@ -512,6 +597,16 @@ class database_local(db_collections_common):
                     },
                     "multi_indexes": [],
                 },
+                # last status of each hypervisor ( see refresh_latest_status )
+                "latest_status": {
+                    "mono_indexes": {
+                        "id": True,
+                        "address": True,
+                        "dex": False,
+                        "status_oid": False,
+                    },
+                    "multi_indexes": [],
+                },
                 "latest_reward_snapshots": {
                     "mono_indexes": {
                         "id": True,
@@ -833,6 +928,33 @@ class database_local(db_collections_common):
             ),
         )
 
+    async def refresh_user_chains(
+        self,
+        network: str,
+        since: ObjectId | None = None,
+        global_db_name: str = "global",
+    ):
+        """Merge the user operations inserted after <since> ( all when None ) into the
+            global user_chains index
+
+        Args:
+            network (str): network of this database
+            since (ObjectId | None, optional): last user operation already merged. Defaults to None.
+            global_db_name (str, optional): global database name. Defaults to "global".
+        """
+        if since:
+            # items inserted by other processes at the same time may have lower ids
+            since = ObjectId.from_datetime(
+                since.generation_time - timedelta(seconds=_USER_CHAINS_MARGIN)
+            )
+        await self.get_items_from_database(
+            collection_name="user_operations",
+            aggregate=self.query_user_chains_merge(
+                network=network, global_db_name=global_db_name, since=since
+            ),
+            allowDiskUse=True,
+        )
+
     # status
 
     async def set_status(self, data: dict):
@@ -937,6 +1059,204 @@ class database_local(db_collections_common):
             ),
         )
 
+    # latest status
+
+    async def refresh_latest_status(self, full: bool = False) -> bool:
+        """Merge the status items inserted since the last refresh into latest_status
+
+        Args:
+            full (bool, optional): rebuild from all status items ( setup_database.py --latest-status ).
+                Otherwise, a latest_status not built yet is left as is. Defaults to False.
+
+        Returns:
+            bool: latest_status has been refreshed
+        """
+        since = None
+        if not full:
+            last = await self.get_items_from_database(
+                collection_name="latest_status",
+                find={},
+                projection={"status_oid": 1},
+                sort=[("status_oid", -1)],
+                limit=1,
+            )
+            if not last:
+                return False
+            # items inserted by other processes at the same time may have lower ids
+            since = ObjectId.from_datetime(
+                last[0]["status_oid"].generation_time
+                - timedelta(seconds=_LATEST_STATUS_MARGIN)
+            )
+
+        await self.get_items_from_database(
+            collection_name="status",
+            aggregate=self.query_latest_status_merge(since=since),
+            allowDiskUse=True,
+        )
+        return True
+
+    def _refresh_latest_status_background(self):
+        """Refresh latest_status in a background task, never awaited by reads
+        ( once every _LATEST_STATUS_REFRESH seconds per database at most )
+        """
+        key = (self._db_mongo_url, self._db_name)
+        if key in _LATEST_STATUS_REFRESHING or time.monotonic() - (
+            _LATEST_STATUS_REFRESHED.get(key, 0)
+        ) < _LATEST_STATUS_REFRESH:
+            return
+        _LATEST_STATUS_REFRESHED[key] = time.monotonic()
+
+        async def _refresh():
+            try:
+                await self.refresh_latest_status()
+            except Exception as e:
+                logger.error(
+                    f" Unable to refresh {self._db_name} latest status. error-> {e}"
+                )
+
+        task = _LATEST_STATUS_REFRESHING[key] = asyncio.create_task(_refresh())
+        task.add_done_callback(lambda _: _LATEST_STATUS_REFRESHING.pop(key, None))
+
+    async def get_latest_status(
+        self,
+        hypervisor_addresses: list[str] | None = None,
+        protocol: Protocol | None = None,
+        block: int | None = None,
+        timestamp: int | None = None,
+    ) -> dict[str, dict]:
+        """Last status of each hypervisor, at or before a block or timestamp when supplied
+
+            Uses the latest_status collection and, for hypervisors missing from it or with a
+            newer status than requested, one indexed lookup per hypervisor ( status is never
+            fully sorted ).
+            All returned status documents have the status collection shape, without _id.
+
+        Args:
+            hypervisor_addresses (list[str] | None, optional): filter by hypervisor addresses.
+            protocol (Protocol | None, optional): filter by protocol ( when no addresses are supplied ).
+            block (int | None, optional): max block.
+            timestamp (int | None, optional): max timestamp ( when no block is supplied ).
+
+        Returns:
+            dict[str, dict]: { <hypervisor address>: <status> }
+        """
+        self._refresh_latest_status_background()
+
+        find = {}
+        if hypervisor_addresses:
+            find["address"] = {"$in": hypervisor_addresses}
+        elif protocol:
+            find["dex"] = protocol.database_name
+
+        result = {
+            item["address"]: item
+            for item in await self.get_items_from_database(
+                collection_name="latest_status",
+                find=find,
+                projection={"_id": 0, "status_oid": 0},
+            )
+        }
+
+        field, value = ("block", block) if block else ("timestamp", timestamp)
+
+        if not result:
+            # latest_status not built yet ( or not supported by the server )
+            if value:
+                find[field] = {"$lte": value}
+            return {
+                item["item"]["address"]: item["item"]
+                for item in await self.get_items_from_database(
+                    collection_name="status",
+                    aggregate=[
+                        {"$match": find},
+                        {"$sort": {"address": 1, "block": -1}},
+                        {"$group": {"_id": "$address", "item": {"$first": "$$ROOT"}}},
+                        {"$project": {"item._id": 0}},
+                    ],
+                    allowDiskUse=True,
+                )
+            }
+
+        # hypervisors not merged into latest_status yet or newer than requested
+        outdated = [
+            address
+            for address in hypervisor_addresses or []
+            if address not in result
+        ]
+        if value:
+            outdated += [
+                address for address, item in result.items() if item[field] > value
+            ]
+        if not outdated:
+            return result
+
+        find = {field: {"$lte": value}} if value else {}
+        for address, items in zip(
+            outdated,
+            await asyncio.gather(
+                *[
+                    self.get_items_from_database(
+                        collection_name="status",
+                        find={"address": address, **find},
+                        projection={"_id": 0},
+                        sort=[("block", -1)],
+                        limit=1,
+                    )
+                    for address in outdated
+                ]
+            ),
+        ):
+            if items:
+                result[address] = items[0]
+            else:
+                # no status ( before the requested block or timestamp )
+                result.pop(address, None)
+
+        return result
+
+    async def get_first_status(
+        self,
+        hypervisor_addresses: list[str],
+        block_ini: int | None = None,
+        block_end: int | None = None,
+        timestamp_ini: int | None = None,
+        timestamp_end: int | None = None,
+    ) -> dict[str, dict]:
+        """First status of each hypervisor within a block or timestamp range
+            ( one indexed lookup per hypervisor )
+
+        Returns:
+            dict[str, dict]: { <hypervisor address>: <status> }
+        """
+        if block_ini or block_end:
+            field, ini, end = "block", block_ini, block_end
+        else:
+            field, ini, end = "timestamp", timestamp_ini, timestamp_end
+        find = {}
+        if ini:
+            find.setdefault(field, {})["$gte"] = ini
+        if end:
+            find.setdefault(field, {})["$lte"] = end
+
+        result = {}
+        for address, items in zip(
+            hypervisor_addresses,
+            await asyncio.gather(
+                *[
+                    self.get_items_from_database(
+                        collection_name="status",
+                        find={"address": address, **find},
+                        sort=[("block", 1)],
+                        limit=1,
+                    )
+                    for address in hypervisor_addresses
+                ]
+            ),
+        ):
+            if items:
+                result[address] = items[0]
+        return result
+
     # user status
 
     async def set_user_status(self, data: dict):
@@ -1284,6 +1604,109 @@ class database_local(db_collections_common):
             {"$sort": {"block": -1}},
         ]
 
+    @staticmethod
+    def query_user_chains_merge(
+        network: str, global_db_name: str, since: ObjectId | None = None
+    ) -> list[dict]:
+        """Merge the hypervisors of each user ( user_address and shadowed_user_address )
+            into the global user_chains index ( using only user operations inserted after <since> when supplied )
+        """
+        query = [
+            {
+                "$project": {
+                    "hypervisor_address": "$hypervisor_address",
+                    "user": ["$user_address", "$shadowed_user_address"],
+                }
+            },
+            {"$unwind": "$user"},
+            {"$match": {"user": {"$type": "string"}}},
+            {
+                "$group": {
+                    "_id": "$user",
+                    "hypervisors": {"$addToSet": "$hypervisor_address"},
+                    "last_oid": {"$max": "$_id"},
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "id": {"$concat": [network, "_", "$_id"]},
+                    "user": "$_id",
+                    "network": {"$literal": network},
+                    "hypervisors": "$hypervisors",
+                    "last_oid": "$last_oid",
+                }
+            },
+            {
+                "$merge": {
+                    "into": {"db": global_db_name, "coll": "user_chains"},
+                    "on": "id",
+                    "whenMatched": [
+                        {
+                            "$set": {
+                                "hypervisors": {
+                                    "$setUnion": ["$hypervisors", "$$new.hypervisors"]
+                                },
+                                "last_oid": {"$max": ["$last_oid", "$$new.last_oid"]},
+                            }
+                        }
+                    ],
+                    "whenNotMatched": "insert",
+                }
+            },
+        ]
+        if since:
+            query.insert(0, {"$match": {"_id": {"$gt": since}}})
+        return query
+
+    @staticmethod
+    def query_latest_status_merge(since: ObjectId | None = None) -> list[dict]:
+        """Merge the last status of each hypervisor into latest_status, keyed by address
+            and keeping the highest block ( using only status inserted after <since> when supplied )
+        """
+        query = [
+            {"$sort": {"address": 1, "block": -1}},
+            {"$group": {"_id": "$address", "item": {"$first": "$$ROOT"}}},
+            {
+                "$replaceRoot": {
+                    "newRoot": {
+                        "$mergeObjects": ["$item", {"status_oid": "$item._id"}]
+                    }
+                }
+            },
+            {"$unset": "_id"},
+            {
+                "$merge": {
+                    "into": "latest_status",
+                    "on": "address",
+                    "whenMatched": [
+                        {
+                            "$replaceWith": {
+                                "$mergeObjects": [
+                                    {
+                                        "$cond": [
+                                            {"$gte": ["$$new.block", "$block"]},
+                                            "$$new",
+                                            "$$ROOT",
+                                        ]
+                                    },
+                                    {
+                                        "status_oid": {
+                                            "$max": ["$status_oid", "$$new.status_oid"]
+                                        }
+                                    },
+                                ]
+                            }
+                        }
+                    ],
+                    "whenNotMatched": "insert",
+                }
+            },
+        ]
+        if since:
+            query.insert(0, {"$match": {"_id": {"$gt": since}}})
+        return query
+
     @staticmethod
     def query_status_mostUsed_token1(limit: int = 5) -> list[dict]:
         """return the top most used token1 address of static database
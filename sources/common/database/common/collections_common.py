@@ -1,14 +1,19 @@
 from decimal import Decimal, localcontext
 import logging
 import asyncio
+from itertools import islice
 from math import log
 
 from bson.decimal128 import Decimal128, create_decimal128_context
 from pymongo.errors import BulkWriteError
+from sources.common.database.common.db_executor import mongo_executor
 from sources.common.database.common.db_managers import MongoDbManager
 
 logger = logging.getLogger(__name__)
 
+# keys queried in one nearest items aggregation ( two union sub pipelines per key )
+_NEAREST_CHUNK_KEYS = 100
+
 
 class db_collections_common:
     def __init__(
@@ -21,6 +26,26 @@ class db_collections_common:
         self._db_name = db_name
         self._db_collections = db_collections
 
+    def _create_db_manager(self) -> MongoDbManager:
+        return MongoDbManager(
+            url=self._db_mongo_url,
+            db_name=self._db_name,
+            collections=self._db_collections,
+        )
+
+    async def _run_in_executor(self, func, *args, **kwargs):
+        """Run a blocking database function off the event loop
+
+        Args:
+            func: function receiving the database manager as first argument
+        """
+
+        def _call():
+            with self._create_db_manager() as _db_manager:
+                return func(_db_manager, *args, **kwargs)
+
+        return await mongo_executor.run(_call)
+
     # actual db saving
     async def save_items_to_database(
         self,
@@ -63,15 +88,13 @@ class db_collections_common:
             {"filter": {"id": item["id"]}, "data": item} for key, item in data.items()
         ]
         try:
-            with MongoDbManager(
-                url=self._db_mongo_url,
-                db_name=self._db_name,
-                collections=self._db_collections,
-            ) as _db_manager:
-                # add to mongodb
-                _db_manager.replace_items_bulk(
-                    coll_name=collection_name, data=data, upsert=True
-                )
+            # add to mongodb
+            await self._run_in_executor(
+                MongoDbManager.replace_items_bulk,
+                coll_name=collection_name,
+                data=data,
+                upsert=True,
+            )
         except Exception as e:
             logging.getLogger(__name__).exception(
                 f" Unable to save/replace data in bulk to mongo's {collection_name} collection.  error-> {e}"
@@ -89,15 +112,13 @@ class db_collections_common:
             collection_name (str): collection name to save data to
         """
         try:
-            with MongoDbManager(
-                url=self._db_mongo_url,
-                db_name=self._db_name,
-                collections=self._db_collections,
-            ) as _db_manager:
-                # add to mongodb
-                _db_manager.add_item(
-                    coll_name=collection_name, dbFilter={"id": data["id"]}, data=data
-                )
+            # add to mongodb
+            await self._run_in_executor(
+                MongoDbManager.add_item,
+                coll_name=collection_name,
+                dbFilter={"id": data["id"]},
+                data=data,
+            )
         except Exception as e:
             logging.getLogger(__name__).exception(
                 f" Unable to save data to mongo's {collection_name} collection.  error-> {e}"
@@ -109,15 +130,13 @@ class db_collections_common:
         collection_name: str,
     ):
         try:
-            with MongoDbManager(
-                url=self._db_mongo_url,
-                db_name=self._db_name,
-                collections=self._db_collections,
-            ) as _db_manager:
-                # add to mongodb
-                _db_manager.replace_item(
-                    coll_name=collection_name, dbFilter={"id": data["id"]}, data=data
-                )
+            # add to mongodb
+            await self._run_in_executor(
+                MongoDbManager.replace_item,
+                coll_name=collection_name,
+                dbFilter={"id": data["id"]},
+                data=data,
+            )
         except Exception as e:
             logging.getLogger(__name__).exception(
                 f" Unable to replace data in mongo's {collection_name} collection.  error-> {e}"
@@ -138,15 +157,13 @@ class db_collections_common:
             # create bulk data object
             bulk_data = [{"filter": {"id": item["id"]}, "data": item} for item in data]
 
-            with MongoDbManager(
-                url=self._db_mongo_url,
-                db_name=self._db_name,
-                collections=self._db_collections,
-            ) as _db_manager:
-                # add to mongodb
-                _db_manager.replace_items_bulk(
-                    coll_name=collection_name, data=bulk_data, upsert=True
-                )
+            # add to mongodb
+            await self._run_in_executor(
+                MongoDbManager.replace_items_bulk,
+                coll_name=collection_name,
+                data=bulk_data,
+                upsert=True,
+            )
         except BulkWriteError as bwe:
             logging.getLogger(__name__).error(
                 f"  Error while replacing multiple items in {collection_name} collection database. Items qtty: {len(data)}  error-> {bwe.details}"
@@ -161,43 +178,210 @@ class db_collections_common:
         query: list[dict],
         collection_name: str,
     ) -> list:
-        # db_manager = self.create_db_manager()
-        with MongoDbManager(
-            url=self._db_mongo_url,
-            db_name=self._db_name,
-            collections=self._db_collections,
-        ) as _db_manager:
-            result = list(
+        return await self._run_in_executor(
+            lambda _db_manager: list(
                 _db_manager.get_items(coll_name=collection_name, aggregate=query)
             )
-        return result
+        )
 
     async def get_items_from_database(self, collection_name: str, **kwargs) -> list:
-        with MongoDbManager(
-            url=self._db_mongo_url,
-            db_name=self._db_name,
-            collections=self._db_collections,
-        ) as _db_manager:
-            result = _db_manager.get_items(coll_name=collection_name, **kwargs)
-            result = list(result)
-        return result
+        return await self._run_in_executor(
+            lambda _db_manager: list(
+                _db_manager.get_items(coll_name=collection_name, **kwargs)
+            )
+        )
+
+    async def stream_items_from_database(
+        self, collection_name: str, batch_size: int = 1000, **kwargs
+    ):
+        """Iterate over the database items without loading them all in memory
+
+        Args:
+            collection_name (str): collection name
+            batch_size (int, optional): items fetched from the cursor at once. Defaults to 1000.
+            **kwargs: get_items arguments ( find, aggregate, projection ... )
+        """
+        cursor = await self._run_in_executor(
+            lambda _db_manager: _db_manager.get_items(
+                coll_name=collection_name, **kwargs
+            )
+        )
+        try:
+            while batch := await mongo_executor.run(
+                lambda: list(islice(cursor, batch_size))
+            ):
+                for item in batch:
+                    yield item
+        finally:
+            await mongo_executor.run(cursor.close)
 
     async def get_distinct_items_from_database(
         self, field: str, collection_name: str, condition: dict = None
     ) -> list:
-        with MongoDbManager(
-            url=self._db_mongo_url,
-            db_name=self._db_name,
-            collections=self._db_collections,
-        ) as _db_manager:
-            result = list(
+        return await self._run_in_executor(
+            lambda _db_manager: list(
                 _db_manager.get_distinct(
                     coll_name=collection_name, field=field, condition=condition or {}
                 )
             )
+        )
+
+    # NEAREST ITEMS
 
+    async def get_nearest_items(
+        self,
+        collection_name: str,
+        field: str,
+        value: int,
+        keys: list[dict],
+        find: dict | None = None,
+        before_only: bool = False,
+    ) -> list[dict | None]:
+        """Find the item closest to <value> for each key ( like each hypervisor address )
+            using two indexed range queries per key: the greatest <= value and the smallest >= value.
+            Queries are batched in one aggregation per chunk of keys.
+
+        Args:
+            collection_name (str): collection name
+            field (str): field to compare to <value> ( block, timestamp ... )
+            value (int): target value
+            keys (list[dict]): filter identifying each key, like [{"address": <address>}, ...]
+            find (dict | None, optional): filter shared by all keys. Defaults to None.
+            before_only (bool, optional): only return items with <field> <= value. Defaults to False.
+
+        Returns:
+            list[dict | None]: closest item of each key ( None when not found )
+        """
+        chunks = await asyncio.gather(
+            *[
+                self.get_items_from_database(
+                    collection_name=collection_name,
+                    aggregate=self.query_nearest(
+                        collection_name=collection_name,
+                        field=field,
+                        value=value,
+                        keys=keys[i : i + _NEAREST_CHUNK_KEYS],
+                        find=find,
+                        before_only=before_only,
+                        key_offset=i,
+                    ),
+                )
+                for i in range(0, len(keys), _NEAREST_CHUNK_KEYS)
+            ]
+        )
+
+        result: list[dict | None] = [None] * len(keys)
+        for item in (item for chunk in chunks for item in chunk):
+            index = item.pop("_nearest_key")
+            if result[index] is None or abs(item[field] - value) < abs(
+                result[index][field] - value
+            ):
+                result[index] = item
         return result
 
+    @staticmethod
+    def query_nearest(
+        collection_name: str,
+        field: str,
+        value: int,
+        keys: list[dict],
+        find: dict | None = None,
+        before_only: bool = False,
+        key_offset: int = 0,
+    ) -> list[dict]:
+        """Aggregation returning, for each key, the greatest item <= value and the smallest >= value
+            ( each one an indexed range query, unioned in one pipeline )
+        """
+        find = find or {}
+        sides = [("$lte", -1)] if before_only else [("$lte", -1), ("$gte", 1)]
+
+        pipelines = [
+            [
+                {
+                    "$match": {
+                        **find,
+                        **key,
+                        field: {**find.get(field, {}), operator: value},
+                    }
+                },
+                {"$sort": {field: direction}},
+                {"$limit": 1},
+                {"$addFields": {"_nearest_key": key_offset + i}},
+            ]
+            for i, key in enumerate(keys)
+            for operator, direction in sides
+        ]
+        if not pipelines:
+            return [{"$match": {"_id": {"$exists": False}}}]
+
+        return pipelines[0] + [
+            {"$unionWith": {"coll": collection_name, "pipeline": pipeline}}
+            for pipeline in pipelines[1:]
+        ]
+
+    # INDEXES
+
+    async def setup_collections(self) -> dict:
+        """Create all configured collection indexes and verify they exist in the database
+
+        Returns:
+            dict: {<collection name>: <list of missing indexes> }
+        """
+
+        def _setup(_db_manager: MongoDbManager) -> dict:
+            result = {}
+            for coll_name in self._db_collections.keys():
+                _db_manager.configure_collection(coll_name=coll_name, force=True)
+                result[coll_name] = _db_manager.get_missing_indexes(
+                    coll_name=coll_name
+                )
+            return result
+
+        return await self._run_in_executor(_setup)
+
+    async def explain_query(self, query: list[dict], collection_name: str) -> dict:
+        """Summarize the query plan of an aggregation
+
+        Args:
+            query (list[dict]): aggregation pipeline
+            collection_name (str): collection name
+
+        Returns:
+            dict: {"stages": <plan stages>, "indexes": <index names used>, "collscan": <bool>}
+        """
+        explain = await self._run_in_executor(
+            MongoDbManager.explain_aggregate,
+            coll_name=collection_name,
+            aggregate=query,
+        )
+
+        stages = []
+        indexes = []
+
+        def _walk(item):
+            if isinstance(item, dict):
+                # skip rejected plans
+                for k, v in item.items():
+                    if k == "rejectedPlans":
+                        continue
+                    if k == "stage" and isinstance(v, str):
+                        stages.append(v)
+                    elif k == "indexName" and isinstance(v, str):
+                        indexes.append(v)
+                    else:
+                        _walk(v)
+            elif isinstance(item, list):
+                for v in item:
+                    _walk(v)
+
+        _walk(explain)
+
+        return {
+            "stages": stages,
+            "indexes": list(set(indexes)),
+            "collscan": "COLLSCAN" in stages,
+        }
+
     # TOOLING
 
     @staticmethod
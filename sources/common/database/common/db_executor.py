@@ -0,0 +1,203 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from sources.subgraph.bins.config import (
+    MONGO_DB_MAX_QUEUE,
+    MONGO_DB_MAX_WORKERS,
+    MONGO_DB_REQUEST_CONCURRENCY,
+)
+
+logger = logging.getLogger(__name__)
+
+# per request database concurrency limit ( set by the request middleware )
+#   asyncio.gather copies the context into its tasks, so all database calls
+#   fanned out by the same request share this semaphore
+_request_semaphore: contextvars.ContextVar[asyncio.Semaphore | None] = (
+    contextvars.ContextVar("database_request_semaphore", default=None)
+)
+
+
+def set_request_concurrency(
+    limit: int = MONGO_DB_REQUEST_CONCURRENCY,
+) -> contextvars.Token:
+    """Limit the number of concurrent database calls of the current request
+
+    Args:
+        limit (int, optional): maximum concurrent calls. Defaults to MONGO_DB_REQUEST_CONCURRENCY.
+
+    Returns:
+        contextvars.Token: token to reset the limit when the request is done
+    """
+    return _request_semaphore.set(asyncio.Semaphore(limit) if limit > 0 else None)
+
+
+def reset_request_concurrency(token: contextvars.Token):
+    _request_semaphore.reset(token)
+
+
+class MongoExecutor:
+    """Bounded thread pool to run blocking pymongo calls off the event loop.
+
+    At most <max_workers> calls run at the same time and at most <max_queue> calls
+    wait for a free worker. When the queue is full, new calls wait ( backpressure )
+    before being queued.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="mongo"
+        )
+        # admission slots: running + queued calls
+        #   calls waiting for a slot await a future, handed a slot on release
+        #   ( from any event loop ) in arrival order
+        self._slots_lock = threading.Lock()
+        self._free_slots = max_workers + max_queue
+        self._slot_waiters: deque[
+            tuple[asyncio.AbstractEventLoop, asyncio.Future]
+        ] = deque()
+
+        # metrics
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._waiting = 0
+        self._max_queued = 0
+        self._completed = 0
+        self._errors = 0
+        self._total_queue_time = 0.0
+        self._total_run_time = 0.0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking function in the executor
+
+        Args:
+            func (Callable): blocking function
+            *args, **kwargs: function arguments
+
+        Returns:
+            Any: function result
+        """
+        if request_semaphore := _request_semaphore.get():
+            async with request_semaphore:
+                return await self._run(func, *args, **kwargs)
+        return await self._run(func, *args, **kwargs)
+
+    async def _run(self, func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+
+        # backpressure: wait without blocking the event loop for an admission slot
+        await self._acquire_slot()
+
+        with self._lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+        _queued_at = time.perf_counter()
+
+        def _call():
+            _started_at = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._total_queue_time += _started_at - _queued_at
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self._errors += 1
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._total_run_time += time.perf_counter() - _started_at
+
+        try:
+            return await loop.run_in_executor(
+                self._executor, contextvars.copy_context().run, _call
+            )
+        finally:
+            self._release_slot()
+
+    async def _acquire_slot(self):
+        with self._slots_lock:
+            if self._free_slots > 0 and not self._slot_waiters:
+                self._free_slots -= 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._slot_waiters.append(waiter)
+
+        with self._lock:
+            self._waiting += 1
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._slots_lock:
+                if waiter in self._slot_waiters:
+                    self._slot_waiters.remove(waiter)
+                    waiter = None
+            if waiter and not waiter[1].cancelled():
+                # handed a slot before being cancelled
+                self._release_slot()
+            raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _release_slot(self):
+        """Hand the slot over to the first waiter or free it"""
+        with self._slots_lock:
+            while self._slot_waiters:
+                loop, future = self._slot_waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._hand_slot, future)
+                    return
+                except RuntimeError:
+                    # event loop closed
+                    continue
+            self._free_slots += 1
+
+    def _hand_slot(self, future: asyncio.Future):
+        if future.cancelled():
+            # waiter gone: next one
+            self._release_slot()
+        else:
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        """Executor metrics"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._queued,
+                "waiting": self._waiting,
+                "max_queued": self._max_queued,
+                "completed": self._completed,
+                "errors": self._errors,
+                "avg_queue_time": (
+                    self._total_queue_time / self._completed if self._completed else 0
+                ),
+                "avg_run_time": (
+                    self._total_run_time / self._completed if self._completed else 0
+                ),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# process-wide database executor
+mongo_executor = MongoExecutor(
+    max_workers=MONGO_DB_MAX_WORKERS, max_queue=MONGO_DB_MAX_QUEUE
+)
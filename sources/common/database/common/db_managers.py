@@ -1,12 +1,60 @@
 import logging
+import threading
 from pymongo import MongoClient
 from pymongo import errors as MongoErrors
-from pymongo import InsertOne, DeleteMany, ReplaceOne, UpdateOne
+from pymongo import InsertOne, DeleteMany, ReplaceOne, UpdateOne, ASCENDING
 
-from sources.subgraph.bins.config import MONGO_DB_TIMEOUTMS
+from sources.subgraph.bins.config import MONGO_DB_CONFIGURE_INDEXES, MONGO_DB_TIMEOUTMS
 
 logger = logging.getLogger(__name__)
 
+# process-wide pool of mongo clients ( one per url )
+#   MongoClient is thread-safe and holds its own connection pool, so it is meant to be reused
+_MONGO_CLIENTS: dict[str, MongoClient] = {}
+_MONGO_CLIENTS_LOCK = threading.Lock()
+# collections already configured (indexes created) by this process:  (url, db_name, coll_name)
+_CONFIGURED_COLLECTIONS: set[tuple[str, str, str]] = set()
+
+
+def get_mongo_client(
+    url: str, serverSelectionTimeoutMS: int = MONGO_DB_TIMEOUTMS
+) -> MongoClient:
+    """Get the shared mongo client for the url, creating it when needed
+
+    Args:
+        url (str): full mongodb url
+        serverSelectionTimeoutMS (int): maximum number of milliseconds to timeout connection
+
+    Returns:
+        MongoClient: pooled client
+    """
+    if client := _MONGO_CLIENTS.get(url):
+        return client
+
+    with _MONGO_CLIENTS_LOCK:
+        # another thread may have created it while waiting for the lock
+        if url not in _MONGO_CLIENTS:
+            try:
+                _MONGO_CLIENTS[url] = MongoClient(
+                    url, serverSelectionTimeoutMS=serverSelectionTimeoutMS
+                )
+            except MongoErrors.ServerSelectionTimeoutError:
+                raise Exception(
+                    f" Connection timed out using {serverSelectionTimeoutMS} ms. Try increasing this value if u know server is responding"
+                )
+            except MongoErrors.ConnectionFailure:
+                raise Exception("Failed to connect to {}".format(url))
+        return _MONGO_CLIENTS[url]
+
+
+def close_mongo_clients():
+    """Close all pooled mongo clients ( app shutdown )"""
+    with _MONGO_CLIENTS_LOCK:
+        for client in _MONGO_CLIENTS.values():
+            client.close()
+        _MONGO_CLIENTS.clear()
+        _CONFIGURED_COLLECTIONS.clear()
+
 
 class MongoDbManager:
     def __init__(
@@ -33,57 +81,95 @@ class MongoDbManager:
             serverSelectionTimeoutMS (int): maximum number of milliseconds to timeout connection
         """
 
-        # connect to mongo database
-        try:
-            self.mongo_client = MongoClient(
-                url, serverSelectionTimeoutMS=serverSelectionTimeoutMS
-            )
-        except MongoErrors.ServerSelectionTimeoutError:
-            raise Exception(
-                f" Connection timed out using {serverSelectionTimeoutMS} ms. Try increasing this value if u know server is responding"
-            )
-        except MongoErrors.ConnectionFailure:
-            raise Exception("Failed to connect to {}".format(url))
+        # use the shared ( pooled ) client for this url
+        self._url = url
+        self.mongo_client = get_mongo_client(
+            url=url, serverSelectionTimeoutMS=serverSelectionTimeoutMS
+        )
         self.database = self.mongo_client[db_name]
 
-        # Retrieve database collection names
-        self.database_collections = self.database.list_collection_names()
-
         # define collection configurations
         self.collections_config = collections
 
-        # Setup collections and their indexes
+        # Setup collections and their indexes ( only once per process )
         self.configure_collections()
 
     def __enter__(self):
         return self
 
     def __exit__(self, type, value, traceback):
-        # xception handling here
-        self.mongo_client.close()
+        # the client is shared between managers: closed at app shutdown (close_mongo_clients)
+        pass
 
     def configure_collections(self):
         """define collection names and create indexes"""
-        for coll_name, fields in self.collections_config.items():
-            # mono indexes
-            for field, unique in fields.get("mono_indexes", {}).items():
-                self.database[coll_name].create_index(field, unique=unique)
-            # multi indexes
-            for field in fields.get("multi_indexes", []):
-                self.database[coll_name].create_index(field)
+        for coll_name in self.collections_config.keys():
+            self.configure_collection(coll_name=coll_name)
 
-    def create_collection(self, coll_name: str, **indexes):
-        """Creates a collection if it does not exist.
-        Arguments:
-           indexes = [ <collection field name>:str = <unique>:bool  ]
+    def configure_collection(
+        self, coll_name: str, force: bool = False, indexes: dict | None = None
+    ):
+        """Create the collection indexes defined in its configuration,
+            when not already done by this process
+
+        Args:
+            coll_name (str): collection name
+            force (bool, optional): recreate indexes even when already configured. Defaults to False.
+            indexes (dict | None, optional): { "mono_indexes": {<field>:<unique>}, "multi_indexes": [...] }. Defaults to the collection configuration.
         """
+        _key = (self._url, self.database.name, coll_name)
+        if not force and (
+            _key in _CONFIGURED_COLLECTIONS or not MONGO_DB_CONFIGURE_INDEXES
+        ):
+            # already configured or indexes are setup externally ( setup_database.py )
+            return
+
+        fields = indexes or self.collections_config.get(coll_name, {})
+        # mono indexes
+        for field, unique in fields.get("mono_indexes", {}).items():
+            self.database[coll_name].create_index(field, unique=unique)
+        # multi indexes
+        for field in fields.get("multi_indexes", []):
+            self.database[coll_name].create_index(field)
 
-        if not coll_name in self.database_collections:
-            for field, unique in indexes.items():
-                self.database[coll_name].create_index(field, unique=unique)
+        _CONFIGURED_COLLECTIONS.add(_key)
 
-            # refresh database collection names
-            self.database_collections = self.database.list_collection_names()
+    def get_missing_indexes(self, coll_name: str) -> list:
+        """Return the configured indexes not present in the database collection
+
+        Args:
+            coll_name (str): collection name
+
+        Returns:
+            list: of index keys, like [ [("address", 1)], [("block", 1), ("logIndex", 1)] ]
+        """
+        fields = self.collections_config.get(coll_name, {})
+        expected = [[(field, ASCENDING)] for field in fields.get("mono_indexes", {})]
+        expected += [list(field) for field in fields.get("multi_indexes", [])]
+
+        existing = [
+            [(k, int(v) if isinstance(v, (int, float)) else v) for k, v in index["key"]]
+            for index in self.database[coll_name].index_information().values()
+        ]
+        return [index for index in expected if index not in existing]
+
+    def explain_aggregate(self, coll_name: str, aggregate: list[dict]) -> dict:
+        """Return the query planner output of an aggregation
+
+        Args:
+            coll_name (str): collection name
+            aggregate (list[dict]): aggregation pipeline
+        """
+        return self.database.command(
+            "aggregate", coll_name, pipeline=aggregate, explain=True
+        )
+
+    def create_collection(self, coll_name: str, **indexes):
+        """Creates the collection indexes if not already done by this process.
+        Arguments:
+           indexes = { "mono_indexes": {<field>:<unique>}, "multi_indexes": [...] }  ( defaults to the collection configuration )
+        """
+        self.configure_collection(coll_name=coll_name, indexes=indexes)
 
     def add_item(self, coll_name: str, dbFilter: dict, data: dict, upsert=True):
         """Add or Update item
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+
+from sources.common.database.collection_endpoint import database_global, database_local
+from sources.common.general.enums import Chain
+from sources.mongo.bins.helpers import global_database_helper, local_database_helper
+
+logger = logging.getLogger(__name__)
+
+
+async def setup_database_indexes(chains: list[Chain] | None = None) -> dict:
+    """Create and verify the indexes of the global and local (per chain) databases
+
+    Args:
+        chains (list[Chain] | None, optional): chains to setup. Defaults to all.
+
+    Returns:
+        dict: {<database name>: {<collection name>: <list of missing indexes>}}
+    """
+    helpers = [global_database_helper()] + [
+        local_database_helper(network=chain) for chain in chains or list(Chain)
+    ]
+
+    result = {}
+    for helper, missing in zip(
+        helpers,
+        await asyncio.gather(
+            *[helper.setup_collections() for helper in helpers],
+            return_exceptions=True,
+        ),
+    ):
+        if isinstance(missing, Exception):
+            logger.error(f" Unable to setup {helper._db_name} indexes. error-> {missing}")
+            continue
+        result[helper._db_name] = missing
+
+    return result
+
+
+async def index_advice_report(chain: Chain, period_days: int = 30) -> list[dict]:
+    """Explain the hot aggregations of a chain using sample parameters and report
+        the ones doing full collection scans ( candidates for new compound indexes )
+
+    Args:
+        chain (Chain):
+        period_days (int, optional): timeframe to use in time based queries. Defaults to 30.
+
+    Returns:
+        list[dict]: {"name": <query builder>, "collection": <collection name>, "stages": , "indexes": , "collscan": }
+    """
+    local_db = local_database_helper(network=chain)
+
+    # sample parameters
+    hypervisor_address = None
+    if items := await local_db.get_items_from_database(
+        collection_name="static", find={}, projection={"address": 1}, limit=1
+    ):
+        hypervisor_address = items[0]["address"]
+    user_address = None
+    if items := await local_db.get_items_from_database(
+        collection_name="user_operations",
+        find={},
+        projection={"user_address": 1},
+        limit=1,
+    ):
+        user_address = items[0]["user_address"]
+
+    timestamp_end = int(time.time())
+    timestamp_ini = timestamp_end - period_days * 24 * 60 * 60
+
+    queries = [
+        (
+            "query_last_prices",
+            "usd_prices",
+            database_global.query_last_prices(network=chain.database_name),
+            global_database_helper(),
+        ),
+        (
+            "query_nearest",
+            "blocks",
+            database_global.query_nearest(
+                collection_name="blocks",
+                field="timestamp",
+                value=timestamp_ini,
+                keys=[{"network": chain.database_name}],
+            ),
+            global_database_helper(),
+        ),
+    ]
+    if hypervisor_address:
+        queries += [
+            (
+                "query_status_feeReturn_data",
+                "status",
+                database_local.query_status_feeReturn_data(
+                    hypervisor_address=hypervisor_address,
+                    timestamp_ini=timestamp_ini,
+                    timestamp_end=timestamp_end,
+                ),
+                local_db,
+            ),
+            (
+                "query_uncollected_fees",
+                "status",
+                database_local.query_uncollected_fees(
+                    hypervisor_address=hypervisor_address, timestamp=timestamp_end
+                ),
+                local_db,
+            ),
+            (
+                "query_operations_summary",
+                "operations",
+                database_local.query_operations_summary(
+                    hypervisor_addresses=[hypervisor_address],
+                    timestamp_ini=timestamp_ini,
+                    timestamp_end=timestamp_end,
+                ),
+                local_db,
+            ),
+            (
+                "query_operations",
+                "operations",
+                database_local.query_operations(
+                    hypervisor_address=hypervisor_address,
+                    timestamp_ini=timestamp_ini,
+                    timestamp_end=timestamp_end,
+                ),
+                local_db,
+            ),
+        ]
+    if user_address:
+        queries.append(
+            (
+                "query_user_shares_operations",
+                "operations",
+                database_local.query_user_shares_operations(
+                    user_address=user_address, chain=chain
+                ),
+                local_db,
+            )
+        )
+
+    result = []
+    for name, collection_name, query, db_helper in queries:
+        try:
+            plan = await db_helper.explain_query(
+                query=query, collection_name=collection_name
+            )
+        except Exception as e:
+            logger.error(f" Unable to explain {chain} {name}. error-> {e}")
+            continue
+        result.append({"name": name, "collection": collection_name, **plan})
+
+    return result
@@ -20,3 +20,15 @@ def get_config(key: str) -> str:
     if not value:
         value = YAML_CONFIG_DEFAULTS[key]
     return value
+
+
+def get_config_flag(key: str) -> bool:
+    """Find a boolean config in env var/config.yaml ( "true" or "1" )
+    Unlike get_config, a false value is kept instead of using the default one
+    """
+    value = os.environ.get(key)
+    if value is None and YAML_CONFIG:
+        value = YAML_CONFIG.get(key)
+    if value is None:
+        value = YAML_CONFIG_DEFAULTS[key]
+    return str(value).lower() in ("true", "1")
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from fastapi import Response
+
+from sources.common.general.enums import Chain
+from sources.mongo.bins.helpers import local_database_chains
+from sources.subgraph.bins.config import FAN_OUT_CONCURRENCY, FAN_OUT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# response header listing the chains missing from a partial result
+PARTIAL_CHAINS_HEADER = "X-Partial-Chains"
+
+
+class fan_out_result:
+    """Per chain results of a fan-out ( in the requested chains order )"""
+
+    def __init__(self):
+        self.results: dict[Chain, Any] = {}
+        # chains that failed or timed out { <chain>: <error> }
+        self.errors: dict[Chain, str] = {}
+        # chains without local database
+        self.skipped: list[Chain] = []
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.errors)
+
+    def values(self) -> list:
+        return list(self.results.values())
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Response headers flagging the chains missing from a partial result"""
+        if not self.errors:
+            return {}
+        return {
+            PARTIAL_CHAINS_HEADER: ",".join(chain.database_name for chain in self.errors)
+        }
+
+    def report(self, response: Response | None = None) -> "fan_out_result":
+        """Flag the response with the chains missing from a partial result"""
+        if response is not None:
+            response.headers.update(self.headers)
+        return self
+
+    def error_report(self) -> dict[str, str]:
+        """Errors of the failed chains { <chain database name>: <error> }"""
+        return {chain.database_name: error for chain, error in self.errors.items()}
+
+
+async def fan_out_chains(
+    func: Callable[[Chain], Awaitable[Any]],
+    chains: list[Chain] | None = None,
+    concurrency: int | None = None,
+    timeout: float | None = None,
+    local_database: bool = True,
+) -> fan_out_result:
+    """Run func(chain) for each chain, a limited number of chains at a time
+
+    A chain failing or exceeding its timeout does not fail the others: it is
+    reported in the result errors.
+
+    Args:
+        func (Callable[[Chain], Awaitable[Any]]): per chain work
+        chains (list[Chain] | None, optional): Defaults to all chains.
+        concurrency (int | None, optional): chains run at the same time. Defaults to FAN_OUT_CONCURRENCY config.
+        timeout (float | None, optional): seconds each chain has to finish. Defaults to FAN_OUT_TIMEOUT config.
+        local_database (bool, optional): skip chains without local database. Defaults to True.
+    """
+    chains = list(Chain) if chains is None else list(chains)
+    result = fan_out_result()
+
+    if local_database:
+        available = await local_database_chains(chains)
+        result.skipped = [chain for chain in chains if chain not in available]
+        chains = available
+
+    semaphore = asyncio.Semaphore(concurrency or FAN_OUT_CONCURRENCY)
+    timeout = timeout or FAN_OUT_TIMEOUT
+    results = {}
+
+    async def _run(chain: Chain):
+        async with semaphore:
+            try:
+                results[chain] = await asyncio.wait_for(func(chain), timeout=timeout)
+            except asyncio.TimeoutError:
+                result.errors[chain] = f"timeout after {timeout} seconds"
+                logger.warning(f" {chain.fantasy_name} fan-out timed out")
+            except Exception as e:
+                result.errors[chain] = str(e) or e.__class__.__name__
+                logger.error(f" {chain.fantasy_name} fan-out failed. Error: {e}")
+
+    await asyncio.gather(*[_run(chain) for chain in chains])
+
+    result.results = {chain: results[chain] for chain in chains if chain in results}
+    return result
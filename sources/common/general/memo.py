@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+from typing import Any, Awaitable, Callable
+
+# lookups of the current request ( set by the request middleware ) { <key>: Future }
+#   asyncio.gather copies the context into its tasks, so all lookups fanned out by
+#   the same request share this dictionary
+_request_memo: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "request_memo", default=None
+)
+# lookups shared by concurrent requests for a short time { <key>: Future }
+_SHARED: dict[tuple, asyncio.Future] = {}
+
+
+def set_request_memo() -> contextvars.Token:
+    """Start memoizing lookups of the current request
+
+    Returns:
+        contextvars.Token: token to reset the memo when the request is done
+    """
+    return _request_memo.set({})
+
+
+def reset_request_memo(token: contextvars.Token):
+    _request_memo.reset(token)
+
+
+def _freeze(item: Any) -> Any:
+    """Hashable version of an argument ( lists, sets and dicts by value )"""
+    if isinstance(item, (list, tuple)):
+        return tuple(_freeze(x) for x in item)
+    if isinstance(item, (set, frozenset)):
+        return frozenset(_freeze(x) for x in item)
+    if isinstance(item, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in item.items()))
+    return item
+
+
+def request_memoize(ttl: float = 0, ignore: tuple[str, ...] = ()):
+    """Compute identical async lookups once per request
+
+    Concurrent and later calls with the same arguments within a request await the same
+    result, which must not be modified by the callers.
+
+    Args:
+        ttl (float, optional): seconds a result is also shared with other requests ( 0 = not shared ).
+        ignore (tuple[str, ...], optional): arguments not identifying the lookup ( sessions, clients ... ).
+    """
+
+    def decorator(func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            memo = _request_memo.get()
+            if memo is None and not ttl:
+                return await func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (
+                func.__module__,
+                func.__qualname__,
+                *(
+                    (name, _freeze(value))
+                    for name, value in bound.arguments.items()
+                    if name not in ignore
+                ),
+            )
+            try:
+                hash(key)
+            except TypeError:
+                return await func(*args, **kwargs)
+
+            if memo is not None and (future := memo.get(key)) is not None:
+                return await asyncio.shield(future)
+
+            if (future := _SHARED.get(key)) is None:
+                future = asyncio.ensure_future(func(*args, **kwargs))
+                future.add_done_callback(
+                    functools.partial(_forget, memo=memo, key=key, ttl=ttl)
+                )
+                if ttl:
+                    _SHARED[key] = future
+
+            if memo is not None:
+                memo[key] = future
+            return await asyncio.shield(future)
+
+        return wrapper
+
+    return decorator
+
+
+def _forget(future: asyncio.Future, memo: dict | None, key: tuple, ttl: float):
+    """Drop failed lookups ( to be retried ) and expire shared ones"""
+    if future.cancelled() or future.exception() is not None:
+        if memo is not None and memo.get(key) is future:
+            memo.pop(key)
+        _forget_shared(future, key)
+    elif ttl:
+        asyncio.get_running_loop().call_later(ttl, _forget_shared, future, key)
+
+
+def _forget_shared(future: asyncio.Future, key: tuple):
+    if _SHARED.get(key) is future:
+        _SHARED.pop(key)
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+
+from sources.common.general.enums import Chain
+from sources.mongo.bins.helpers import global_database_helper
+from sources.subgraph.bins.config import CURRENT_PRICES_REFRESH
+
+logger = logging.getLogger(__name__)
+
+# snapshots older than this many refresh intervals are reloaded before being served
+_MAX_STALE_INTERVALS = 10
+
+
+class current_prices_snapshot:
+    """Current usd prices of one network, indexed by token address"""
+
+    def __init__(self, network: str, items: list[dict]):
+        self.network = network
+        self.prices: dict[str, dict] = {item["address"]: item for item in items}
+        self.loaded_at = time.time()
+        # most recent price timestamp in the snapshot
+        self.updated = max((item.get("timestamp", 0) for item in items), default=0)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was loaded"""
+        return time.time() - self.loaded_at
+
+    def get(self, token_addresses: list[str] | None = None) -> list[dict]:
+        """Price documents of the given token addresses ( all when empty )
+        Documents are shared and must not be modified by the callers
+        """
+        if not token_addresses:
+            return list(self.prices.values())
+        return [
+            item
+            for address in token_addresses
+            if (item := self.prices.get(address)) is not None
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "tokens": len(self.prices),
+            "age": int(self.age),
+            "updated": self.updated,
+        }
+
+
+class current_prices_cache:
+    """Per worker snapshots of the current_usd_prices collection
+
+    The first lookup of a network loads its snapshot. Afterwards, lookups are served
+    from memory and snapshots older than the refresh interval are reloaded in the
+    background ( one load at a time per network ).
+    """
+
+    def __init__(self, refresh: float = CURRENT_PRICES_REFRESH):
+        self.refresh = refresh
+        self._snapshots: dict[str, current_prices_snapshot] = {}
+        self._loading: dict[str, asyncio.Task] = {}
+        self._loads = 0
+        self._errors = 0
+
+    async def get(self, network: Chain) -> current_prices_snapshot:
+        snapshot = self._snapshots.get(network.database_name)
+        if snapshot is None or snapshot.age > self.refresh * _MAX_STALE_INTERVALS:
+            return await asyncio.shield(self._load(network.database_name))
+        if snapshot.age > self.refresh:
+            # serve the current snapshot while the new one loads
+            self._load(network.database_name)
+        return snapshot
+
+    def _load(self, network: str) -> asyncio.Task:
+        if (task := self._loading.get(network)) is None:
+            task = self._loading[network] = asyncio.create_task(
+                self._load_snapshot(network)
+            )
+            task.add_done_callback(lambda _: self._loading.pop(network, None))
+        return task
+
+    async def _load_snapshot(self, network: str) -> current_prices_snapshot:
+        self._loads += 1
+        try:
+            snapshot = current_prices_snapshot(
+                network=network,
+                items=await global_database_helper().get_items_from_database(
+                    collection_name="current_usd_prices",
+                    find={"network": network},
+                    projection={"_id": False, "id": False},
+                    batch_size=50000,
+                ),
+            )
+        except Exception as e:
+            self._errors += 1
+            logger.error(f" Error loading {network} current prices. Error: {e}")
+            if network in self._snapshots:
+                # keep serving the previous snapshot
+                return self._snapshots[network]
+            raise
+        self._snapshots[network] = snapshot
+        return snapshot
+
+    def stats(self) -> dict:
+        return {
+            "refresh": self.refresh,
+            "loads": self._loads,
+            "errors": self._errors,
+            "networks": {
+                network: snapshot.stats()
+                for network, snapshot in self._snapshots.items()
+            },
+        }
+
+
+# process-wide snapshots
+current_prices = current_prices_cache()
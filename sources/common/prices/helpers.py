@@ -2,9 +2,13 @@ import asyncio
 import logging
 import time
 from sources.common.general.enums import Chain
+from sources.common.prices.current import current_prices
 from sources.mongo.bins.helpers import global_database_helper
 from sources.subgraph.bins.constants import BLOCK_TIME_SECONDS
 
+# block greater than any chain block: latest known price
+LAST_BLOCK = 2**63 - 1
+
 
 async def get_prices(
     network: Chain,
@@ -44,49 +48,77 @@ async def get_prices(
         }
 
     # return prices for the given token addresses at the given block (or last available block)
-    price_queries = []
-    for address in token_addresses:
-        find = {
-            "network": network.database_name,
-            "address": address,
-        }
-        if block:
-            find["block"] = block
-
-        price_queries.append(
-            global_database_helper().get_items_from_database(
-                collection_name="usd_prices",
-                find=find,
-                sort=[("block", -1)],
-                limit=1,
-            )
-        )
-
-    # asyncio gather all queries and return price per address
     return {
-        item["address"]: {"price": item["price"], "block": item["block"]}
-        for items in await asyncio.gather(*price_queries)
-        for item in items
+        address: price
+        for (address, _), price in (
+            await get_prices_at_blocks(
+                network=network,
+                items=[(address, block or LAST_BLOCK) for address in token_addresses],
+            )
+        ).items()
     }
 
 
+async def get_prices_at_blocks(
+    network: Chain, items: list[tuple[str, int]]
+) -> dict[tuple[str, int], dict]:
+    """Get the latest price at or before the block of each ( token address, block ) from database,
+        with one batched query per distinct block
+
+    Args:
+        network (Chain):
+        items (list[tuple[str, int]]): ( token address ( lower case ), block ) list
+
+    Returns:
+        dict: with ( token address, block ) as key and {'price', 'block'} as value ( only found prices )
+    """
+    # token addresses by block
+    blocks = {}
+    for address, block in items:
+        blocks.setdefault(block, set()).add(address)
+
+    async def _prices_at_block(block: int, addresses: list[str]) -> dict:
+        return {
+            (address, block): {"price": item["price"], "block": item["block"]}
+            for address, item in zip(
+                addresses,
+                await global_database_helper().get_nearest_items(
+                    collection_name="usd_prices",
+                    field="block",
+                    value=block,
+                    keys=[{"address": address} for address in addresses],
+                    find={"network": network.database_name},
+                    before_only=True,
+                ),
+            )
+            if item
+        }
+
+    result = {}
+    for prices in await asyncio.gather(
+        *[
+            _prices_at_block(block, list(addresses))
+            for block, addresses in blocks.items()
+        ]
+    ):
+        result.update(prices)
+    return result
+
+
 async def get_current_prices(
     network: Chain, token_addresses: list[str] | None = None
 ) -> list[dict]:
-    find = {"network": network.database_name}
-    if token_addresses:
-        # build ids
-        ids = [f"{network.database_name}_{address}" for address in token_addresses]
-        find = {"id": {"$in": ids}}
-    else:
-        find = {"network": network.database_name}
-
-    return await global_database_helper().get_items_from_database(
-        collection_name="current_usd_prices",
-        find=find,
-        projection={"_id": False, "id": False},
-        batch_size=50000,
-    )
+    """Current token prices of a network, from the worker prices snapshot
+        ( returned documents must not be modified )
+
+    Args:
+        network (Chain):
+        token_addresses (list[str] | None, optional): token addresses ( lower case ). Defaults to all tokens.
+
+    Returns:
+        list[dict]: price documents of the found tokens
+    """
+    return (await current_prices.get(network)).get(token_addresses)
 
 
 async def get_database_prices_closeto(
@@ -94,6 +126,7 @@ async def get_database_prices_closeto(
     timestamp: int | None = None,
     block: int | None = None,
     default_to_current: bool = True,
+    token_addresses: list[str] | None = None,
 ) -> list[dict]:
     """Return the closest prices to the period
 
@@ -103,6 +136,7 @@ async def get_database_prices_closeto(
         end_block (int | None, optional): . Defaults to None.
         threshold (int, optional): blocks before the specified to be considered close. Defaults to 10000.
         default_to_current (bool, optional): If errors occur, default to current prices. Defaults to True.
+        token_addresses (list[str] | None, optional): tokens to price ( one indexed lookup each ). Defaults to all tokens priced close to the period.
 
     Returns:
         list[dict]:  {address:{
@@ -130,29 +164,47 @@ async def get_database_prices_closeto(
                 logging.getLogger(__name__).debug(
                     f" using database proces closest block: {_db_end_block}"
                 )
-                _initial_block = _db_end_block - (
-                    60 * 60 * 24 * 30 * 4 / BLOCK_TIME_SECONDS.get(chain, 10)
-                )
-                if _initial_block < _db_end_block:
-                    _initial_block = int(_db_end_block * 0.92)
-
-            # build and_query part
-            _and_query = [
-                {"network": chain.database_name},
-                {"block": {"$lte": _db_end_block, "$gte": _initial_block}},
-            ]
-            # build query
-            query = [
-                {"$match": {"$and": _and_query}},
-                {"$sort": {"block": -1}},
-                {"$group": {"_id": "$address", "last": {"$first": "$$ROOT"}}},
-            ]
-            token_prices = {
-                x["last"]["address"]: x["last"]
-                for x in await global_database_helper().get_items_from_database(
-                    collection_name="usd_prices", aggregate=query
-                )
-            }
+            _initial_block = _db_end_block - (
+                60 * 60 * 24 * 30 * 4 / BLOCK_TIME_SECONDS.get(chain, 10)
+            )
+            if _initial_block < _db_end_block:
+                _initial_block = int(_db_end_block * 0.92)
+
+            if token_addresses:
+                # last price of each token at or before the end block
+                token_prices = {
+                    item["address"]: item
+                    for item in await global_database_helper().get_nearest_items(
+                        collection_name="usd_prices",
+                        field="block",
+                        value=_db_end_block,
+                        keys=[{"address": address} for address in token_addresses],
+                        find={
+                            "network": chain.database_name,
+                            "block": {"$gte": _initial_block},
+                        },
+                        before_only=True,
+                    )
+                    if item
+                }
+            else:
+                # build and_query part
+                _and_query = [
+                    {"network": chain.database_name},
+                    {"block": {"$lte": _db_end_block, "$gte": _initial_block}},
+                ]
+                # build query
+                query = [
+                    {"$match": {"$and": _and_query}},
+                    {"$sort": {"block": -1}},
+                    {"$group": {"_id": "$address", "last": {"$first": "$$ROOT"}}},
+                ]
+                token_prices = {
+                    x["last"]["address"]: x["last"]
+                    for x in await global_database_helper().get_items_from_database(
+                        collection_name="usd_prices", aggregate=query
+                    )
+                }
     except Exception as e:
         logging.getLogger(__name__).error(
             f" Cant get token prices for {chain} at {timestamp or block}. Error: {e}"
@@ -168,3 +220,64 @@ async def get_database_prices_closeto(
         }
 
     return token_prices
+
+
+async def get_database_prices_closeto_timestamps(
+    chain: Chain,
+    timestamps: list[int],
+    token_addresses: list[str],
+    default_to_current: bool = True,
+) -> list[dict]:
+    """Return the token prices closest to each timestamp, resolving all of them in one batch:
+        the closest block of each timestamp and then the last price of each token at or before those blocks
+
+    Args:
+        chain (Chain):
+        timestamps (list[int]):
+        token_addresses (list[str]): tokens to price ( lower case )
+        default_to_current (bool, optional): use current prices for timestamps without prices. Defaults to True.
+
+    Returns:
+        list[dict]: one {address: {"price": float, "block": int}, ...} for each timestamp
+    """
+    blocks = []
+    for item in await asyncio.gather(
+        *[
+            global_database_helper().get_closest_block(
+                network=chain.database_name, timestamp=timestamp
+            )
+            for timestamp in timestamps
+        ]
+    ):
+        blocks.append(item[0]["doc"]["block"] if item else None)
+
+    prices = await get_prices_at_blocks(
+        network=chain,
+        items=[
+            (address, block)
+            for block in set(blocks)
+            if block
+            for address in token_addresses
+        ],
+    )
+
+    result = []
+    _current_prices = None
+    for timestamp, block in zip(timestamps, blocks):
+        token_prices = {
+            address: prices[(address, block)]
+            for address in token_addresses
+            if (address, block) in prices
+        }
+        if not token_prices and default_to_current:
+            logging.getLogger(__name__).warning(
+                f" Using current prices for {chain} at {timestamp}."
+            )
+            if _current_prices is None:
+                _current_prices = {
+                    x["address"]: x for x in await get_current_prices(network=chain)
+                }
+            token_prices = _current_prices
+        result.append(token_prices)
+
+    return result
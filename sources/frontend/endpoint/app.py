@@ -1,8 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from endpoint.config.cache import init_cache
 
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
 
 from sources.frontend.endpoint.routers import build_routers
 
@@ -29,6 +28,6 @@ def create_app(
 
     @app.on_event("startup")
     async def startup():
-        FastAPICache.init(InMemoryBackend())
+        init_cache()
 
     return app
@@ -1,9 +1,8 @@
-import asyncio
 from datetime import datetime, timezone
 import logging
 from fastapi import HTTPException, Query, Response, APIRouter, status
 from fastapi.responses import StreamingResponse
-from fastapi_cache.decorator import cache
+from endpoint.config.cache import cache, uncached_result
 
 from endpoint.config.cache import (
     DAILY_CACHE_TIMEOUT,
@@ -15,6 +14,7 @@ from endpoint.routers.template import (
     router_builder_baseTemplate,
 )
 from sources.common.general.enums import Period, int_to_chain, int_to_period
+from sources.common.general.fan_out import fan_out_chains
 from sources.common.general.utils import filter_addresses
 from sources.frontend.bins.analytics import (
     build_hypervisor_returns_graph,
@@ -33,6 +33,7 @@ from sources.frontend.bins.revenue_stats import get_revenue_stats
 from sources.frontend.bins.users import get_user_positions
 
 from sources.mongo.bins.apps.returns import build_hype_return_analysis_from_database
+from sources.mongo.bins.helpers import user_activity_chains
 from sources.subgraph.bins.common.hypervisor import unified_hypervisors_data
 from sources.subgraph.bins.enums import Chain, Protocol
 
@@ -446,13 +447,16 @@ class frontend_user_router_builder_main(router_builder_baseTemplate):
         if chain:
             return await get_user_positions(user_address=address, chain=chain)
         else:
-            items = await asyncio.gather(
-                *[
-                    get_user_positions(user_address=address, chain=cha)
-                    for cha in list(Chain)
-                ]
+            # only chains where the user has operations
+            items = await fan_out_chains(
+                lambda cha: get_user_positions(user_address=address, chain=cha),
+                chains=await user_activity_chains(user_address=address),
             )
-            return [x for xs in items for x in xs]
+            result = [x for xs in items.values() for x in xs]
+            if items.partial:
+                # partial results are not cached
+                raise uncached_result(result, headers=items.headers)
+            return result
 
 
 class frontend_hypervisor_router_builder_main(router_builder_baseTemplate):
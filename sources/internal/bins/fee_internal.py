@@ -1,4 +1,3 @@
-import asyncio
 from datetime import datetime, timezone
 import logging
 
@@ -29,6 +28,17 @@ from sources.subgraph.bins.config import DEPLOYMENTS
 from sources.web3.bins.w3.helpers import build_erc20_helper, build_hypervisor
 
 
+def _status_tokens(hypervisor_status: dict[str, dict]) -> list[str]:
+    """Token addresses of the hypervisors' pools"""
+    return list(
+        {
+            status["pool"][token]["address"]
+            for status in hypervisor_status.values()
+            for token in ("token0", "token1")
+        }
+    )
+
+
 async def get_fees(
     chain: Chain,
     protocol: Protocol | None = None,
@@ -65,51 +75,24 @@ async def get_fees(
     # create result dict
     output = {}
 
+    # get all hypervisors last status from the database ( at the end of the period, when supplied )
+    last_hypervisor_status = await local_database_helper(
+        network=chain
+    ).get_latest_status(
+        protocol=protocol,
+        block=end_block if start_block and end_block else None,
+        timestamp=end_timestamp if start_timestamp and end_timestamp else None,
+    )
+
     # get hypervisors prices at the end of the period
     token_prices = await get_database_prices_closeto(
         chain=chain,
         timestamp=end_timestamp,
         block=end_block,
         default_to_current=True,
+        token_addresses=_status_tokens(last_hypervisor_status),
     )
 
-    # get all hypervisors last status from the database
-    query_hype_status = [
-        {"$sort": {"block": -1}},
-        {
-            "$group": {
-                "_id": "$address",
-                "data": {"$first": "$$ROOT"},
-            }
-        },
-    ]
-    # create a match query part
-    match = {}
-    # filter by protocol
-    if protocol:
-        match["dex"] = protocol.database_name
-    # filter by block or timestamp, when supplied
-    if start_block and end_block:
-        match["$and"] = [{"block": {"$gte": start_block}, "block": {"$lte": end_block}}]
-    elif start_timestamp and end_timestamp:
-        match["$and"] = [
-            {
-                "timestamp": {"$gte": start_timestamp},
-                "timestamp": {"$lte": end_timestamp},
-            }
-        ]
-    # add match to query
-    if match:
-        query_hype_status.insert(0, {"$match": match})
-
-    last_hypervisor_status = {
-        x["data"]["address"]: x["data"]
-        for x in await local_database_helper(network=chain).get_items_from_database(
-            collection_name="status",
-            aggregate=query_hype_status,
-        )
-    }
-
     # set default period
     if not start_block and not start_timestamp:
         start_timestamp = int(datetime.now(timezone.utc).timestamp() - (86400 * 30))
@@ -313,71 +296,41 @@ async def get_gross_fees(
     # create result dict
     output = {}
 
-    # get all hypervisors last status from the database
-    query_last_hype_status = [
-        {"$sort": {"block": -1}},
-        {
-            "$group": {
-                "_id": "$address",
-                "last": {"$first": "$$ROOT"},
-                "first": {"$last": "$$ROOT"},
-            }
-        },
-    ]
-    # create a match query part
-    match = {}
-
-    # filter by hypervisor addresses or by protocol
-    if hypervisor_addresses:
-        match["address"] = {"$in": hypervisor_addresses}
-    elif protocol:
-        match["dex"] = protocol.database_name
-
     # filter by block or timestamp, when supplied
+    period = {}
     if start_block and end_block:
-        match["$and"] = [{"block": {"$gte": start_block}, "block": {"$lte": end_block}}]
+        period = {"block_ini": start_block, "block_end": end_block}
     elif start_timestamp and end_timestamp:
-        match["$and"] = [
-            {
-                "timestamp": {"$gte": start_timestamp},
-            },
-            {
-                "timestamp": {"$lte": end_timestamp},
-            },
-        ]
-    # add match to query
-    if match:
-        query_last_hype_status.insert(0, {"$match": match})
-
-    # get prices and status
-    if not prices:
-        token_prices, last_hype_status_data = await asyncio.gather(
-            get_database_prices_closeto(
-                chain=chain,
-                timestamp=end_timestamp,
-                block=end_block,
-                default_to_current=True,
-            ),
-            local_database_helper(network=chain).get_items_from_database(
-                collection_name="status",
-                aggregate=query_last_hype_status,
-            ),
-        )
-    else:
-        token_prices = prices
-        last_hype_status_data = await local_database_helper(
-            network=chain
-        ).get_items_from_database(
-            collection_name="status",
-            aggregate=query_last_hype_status,
-        )
+        period = {"timestamp_ini": start_timestamp, "timestamp_end": end_timestamp}
+
+    # get last known hype status for each hypervisor at the end of the period
+    local_db = local_database_helper(network=chain)
+    last_hypervisor_status = await local_db.get_latest_status(
+        hypervisor_addresses=hypervisor_addresses,
+        protocol=protocol,
+        block=period.get("block_end"),
+        timestamp=period.get("timestamp_end"),
+    )
 
-    # last known hype status for each hypervisor at the end of the period
-    last_hypervisor_status = {}
-    first_hypervisor_status = {}
-    for status in last_hype_status_data:
-        last_hypervisor_status[status["_id"]] = status["last"]
-        first_hypervisor_status[status["_id"]] = status["first"]
+    # get prices
+    token_prices = prices or await get_database_prices_closeto(
+        chain=chain,
+        timestamp=end_timestamp,
+        block=end_block,
+        default_to_current=True,
+        token_addresses=_status_tokens(last_hypervisor_status),
+    )
+
+    # first known hype status for each hypervisor in the period
+    first_hypervisor_status = await local_db.get_first_status(
+        hypervisor_addresses=list(last_hypervisor_status.keys()), **period
+    )
+    # hypervisors without status in the period
+    last_hypervisor_status = {
+        address: status
+        for address, status in last_hypervisor_status.items()
+        if address in first_hypervisor_status
+    }
 
     # when no hypes are found, return empty output
     if not last_hypervisor_status:
@@ -8,6 +8,7 @@ from fastapi import HTTPException
 
 from sources.common.formulas.fees import convert_feeProtocol
 from sources.common.general.enums import text_to_protocol
+from sources.common.general.fan_out import fan_out_chains
 from sources.common.prices.helpers import (
     get_current_prices,
     get_database_prices_closeto,
@@ -36,12 +37,6 @@ async def get_average_tvl(
     hypervisors: list[str] | None = None,
     prices: dict[str, dict] | None = None,
 ) -> dict:
-    # define chains
-    if chain:
-        chains = [chain]
-    else:
-        chains = list(Chain)
-
     # build hypervisor data query
     _query = _query_average_tvl_static(
         protocol=protocol,
@@ -57,8 +52,7 @@ async def get_average_tvl(
         "chains": {},  #  "chain": "" "average_tvl": 0, "hypervisors": []},
     }
 
-    # execute tasks
-    for chain in chains:
+    async def _chain_average_tvl(chain: Chain) -> dict:
         chain_output = {
             "chain_id": chain.id,
             "chain": chain.fantasy_name,
@@ -108,8 +102,6 @@ async def get_average_tvl(
             except Exception as e:
                 logging.getLogger(__name__).error(f" Error  {e}")
 
-            # add to global output
-            output["average_tvl"] += av_tvl
             # add to chain output
             chain_output["average_tvl"] += av_tvl
             chain_output["hypervisors"].append(
@@ -122,7 +114,20 @@ async def get_average_tvl(
                 }
             )
 
+        return chain_output
+
+    # execute tasks
+    if chain:
+        results = {chain: await _chain_average_tvl(chain)}
+    else:
+        items = await fan_out_chains(_chain_average_tvl)
+        results = items.results
+        if items.partial:
+            # chains missing from the totals
+            output["errors"] = items.error_report()
+    for chain, chain_output in results.items():
         # add to global output
+        output["average_tvl"] += chain_output["average_tvl"]
         output["chains"][chain.id] = chain_output
 
     return output
@@ -136,12 +141,6 @@ async def get_transactions(
     hypervisors: list[str] | None = None,
     prices: dict[str, dict] | None = None,
 ) -> dict:
-    # define chains
-    if chain:
-        chains = [chain]
-    else:
-        chains = list(Chain)
-
     # build hypervisor data query
     _query = _query_transactions_operations(
         protocol=protocol,
@@ -161,8 +160,7 @@ async def get_transactions(
         "days_period": days,
     }  #  <chain>:{<transaction type>: { } }
 
-    # execute tasks
-    for chain in chains:
+    async def _chain_transactions(chain: Chain) -> dict:
         chain_output = {
             "chain_id": chain.id,
             "chain": chain.fantasy_name,
@@ -280,6 +278,19 @@ async def get_transactions(
                 reverse=True,
             )
 
+        return chain_output
+
+    # execute tasks
+    if chain:
+        results = {chain: await _chain_transactions(chain)}
+    else:
+        items = await fan_out_chains(_chain_transactions)
+        results = items.results
+        if items.partial:
+            # chains missing from the output
+            output["errors"] = items.error_report()
+    for chain, chain_output in results.items():
+        if chain_output["hypervisors"]:
             # add to total output
             output[chain.id] = chain_output
 
@@ -350,24 +361,31 @@ async def get_users_activity(
         hypervisors (list[str] | None, optional): list of hypervisor addresses to filter. Defaults to None.
 
     Returns:
-        dict: { "total_users": int, "addresses": { "address": int, ... } }
+        dict: { "total_users": int, "addresses": { "address": int, ... }, "errors": { <chain>: <error> } ( only when chains failed ) }
     """
     _query = _query_users_activity(
         ini_timestamp=ini_timestamp,
         end_timestamp=end_timestamp,
         hypervisors=hypervisors,
     )
-    chains = [chain] if chain else list(set([cha for pro, cha in DEPLOYMENTS]))
+
+    async def _chain_users(chain: Chain) -> list[dict]:
+        return await local_database_helper(network=chain).get_items_from_database(
+            collection_name="operations", aggregate=_query
+        )
 
     output = {"total_users": 0, "addresses": {}}
-    for chain_result in await asyncio.gather(
-        *[
-            local_database_helper(network=chain).get_items_from_database(
-                collection_name="operations", aggregate=_query
-            )
-            for chain in chains
-        ]
-    ):
+    if chain:
+        chain_results = [await _chain_users(chain)]
+    else:
+        items = await fan_out_chains(
+            _chain_users, chains=list(set([cha for pro, cha in DEPLOYMENTS]))
+        )
+        chain_results = items.values()
+        if items.partial:
+            # chains missing from the totals
+            output["errors"] = items.error_report()
+    for chain_result in chain_results:
         for user in chain_result:
             if user["user"] not in output["addresses"]:
                 output["addresses"][user["user"]] = user["activity_count"]
@@ -378,6 +396,138 @@ async def get_users_activity(
     return output
 
 
+## PERIODS: each metric for all periods in one aggregation
+#   period i covers ( end_timestamp - (i+1) * period_seconds, end_timestamp - i * period_seconds ]
+
+
+async def get_average_tvl_periods(
+    chain: Chain,
+    end_timestamp: int,
+    period_seconds: int,
+    periods: int,
+    prices: list[dict[str, dict]],
+    protocol: Protocol | None = None,
+    hypervisors: list[str] | None = None,
+) -> list[dict]:
+    """Average tvl of each period, as get_average_tvl
+
+    Args:
+        prices (list[dict[str, dict]]): token prices of each period
+
+    Returns:
+        list[dict]: [{ "ini_timestamp": int, "end_timestamp": int, "average_tvl": float }, ...] one for each period
+    """
+    output = [
+        {
+            "ini_timestamp": end_timestamp - (i + 1) * period_seconds,
+            "end_timestamp": end_timestamp - i * period_seconds,
+            "average_tvl": 0,
+        }
+        for i in range(periods)
+    ]
+
+    for itm in await local_database_helper(network=chain).get_items_from_database(
+        collection_name="status",
+        aggregate=_query_average_tvl_periods(
+            end_timestamp=end_timestamp,
+            period_seconds=period_seconds,
+            periods=periods,
+            protocol=protocol,
+            hypervisors=hypervisors,
+        ),
+    ):
+        # convert Decimal128 to float
+        itm = database_local.convert_decimal_to_float(
+            database_local.convert_d128_to_decimal(itm)
+        )
+        period = itm["_id"]["period"]
+        try:
+            output[period]["average_tvl"] += (
+                itm["av_tvl0"] * prices[period][itm["token0"]]["price"]
+                + itm["av_tvl1"] * prices[period][itm["token1"]]["price"]
+            )
+        except KeyError:
+            pass
+
+    return output
+
+
+async def get_transactions_periods(
+    chain: Chain,
+    end_timestamp: int,
+    period_seconds: int,
+    periods: int,
+    prices: list[dict[str, dict]],
+    hypervisors: list[dict],
+) -> list[dict]:
+    """Quantity of each transaction type in each period, as get_transactions ( only priced hypervisors are counted )
+
+    Args:
+        prices (list[dict[str, dict]]): token prices of each period
+        hypervisors (list[dict]): [{ "address": str, "token0": str, "token1": str }, ...]
+
+    Returns:
+        list[dict]: [{ "deposits_qtty": int, "withdraws_qtty": int, ... }, ...] one for each period
+    """
+    _topics = {
+        "withdraw": "withdraws_qtty",
+        "deposit": "deposits_qtty",
+        "approve": "approvals_qtty",
+        "zeroBurn": "zeroBurns_qtty",
+        "rebalance": "rebalances_qtty",
+        "transfer": "transfers_qtty",
+    }
+    output = [{x: 0 for x in _topics.values()} for _ in range(periods)]
+    tokens = {x["address"]: (x["token0"], x["token1"]) for x in hypervisors}
+
+    for itm in await local_database_helper(network=chain).get_items_from_database(
+        collection_name="operations",
+        aggregate=_query_transactions_periods(
+            end_timestamp=end_timestamp,
+            period_seconds=period_seconds,
+            periods=periods,
+            hypervisors=list(tokens.keys()),
+        ),
+    ):
+        period = itm["_id"]["period"]
+        token0, token1 = tokens[itm["_id"]["address"]]
+        if (
+            itm["_id"]["topic"] in _topics
+            and token0 in prices[period]
+            and token1 in prices[period]
+        ):
+            output[period][_topics[itm["_id"]["topic"]]] += itm["counter"]
+
+    return output
+
+
+async def get_users_activity_periods(
+    chain: Chain,
+    end_timestamp: int,
+    period_seconds: int,
+    periods: int,
+    hypervisors: list[str] | None = None,
+) -> list[int]:
+    """Quantity of users with deposits or withdraws in each period, as get_users_activity
+
+    Returns:
+        list[int]: total users of each period
+    """
+    output = [0] * periods
+    for itm in await local_database_helper(network=chain).get_items_from_database(
+        collection_name="operations",
+        aggregate=_query_users_activity_periods(
+            end_timestamp=end_timestamp,
+            period_seconds=period_seconds,
+            periods=periods,
+            hypervisors=hypervisors,
+        ),
+    ):
+        output[itm["_id"]] = itm["total_users"]
+
+    return output
+
+
 # HELPERS
 
 
@@ -599,3 +749,153 @@ def _query_users_activity(
         {"$group": {"_id": "$user", "activity_count": {"$sum": 1}}},
         {"$project": {"_id": 0, "user": "$_id", "activity_count": "$activity_count"}},
     ]
+
+
+def _query_period(end_timestamp: int, period_seconds: int) -> dict:
+    """Aggregation expression of the period index of an item timestamp"""
+    return {
+        "$toInt": {
+            "$floor": {
+                "$divide": [
+                    {"$subtract": [end_timestamp, "$timestamp"]},
+                    period_seconds,
+                ]
+            }
+        }
+    }
+
+
+def _match_periods(end_timestamp: int, period_seconds: int, periods: int) -> dict:
+    return {
+        "timestamp": {
+            "$gt": end_timestamp - periods * period_seconds,
+            "$lte": end_timestamp,
+        }
+    }
+
+
+def _query_average_tvl_periods(
+    end_timestamp: int,
+    period_seconds: int,
+    periods: int,
+    protocol: Protocol | None = None,
+    hypervisors: list[str] | None = None,
+) -> list[dict]:
+    """Database query to get the average tvl of each hypervisor and period, gathered from status totalAmounts
+
+    Returns:
+        list[dict]: executing this query will return a list of
+        {  "_id": {"address": str, "period": int},
+           "token0": str,
+           "token1": str,
+           "av_tvl0": float,
+           "av_tvl1": float,
+        }
+    """
+    _match = _match_periods(
+        end_timestamp=end_timestamp, period_seconds=period_seconds, periods=periods
+    )
+    if hypervisors:
+        _match["address"] = {"$in": [hype.lower() for hype in hypervisors]}
+    elif protocol:
+        _match["dex"] = protocol.database_name
+
+    return [
+        {"$match": _match},
+        {
+            "$project": {
+                "address": "$address",
+                "period": _query_period(end_timestamp, period_seconds),
+                "token0": "$pool.token0.address",
+                "token1": "$pool.token1.address",
+                "tvl0": {
+                    "$divide": [
+                        {"$toDecimal": "$totalAmounts.total0"},
+                        {"$pow": [10, "$pool.token0.decimals"]},
+                    ]
+                },
+                "tvl1": {
+                    "$divide": [
+                        {"$toDecimal": "$totalAmounts.total1"},
+                        {"$pow": [10, "$pool.token1.decimals"]},
+                    ]
+                },
+            }
+        },
+        {
+            "$group": {
+                "_id": {"address": "$address", "period": "$period"},
+                "token0": {"$first": "$token0"},
+                "token1": {"$first": "$token1"},
+                "av_tvl0": {"$avg": "$tvl0"},
+                "av_tvl1": {"$avg": "$tvl1"},
+            }
+        },
+    ]
+
+
+def _query_transactions_periods(
+    end_timestamp: int,
+    period_seconds: int,
+    periods: int,
+    hypervisors: list[str],
+) -> list[dict]:
+    """Database query to count the operations of each hypervisor, topic and period
+
+    Returns:
+        list[dict]: executing this query will return a list of
+        { "_id": {"address": str, "topic": str, "period": int}, "counter": int }
+    """
+    _match = _match_periods(
+        end_timestamp=end_timestamp, period_seconds=period_seconds, periods=periods
+    )
+    _match["address"] = {"$in": hypervisors}
+
+    return [
+        {"$match": _match},
+        {
+            "$group": {
+                "_id": {
+                    "address": "$address",
+                    "topic": "$topic",
+                    "period": _query_period(end_timestamp, period_seconds),
+                },
+                "counter": {"$sum": 1},
+            }
+        },
+    ]
+
+
+def _query_users_activity_periods(
+    end_timestamp: int,
+    period_seconds: int,
+    periods: int,
+    hypervisors: list[str] | None = None,
+) -> list[dict]:
+    """Using deposits and withdraws to define user activity of each period.
+
+    Returns:
+        list[dict]: executing this query will return a list of
+        { "_id": <period>, "total_users": int }
+    """
+    _match = _match_periods(
+        end_timestamp=end_timestamp, period_seconds=period_seconds, periods=periods
+    )
+    _match["topic"] = {"$in": ["deposit", "withdraw"]}
+    if hypervisors:
+        _match["address"] = {"$in": hypervisors}
+
+    return [
+        {"$match": _match},
+        {
+            "$group": {
+                "_id": {
+                    "period": _query_period(end_timestamp, period_seconds),
+                    "user": {
+                        "$cond": [{"$eq": ["$topic", "deposit"]}, "$to", "$sender"]
+                    },
+                }
+            }
+        },
+        {"$group": {"_id": "$_id.period", "total_users": {"$sum": 1}}},
+    ]
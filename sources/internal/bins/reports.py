@@ -1,17 +1,18 @@
 import asyncio
 import time
 from sources.common.general.utils import convert_to_csv
-from sources.common.prices.helpers import get_database_prices_closeto
+from sources.common.prices.helpers import get_database_prices_closeto_timestamps
 from sources.internal.bins.fee_internal import (
     get_chain_usd_fees,
     get_revenue_operations,
 )
 from sources.internal.bins.kpis import (
-    get_average_tvl,
-    get_transactions,
+    get_average_tvl_periods,
+    get_transactions_periods,
     get_transactions_summary,
-    get_users_activity,
+    get_users_activity_periods,
 )
+from sources.subgraph.bins.config import KPIS_PERIODS_CONCURRENCY
 from sources.subgraph.bins.enums import Chain, Protocol
 from sources.mongo.bins.helpers import local_database_helper, global_database_helper
 
@@ -104,94 +105,95 @@ async def get_kpis_dashboard(
     period_seconds: int | None = None,
     hypervisor_addresses: list[str] | None = None,
 ):
+    """KPIs of each period as csv. Tvl, transactions and users are aggregated for all
+    periods at once, with prices resolved in one batch. Fees and volume still need one
+    get_transactions_summary per period ( a few queries each ), so their cost grows with
+    the number of periods: at most KPIS_PERIODS_CONCURRENCY periods run at the same time
 
-    # create a list of ini_timestamp,end_timestamp tuples for each period
+    """
+    end_timestamp = end_timestamp or int(time.time())
+
+    # create a list of ini_timestamp,end_timestamp tuples for each period ( latest first )
     periods = []
     if period_seconds:
         # calculate the periods
-        _tmp_end_timestamp = end_timestamp or int(time.time())
+        _tmp_end_timestamp = end_timestamp
         while _tmp_end_timestamp > ini_timestamp:
             periods.append((_tmp_end_timestamp - period_seconds, _tmp_end_timestamp))
             _tmp_end_timestamp -= period_seconds
-
     else:
+        period_seconds = end_timestamp - (ini_timestamp or 0)
         periods.append((ini_timestamp, end_timestamp))
 
-    result = []
-    # reverse the periods
-    periods = periods[::-1]
-    for ini_time, end_time in periods:
-
-        # get prices close to the period ( to be used in the calculations)
-        _prices = await get_database_prices_closeto(
-            chain=chain,
-            timestamp=end_time,
-            default_to_current=True,
-        )
+    # hypervisors and tokens to price
+    hypervisors = await _get_hypervisors_tokens(
+        chain=chain, protocol=protocol, hypervisor_addresses=hypervisor_addresses
+    )
 
-        # Average TVL	Δ% TVL	Fees	∑ Fees	Fees / Day	Revenue	∑ Revenue	Revenue / Day	Volume	∑ Volume	Volume / Day	Cap Efficiency 	Fee APR	Incentives	∑ Incentives	Incentives / Day	Avg Price	Incentives ($)	∑ Incentives ($)	Incentives / Day ($)	Incentive APR	Incentivized LR	Deposits	Withdrawals	Compounds	Rebalances	Users	Total Txns	∑ Txns	Txns / Day	D/W Ratio
-        average_tvl, transactions_summary, user_activity, transactions = (
-            await asyncio.gather(
-                get_average_tvl(
-                    chain=chain,
-                    protocol=protocol,
-                    ini_timestamp=ini_time,
-                    end_timestamp=end_time,
-                    hypervisors=hypervisor_addresses,
-                    prices=_prices,
-                ),
-                get_transactions_summary(
-                    chain=chain,
-                    protocol=protocol,
-                    ini_timestamp=ini_time,
-                    end_timestamp=end_time,
-                    hypervisors=hypervisor_addresses,
-                    prices=_prices,
-                ),
-                get_users_activity(
-                    chain=chain,
-                    ini_timestamp=ini_time,
-                    end_timestamp=end_time,
-                    hypervisors=hypervisor_addresses,
-                ),
-                get_transactions(
-                    chain=chain,
-                    protocol=protocol,
-                    ini_timestamp=ini_time,
-                    end_timestamp=end_time,
-                    hypervisors=hypervisor_addresses,
-                    prices=_prices,
-                ),
+    # get prices close to the end of each period ( to be used in the calculations)
+    prices = await get_database_prices_closeto_timestamps(
+        chain=chain,
+        timestamps=[end_time for _, end_time in periods],
+        token_addresses=list(
+            {x["token0"] for x in hypervisors} | {x["token1"] for x in hypervisors}
+        ),
+        default_to_current=True,
+    )
+
+    # fees and volume: a limited number of periods at a time
+    semaphore = asyncio.Semaphore(KPIS_PERIODS_CONCURRENCY)
+
+    async def _transactions_summary(ini_time: int, end_time: int, _prices: dict):
+        async with semaphore:
+            return await get_transactions_summary(
+                chain=chain,
+                protocol=protocol,
+                ini_timestamp=ini_time,
+                end_timestamp=end_time,
+                hypervisors=hypervisor_addresses,
+                prices=_prices,
             )
-        )
 
-        transactions = (
-            transactions.get(chain.id, {})
-            or transactions.get(str(chain.id), {})
-            or {
-                "deposits_qtty": 0,
-                "withdraws_qtty": 0,
-                "zeroBurns_qtty": 0,
-                "rebalances_qtty": 0,
-                "transfers_qtty": 0,
-            }
-        )
+    _periods = {
+        "chain": chain,
+        "end_timestamp": end_timestamp,
+        "period_seconds": period_seconds,
+        "periods": len(periods),
+    }
+    # Average TVL	Δ% TVL	Fees	∑ Fees	Fees / Day	Revenue	∑ Revenue	Revenue / Day	Volume	∑ Volume	Volume / Day	Cap Efficiency 	Fee APR	Incentives	∑ Incentives	Incentives / Day	Avg Price	Incentives ($)	∑ Incentives ($)	Incentives / Day ($)	Incentive APR	Incentivized LR	Deposits	Withdrawals	Compounds	Rebalances	Users	Total Txns	∑ Txns	Txns / Day	D/W Ratio
+    average_tvls, transactions, users, *transactions_summaries = await asyncio.gather(
+        get_average_tvl_periods(
+            **_periods,
+            prices=prices,
+            protocol=protocol,
+            hypervisors=hypervisor_addresses,
+        ),
+        get_transactions_periods(**_periods, prices=prices, hypervisors=hypervisors),
+        get_users_activity_periods(**_periods, hypervisors=hypervisor_addresses),
+        *[
+            _transactions_summary(ini_time, end_time, _prices)
+            for (ini_time, end_time), _prices in zip(periods, prices)
+        ],
+    )
 
+    result = []
+    # from the oldest to the latest period
+    for i in reversed(range(len(periods))):
         # append the data
         result.append(
             {
-                "ini_timestamp": average_tvl["ini_timestamp"],
-                "end_timestamp": average_tvl["end_timestamp"],
-                "average_tvl": average_tvl["average_tvl"],
-                "fees": transactions_summary["fees_usd"],
-                "gross_fees": transactions_summary["gross_fees_usd"],
-                "volume": transactions_summary["volume"],
-                "deposits": transactions["deposits_qtty"],
-                "withdraws": transactions["withdraws_qtty"],
-                "compounds": transactions["zeroBurns_qtty"],
-                "rebalances": transactions["rebalances_qtty"],
-                "transfers": transactions["transfers_qtty"],
-                "users": user_activity["total_users"],
+                "ini_timestamp": periods[i][0],
+                "end_timestamp": periods[i][1],
+                "average_tvl": average_tvls[i]["average_tvl"],
+                "fees": transactions_summaries[i]["fees_usd"],
+                "gross_fees": transactions_summaries[i]["gross_fees_usd"],
+                "volume": transactions_summaries[i]["volume"],
+                "deposits": transactions[i]["deposits_qtty"],
+                "withdraws": transactions[i]["withdraws_qtty"],
+                "compounds": transactions[i]["zeroBurns_qtty"],
+                "rebalances": transactions[i]["rebalances_qtty"],
+                "transfers": transactions[i]["transfers_qtty"],
+                "users": users[i],
             }
         )
 
@@ -199,3 +201,38 @@ async def get_kpis_dashboard(
     csv_result = convert_to_csv(result)
 
     return csv_result
+
+
+async def _get_hypervisors_tokens(
+    chain: Chain,
+    protocol: Protocol | None = None,
+    hypervisor_addresses: list[str] | None = None,
+) -> list[dict]:
+    """Hypervisors of the dashboard with their token addresses
+
+    Returns:
+        list[dict]: [{ "address": str, "token0": str, "token1": str }, ...]
+    """
+    find = {}
+    if hypervisor_addresses:
+        find["address"] = {"$in": [x.lower() for x in hypervisor_addresses]}
+    elif protocol:
+        find["dex"] = protocol.database_name
+
+    return [
+        {
+            "address": x["address"],
+            "token0": x["pool"]["token0"]["address"],
+            "token1": x["pool"]["token1"]["address"],
+        }
+        for x in await local_database_helper(network=chain).get_items_from_database(
+            collection_name="static",
+            find=find,
+            projection={
+                "_id": 0,
+                "address": 1,
+                "pool.token0.address": 1,
+                "pool.token1.address": 1,
+            },
+        )
+    ]
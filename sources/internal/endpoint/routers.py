@@ -4,16 +4,19 @@ import logging
 import typing
 from fastapi import HTTPException, Query, Response, APIRouter, status
 from fastapi.responses import StreamingResponse
-from fastapi_cache.decorator import cache
+from endpoint.config.cache import cache, cache_stats, uncached_result
 from endpoint.config.cache import DB_CACHE_TIMEOUT, DAILY_CACHE_TIMEOUT
 
 from endpoint.routers.template import (
     router_builder_generalTemplate,
     router_builder_baseTemplate,
 )
+from sources.common.database.common.db_executor import mongo_executor
 from sources.common.formulas.fees import convert_feeProtocol
 from sources.common.general.enums import int_to_chain
+from sources.common.general.fan_out import PARTIAL_CHAINS_HEADER, fan_out_chains
 from sources.common.general.utils import filter_addresses
+from sources.common.prices.current import current_prices
 from sources.internal.bins.internal import (
     InternalFeeReturnsOutput,
     InternalFeeYield,
@@ -38,7 +41,12 @@ from sources.internal.bins.user import get_user_addresses, get_user_shares
 from sources.subgraph.bins.enums import Chain, Protocol
 
 from sources.subgraph.bins.config import DEPLOYMENTS
-from sources.subgraph.bins.hype_fees.fees_yield import fee_returns_all
+from sources.subgraph.bins.hype_fees.fees_yield import (
+    fee_returns_all,
+    fee_returns_all_periods,
+)
+from sources.subgraph.bins.subgraphs import subgraph_sessions
+from sources.web3.bins.w3.rpc_pool import rpc_pools_stats
 
 from ..bins.fee_internal import (
     get_chain_usd_fees,
@@ -119,9 +127,56 @@ class internal_router_builder_main(router_builder_baseTemplate):
             methods=["GET"],
         )
 
+        ## WORKER STATS
+        router.add_api_route(
+            path="/stats/database",
+            endpoint=self.database_stats,
+            methods=["GET"],
+        )
+        router.add_api_route(
+            path="/stats/cache",
+            endpoint=self.cache_stats,
+            methods=["GET"],
+        )
+        router.add_api_route(
+            path="/stats/subgraph",
+            endpoint=self.subgraph_stats,
+            methods=["GET"],
+        )
+        router.add_api_route(
+            path="/stats/rpc",
+            endpoint=self.rpc_stats,
+            methods=["GET"],
+        )
+        router.add_api_route(
+            path="/stats/prices",
+            endpoint=self.prices_stats,
+            methods=["GET"],
+        )
+
         return router
 
     # ROUTE FUNCTIONS
+    async def database_stats(self) -> dict:
+        """Database executor metrics of the worker serving this request ( running, queued and completed calls )"""
+        return mongo_executor.stats()
+
+    async def cache_stats(self) -> dict:
+        """Response cache metrics of the worker serving this request ( hits, misses and coalesced requests )"""
+        return cache_stats()
+
+    async def subgraph_stats(self) -> dict:
+        """Subgraph pooled sessions metrics of the worker serving this request ( endpoints, connections and rate limits )"""
+        return subgraph_sessions.stats()
+
+    async def rpc_stats(self) -> dict:
+        """Rpc provider health metrics of the worker serving this request ( per network and url )"""
+        return rpc_pools_stats()
+
+    async def prices_stats(self) -> dict:
+        """Current prices snapshots of the worker serving this request ( tokens, age and loads per network )"""
+        return current_prices.stats()
+
     async def fee_returns(
         self, protocol: Protocol, chain: Chain, response: Response
     ) -> dict[str, InternalFeeReturnsOutput]:
@@ -131,14 +186,29 @@ class internal_router_builder_main(router_builder_baseTemplate):
                 status_code=400, detail=f"{protocol} on {chain} not available."
             )
 
-        results = await asyncio.gather(
-            fee_returns_all(protocol, chain, 1, return_total=True),
-            fee_returns_all(protocol, chain, 7, return_total=True),
-            fee_returns_all(protocol, chain, 30, return_total=True),
-            return_exceptions=True,
-        )
+        periods = [1, 7, 30]
+        try:
+            results = await fee_returns_all_periods(
+                protocol, chain, periods, return_total=True, return_exceptions=True
+            )
+        except Exception as e:
+            logging.getLogger(__name__).warning(
+                f" Fee returns of all periods failed for {protocol} {chain}, querying each period. Error: {e}"
+            )
+            results = dict(
+                zip(
+                    periods,
+                    await asyncio.gather(
+                        *[
+                            fee_returns_all(protocol, chain, days, return_total=True)
+                            for days in periods
+                        ],
+                        return_exceptions=True,
+                    ),
+                )
+            )
 
-        result_map = {"daily": results[0], "weekly": results[1], "monthly": results[2]}
+        result_map = {"daily": results[1], "weekly": results[7], "monthly": results[30]}
 
         output = {}
 
@@ -250,8 +320,8 @@ class internal_router_builder_main(router_builder_baseTemplate):
 
         if not chain:
             output = {}
-            requests = [
-                get_chain_usd_fees(
+            items = await fan_out_chains(
+                lambda cha: get_chain_usd_fees(
                     chain=cha,
                     protocol=None,
                     start_timestamp=start_timestamp,
@@ -259,11 +329,8 @@ class internal_router_builder_main(router_builder_baseTemplate):
                     start_block=start_block,
                     end_block=end_block,
                 )
-                for cha in Chain
-            ]
-
-            items = await asyncio.gather(*requests)
-            for item in items:
+            )
+            for item in items.report(response).values():
                 for k, v in item.items():
                     if not k in output:
                         output[k] = v
@@ -357,35 +424,38 @@ class internal_router_builder_main(router_builder_baseTemplate):
             for week in range(weeks)
         ]
 
-        # build requests
-        requests = []
+        # get all data
         if not chain:
-            requests = [
-                get_chain_usd_fees(
-                    chain=cha,
-                    protocol=None,
-                    start_timestamp=st,
-                    end_timestamp=et,
-                    weeknum=weeknum + 1,
+            # all weeks of each chain
+            items = await fan_out_chains(
+                lambda cha: asyncio.gather(
+                    *[
+                        get_chain_usd_fees(
+                            chain=cha,
+                            protocol=None,
+                            start_timestamp=st,
+                            end_timestamp=et,
+                            weeknum=weeknum + 1,
+                        )
+                        for weeknum, st, et in week_timestamps
+                    ]
                 )
-                for weeknum, st, et in week_timestamps
-                for cha in Chain
-            ]
+            )
+            result = [x for xs in items.report(response).values() for x in xs]
         else:
             # build output structure for each week
-            requests = [
-                get_chain_usd_fees(
-                    chain=chain,
-                    protocol=protocol,
-                    start_timestamp=st,
-                    end_timestamp=et,
-                    weeknum=weeknum + 1,
-                )
-                for weeknum, st, et in week_timestamps
-            ]
-
-        # get all data
-        result = await asyncio.gather(*requests)
+            result = await asyncio.gather(
+                *[
+                    get_chain_usd_fees(
+                        chain=chain,
+                        protocol=protocol,
+                        start_timestamp=st,
+                        end_timestamp=et,
+                        weeknum=weeknum + 1,
+                    )
+                    for weeknum, st, et in week_timestamps
+                ]
+            )
 
         # build output structure for each week
         if not chain:
@@ -454,12 +524,15 @@ class internal_router_builder_main(router_builder_baseTemplate):
                 chain=chain, hypervisor_address=hypervisor_address
             )
         else:
-            return await asyncio.gather(
-                *[
-                    get_user_addresses(chain=cha, hypervisor_address=hypervisor_address)
-                    for cha in list(Chain)
-                ]
+            items = await fan_out_chains(
+                lambda cha: get_user_addresses(
+                    chain=cha, hypervisor_address=hypervisor_address
+                )
             )
+            if items.partial:
+                # partial results are not cached
+                raise uncached_result(items.values(), headers=items.headers)
+            return items.values()
 
     @cache(expire=DB_CACHE_TIMEOUT)
     async def user_shares(
@@ -504,21 +577,22 @@ class internal_router_builder_main(router_builder_baseTemplate):
                 include_operations=include_operations,
             )
         else:
-            return await asyncio.gather(
-                *[
-                    get_user_shares(
-                        user_address=address,
-                        chain=cha,
-                        timestamp_ini=timestamp_ini,
-                        timestamp_end=timestamp_end,
-                        block_ini=block_ini,
-                        block_end=block_end,
-                        hypervisor_address=hypervisor_address,
-                        include_operations=include_operations,
-                    )
-                    for cha in list(Chain)
-                ]
+            items = await fan_out_chains(
+                lambda cha: get_user_shares(
+                    user_address=address,
+                    chain=cha,
+                    timestamp_ini=timestamp_ini,
+                    timestamp_end=timestamp_end,
+                    block_ini=block_ini,
+                    block_end=block_end,
+                    hypervisor_address=hypervisor_address,
+                    include_operations=include_operations,
+                )
             )
+            if items.partial:
+                # partial results are not cached
+                raise uncached_result(items.values(), headers=items.headers)
+            return items.values()
 
 
 class internal_router_builder_KPIs(router_builder_baseTemplate):
@@ -699,12 +773,18 @@ class internal_router_builder_KPIs(router_builder_baseTemplate):
         ),
     ):
         """Returns a list of unique users activity, measured as deposits and withdraws."""
-        return await get_users_activity(
+        result = await get_users_activity(
             chain=chain,
             ini_timestamp=ini_timestamp,
             end_timestamp=end_timestamp,
             hypervisors=filter_addresses(hypervisors),
         )
+        if "errors" in result:
+            # partial results are not cached
+            raise uncached_result(
+                result, headers={PARTIAL_CHAINS_HEADER: ",".join(result["errors"])}
+            )
+        return result
 
 
 class internal_router_builder_reports(router_builder_baseTemplate):
@@ -3,6 +3,7 @@ from sources.common.general.enums import Chain, Protocol
 from sources.common.database.collection_endpoint import database_global, database_local
 
 from sources.common.database.common.collections_common import db_collections_common
+from sources.common.prices.helpers import LAST_BLOCK
 
 from sources.web3.bins.database.db_raw_direct_info import direct_db_hypervisor_info
 
@@ -30,71 +31,41 @@ async def hypervisors_list(
     Returns:
         list[dict]: list of hypervisor(s) snapshots.
     """
-    _collection_name = "static"
+    local_db = local_database_helper(network=network)
 
-    _query = []
+    _find = {}
     if protocol:
-        _query.append({"$match": {"dex": protocol.database_name}})
-
+        _find["dex"] = protocol.database_name
     if hypervisor_address:
-        _query[0]["$match"]["address"] = hypervisor_address.lower()
+        _find["address"] = hypervisor_address.lower()
 
-    _filter_data = (
-        [block, "$block"] if block else [timestamp, "$timestamp"] if timestamp else None
-    )
+    _addresses = [
+        item["address"]
+        for item in await local_db.get_items_from_database(
+            collection_name="static", find=_find, projection={"address": 1}
+        )
+    ]
 
-    if _filter_data:
+    if block or timestamp:
         # closest to block or timestamp hype status found in database
-        _query += [
-            {
-                "$lookup": {
-                    "from": "status",
-                    "let": {"op_address": "$address"},
-                    "pipeline": [
-                        {"$match": {"$expr": {"$eq": ["$address", "$$op_address"]}}},
-                        {
-                            "$addFields": {
-                                "diff": {"$abs": {"$subtract": [block, "$block"]}}
-                            }
-                        },
-                        {"$sort": {"diff": 1}},
-                        {"$limit": 1},
-                        {"$unset": ["_id"]},
-                    ],
-                    "as": "status",
-                }
-            },
-            {"$unwind": {"path": "$status", "preserveNullAndEmptyArrays": False}},
-            {"$replaceRoot": {"newRoot": "$status"}},
-        ]
+        _field, _value = ("block", block) if block else ("timestamp", timestamp)
+        _status = await local_db.get_nearest_items(
+            collection_name="status",
+            field=_field,
+            value=_value,
+            keys=[{"address": address} for address in _addresses],
+        )
     else:
         # last hype status found in database
-        _query += [
-            {
-                "$lookup": {
-                    "from": "status",
-                    "let": {"op_address": "$address"},
-                    "pipeline": [
-                        {"$match": {"$expr": {"$eq": ["$address", "$$op_address"]}}},
-                        {"$sort": {"block": -1}},
-                        {"$limit": 1},
-                        {"$unset": ["_id"]},
-                    ],
-                    "as": "status",
-                }
-            },
-            {"$unwind": {"path": "$status", "preserveNullAndEmptyArrays": False}},
-            {"$replaceRoot": {"newRoot": "$status"}},
-        ]
+        _last_status = await local_db.get_latest_status(hypervisor_addresses=_addresses)
+        _status = [_last_status.get(address) for address in _addresses]
 
     # remove ids from result
-    _query.append({"$project": {"_id": 0, "id": 0}})
-
-    # return the result
-    return await local_database_helper(network=network).get_items_from_database(
-        collection_name=_collection_name,
-        aggregate=_query,
-    )
+    return [
+        {k: v for k, v in item.items() if k not in ("_id", "id")}
+        for item in _status
+        if item
+    ]
 
 
 async def hypervisors_last_snapshot(
@@ -270,6 +241,7 @@ async def hypervisor_collected_fees(
 
 
 async def get_hypervisor_last_status(network: Chain, address: str) -> dict:
+    hypervisor_data = {}
     try:
         # get hypervisor's last status found in database
         hypervisor_data = await local_database_helper(
@@ -289,34 +261,44 @@ async def get_hypervisor_last_status(network: Chain, address: str) -> dict:
     return hypervisor_data
 
 
-async def get_hypervisor_prices(hypervisor_address: str, network: Chain) -> dict:
+async def get_hypervisor_prices(
+    hypervisor_address: str, network: Chain
+) -> dict | None:
+    """ Get the latest hypervisor tokens and per share usd prices found in database.
+        None when the hypervisor status or any of its token prices is not found
+    """
     hype_last_status = await get_hypervisor_last_status(
         network=network, address=hypervisor_address
     )
-    """ Get the latest hypervisor tokens and per share usd prices found in database. """
-
-    price_token0, price_token1 = await asyncio.gather(
-        global_database_helper().get_items_from_database(
-            collection_name="usd_prices",
-            find={
-                "network": network.database_name,
-                "address": hype_last_status["pool"]["token0"]["address"],
-            },
-            projection={"_id": 0, "id": 0, "address": 0, "network": 0},
-            sort=[("block", -1)],
-            limit=1,
-        ),
-        global_database_helper().get_items_from_database(
-            collection_name="usd_prices",
-            find={
-                "network": network.database_name,
-                "address": hype_last_status["pool"]["token1"]["address"],
-            },
-            projection={"_id": 0, "id": 0, "address": 0, "network": 0},
-            sort=[("block", -1)],
-            limit=1,
-        ),
+    if not hype_last_status:
+        return None
+
+    # last usd_prices item of both tokens, in one query
+    token_addresses = [
+        hype_last_status["pool"]["token0"]["address"],
+        hype_last_status["pool"]["token1"]["address"],
+    ]
+    items = await global_database_helper().get_nearest_items(
+        collection_name="usd_prices",
+        field="block",
+        value=LAST_BLOCK,
+        keys=[{"address": address} for address in token_addresses],
+        find={"network": network.database_name},
+        before_only=True,
     )
+    if not all(items):
+        return None
+    # usd_prices items without ids
+    price_token0, price_token1 = [
+        [
+            {
+                k: v
+                for k, v in item.items()
+                if k not in ("_id", "id", "address", "network")
+            }
+        ]
+        for item in items
+    ]
 
     try:
         # convert hypervisor string to floats
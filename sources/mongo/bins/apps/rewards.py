@@ -1,7 +1,10 @@
 import asyncio
+from array import array
 from datetime import datetime, timezone
+import json
 import logging
 import time
+from typing import AsyncIterator
 from sources.common.database.collection_endpoint import database_global
 from sources.common.general.enums import Chain, Protocol
 from sources.common.xt_api.ramses import ramses_api_helper
@@ -928,8 +931,141 @@ def calculate_twa(b, s, t1, t0):
     return (b / s) * (t1 - t0)
 
 
-# TODO: in devtest
-async def calculate_gamma_merkle_rewards(
+class _merkle_rewards_accumulator:
+    """Compact per user-hypervisor TWAB accumulators
+
+    Addresses are stored once and referenced by index, while each user-hypervisor
+    item is kept as a row of parallel arrays ( no nested dicts per user ).
+    """
+
+    def __init__(self):
+        self.users: list[str] = []
+        self.hypervisors: list[str] = []
+        self._users_idx: dict[str, int] = {}
+        self._hypervisors_idx: dict[str, int] = {}
+
+        # rows
+        self.row_user = array("L")
+        self.row_hypervisor = array("L")
+        self.row_operations = array("L")
+        self.row_first_shares_balance: list[int] = []
+        self.row_last_shares_balance: list[int] = []
+        self.row_twab_points: list[int] = []
+
+        # per hypervisor totals ( indexed by hypervisor index )
+        self.hypervisors_twab_points: list[int] = []
+        self.hypervisors_operations: list[int] = []
+
+    def _user_index(self, user_address: str) -> int:
+        if (idx := self._users_idx.get(user_address)) is None:
+            idx = self._users_idx[user_address] = len(self.users)
+            self.users.append(user_address)
+        return idx
+
+    def _hypervisor_index(self, hypervisor_address: str) -> int:
+        if (idx := self._hypervisors_idx.get(hypervisor_address)) is None:
+            idx = self._hypervisors_idx[hypervisor_address] = len(self.hypervisors)
+            self.hypervisors.append(hypervisor_address)
+            self.hypervisors_twab_points.append(0)
+            self.hypervisors_operations.append(0)
+        return idx
+
+    def add(
+        self,
+        user_address: str,
+        hypervisor_address: str,
+        first_shares_balance: int,
+        last_shares_balance: int,
+        twab_points: int,
+        operations: int,
+    ):
+        hype_idx = self._hypervisor_index(hypervisor_address)
+        self.row_user.append(self._user_index(user_address))
+        self.row_hypervisor.append(hype_idx)
+        self.row_first_shares_balance.append(first_shares_balance)
+        self.row_last_shares_balance.append(last_shares_balance)
+        self.row_twab_points.append(twab_points)
+        self.row_operations.append(operations)
+
+        self.hypervisors_twab_points[hype_idx] += twab_points
+        self.hypervisors_operations[hype_idx] += operations
+
+    def rows(self):
+        """Iterate over user-hypervisor results, including their twab percentage"""
+        _chekc_total_percentage = 0
+        for idx in range(len(self.row_user)):
+            user_address = self.users[self.row_user[idx]]
+            hype_idx = self.row_hypervisor[idx]
+            twab_points = self.row_twab_points[idx]
+            twab_percentage = 0
+
+            if self.hypervisors_twab_points[hype_idx] == 0 and twab_points != 0:
+                logging.getLogger(__name__).error(
+                    f"TWAB points for user {user_address} and hypervisor {self.hypervisors[hype_idx]} is not correct. Total TWAB points for the hypervisor is 0"
+                )
+            elif self.hypervisors_twab_points[hype_idx] != 0:
+                twab_percentage = twab_points / self.hypervisors_twab_points[hype_idx]
+                _chekc_total_percentage += twab_percentage
+
+            yield {
+                "user_address": user_address,
+                "hypervisor_address": self.hypervisors[hype_idx],
+                "first_shares_balance": self.row_first_shares_balance[idx],
+                "last_shares_balance": self.row_last_shares_balance[idx],
+                "operations": self.row_operations[idx],
+                "twab_points": twab_points,
+                "twab_percentage": twab_percentage,
+            }
+
+        if _chekc_total_percentage != 1:
+            logging.getLogger(__name__).error(
+                f"Total TWAB percentage is not 1. Total is {_chekc_total_percentage}"
+            )
+
+
+def _calculate_user_hypervisor_twab(
+    userHype: dict, time_key: str, first_timeBlock: int
+) -> int:
+    """Calculate the TWAB points of a user_operations aggregation item ( one user - hypervisor pair )"""
+    twab_points = 0
+    for idx, operation in enumerate(userHype["operations"]):
+        time_passed = operation[time_key] - (
+            first_timeBlock if idx == 0 else userHype["operations"][idx - 1][time_key]
+        )
+
+        # calculate TWAB
+        twab_points += time_passed * (
+            int(userHype["first_shares_balance"])
+            if idx == 0
+            else int(userHype["operations"][idx - 1]["shares"]["balance"])
+        )
+
+        # TODO: delete check on production
+        if (
+            int(userHype["first_shares_balance"])
+            if idx == 0
+            else int(userHype["operations"][idx - 1]["shares"]["balance"])
+        ) + int(operation["shares"]["flow"]) != int(operation["shares"]["balance"]):
+            # Just because balance is at the end of the block, check if there are more operations with the same block that match the balance
+            if (
+                idx + 1 <= len(userHype["operations"]) - 1
+                and userHype["operations"][idx + 1]["block"] == operation["block"]
+            ):
+                continue
+            elif (
+                idx > 0
+                and userHype["operations"][idx - 1]["block"] == operation["block"]
+            ):
+                continue
+            # operations are missing
+            logging.getLogger(__name__).error(
+                f"User {userHype['user_address']} shares are not correct. Operations are missing for hype {userHype['hypervisor_address']} between {time_key}s {first_timeBlock if idx == 0 else userHype['operations'][idx - 1][time_key]} and {operation[time_key]}"
+            )
+
+    return twab_points
+
+
+async def _accumulate_gamma_merkle_rewards(
     chain: Chain,
     user_address: str | None = None,
     timestamp_ini: int | None = None,
@@ -937,14 +1073,17 @@ async def calculate_gamma_merkle_rewards(
     block_ini: int | None = None,
     block_end: int | None = None,
     hypervisor_address: str | None = None,
-):
+) -> _merkle_rewards_accumulator:
+    """Consume the user_operations aggregation cursor incrementally, keeping only compact accumulators"""
 
-    _startime = time.time()
+    # define initial timestamp or block
+    _time_key = "block" if block_ini else "timestamp"
+    first_timeBlock = block_ini or timestamp_ini
 
-    # { <user_address>: {<hypervisor_address>:{...data..} } }
-    users_result = {}
-    hypervisors_totals = {}
-    for userHype in await local_database_helper(network=chain).get_items_from_database(
+    accumulator = _merkle_rewards_accumulator()
+    async for userHype in local_database_helper(
+        network=chain
+    ).stream_items_from_database(
         collection_name="user_operations",
         aggregate=query_user_shares_from_user_operations(
             user_address=user_address,
@@ -954,6 +1093,7 @@ async def calculate_gamma_merkle_rewards(
             block_end=block_end,
             hypervisor_address=hypervisor_address,
         ),
+        allowDiskUse=True,
     ):
         # check if user has balance or activity within the period
         if (
@@ -967,105 +1107,85 @@ async def calculate_gamma_merkle_rewards(
             )
             continue
 
-        # create result structure
-        if not userHype["user_address"] in users_result:
-            users_result[userHype["user_address"]] = {}
-        if not userHype["hypervisor_address"] in users_result[userHype["user_address"]]:
-            users_result[userHype["user_address"]][userHype["hypervisor_address"]] = {
-                "first_shares_balance": int(userHype["first_shares_balance"]),
-                "last_shares_balance": int(userHype["last_shares_balance"]),
-                "operations": 0,
-                "twab_points": 0,
-                "twab_percentage": 0,
-            }
-        if not userHype["hypervisor_address"] in hypervisors_totals:
-            hypervisors_totals[userHype["hypervisor_address"]] = {
-                "twab_points": 0,
-                "operations": 0,
-            }
-
-        # define initial timestamp or block
-        _time_key = "block" if block_ini else "timestamp"
-        first_timeBlock = block_ini or timestamp_ini
+        accumulator.add(
+            user_address=userHype["user_address"],
+            hypervisor_address=userHype["hypervisor_address"],
+            first_shares_balance=int(userHype["first_shares_balance"]),
+            last_shares_balance=int(userHype["last_shares_balance"]),
+            twab_points=_calculate_user_hypervisor_twab(
+                userHype=userHype, time_key=_time_key, first_timeBlock=first_timeBlock
+            ),
+            operations=len(userHype["operations"]),
+        )
 
-        # calculate TWAB for the user
-        for idx, operation in enumerate(userHype["operations"]):
+    return accumulator
 
-            time_passed = operation[_time_key] - (
-                first_timeBlock
-                if idx == 0
-                else userHype["operations"][idx - 1][_time_key]
-            )
 
-            # calculate TWAB
-            _twab_points = time_passed * (
-                int(userHype["first_shares_balance"])
-                if idx == 0
-                else int(userHype["operations"][idx - 1]["shares"]["balance"])
-            )
-            users_result[userHype["user_address"]][userHype["hypervisor_address"]][
-                "twab_points"
-            ] += _twab_points
-            hypervisors_totals[userHype["hypervisor_address"]][
-                "twab_points"
-            ] += _twab_points
-            users_result[userHype["user_address"]][userHype["hypervisor_address"]][
-                "operations"
-            ] += 1
-            hypervisors_totals[userHype["hypervisor_address"]]["operations"] += 1
-
-            # TODO: delete check on production
-            if (
-                int(userHype["first_shares_balance"])
-                if idx == 0
-                else int(userHype["operations"][idx - 1]["shares"]["balance"])
-            ) + int(operation["shares"]["flow"]) != int(operation["shares"]["balance"]):
-                # Just because balance is at the end of the block, check if there are more operations with the same block that match the balance
-                if (
-                    idx + 1 <= len(userHype["operations"]) - 1
-                    and userHype["operations"][idx + 1]["block"] == operation["block"]
-                ):
-                    continue
-                elif (
-                    idx > 0
-                    and userHype["operations"][idx - 1]["block"] == operation["block"]
-                ):
-                    continue
-                # operations are missing
-                logging.getLogger(__name__).error(
-                    f"User {userHype['user_address']} shares are not correct. Operations are missing for hype {userHype['hypervisor_address']} between {_time_key}s {first_timeBlock if idx == 0 else userHype['operations'][idx - 1][_time_key]} and {operation[_time_key]}"
-                )
+# TODO: in devtest
+async def calculate_gamma_merkle_rewards(
+    chain: Chain,
+    user_address: str | None = None,
+    timestamp_ini: int | None = None,
+    timestamp_end: int | None = None,
+    block_ini: int | None = None,
+    block_end: int | None = None,
+    hypervisor_address: str | None = None,
+) -> dict:
+    """Users TWAB points and percentages of the hypervisors
 
-    # calculate twab_percentage using hypervisors_totals
-    _chekc_total_percentage = 0
-    for user_address, hypervisors in users_result.items():
-        for hypervisor_address, data in hypervisors.items():
+    Returns:
+        dict: { <user_address>: {<hypervisor_address>:{...data..} } }
+    """
 
-            if (
-                hypervisors_totals[hypervisor_address]["twab_points"] == 0
-                and data["twab_points"] != 0
-            ):
-                logging.getLogger(__name__).error(
-                    f"TWAB points for user {user_address} and hypervisor {hypervisor_address} is not correct. Total TWAB points for the hypervisor is 0"
-                )
-                continue
-            elif hypervisors_totals[hypervisor_address]["twab_points"] == 0:
-                # no twab points for this hypervisor and user. Skip
-                continue
+    _startime = time.time()
 
-            data["twab_percentage"] = (
-                data["twab_points"]
-                / hypervisors_totals[hypervisor_address]["twab_points"]
-            )
-            _chekc_total_percentage += data["twab_percentage"]
+    accumulator = await _accumulate_gamma_merkle_rewards(
+        chain=chain,
+        user_address=user_address,
+        timestamp_ini=timestamp_ini,
+        timestamp_end=timestamp_end,
+        block_ini=block_ini,
+        block_end=block_end,
+        hypervisor_address=hypervisor_address,
+    )
 
-    if _chekc_total_percentage != 1:
-        logging.getLogger(__name__).error(
-            f"Total TWAB percentage is not 1. Total is {_chekc_total_percentage}"
-        )
+    users_result = {}
+    for row in accumulator.rows():
+        users_result.setdefault(row.pop("user_address"), {})[
+            row.pop("hypervisor_address")
+        ] = row
 
     logging.getLogger(__name__).info(
         f" Gamma merkle rewards calculation took {time.time() - _startime:,.2f} seconds to complete"
     )
 
     return users_result
+
+
+async def stream_gamma_merkle_rewards(
+    chain: Chain,
+    user_address: str | None = None,
+    timestamp_ini: int | None = None,
+    timestamp_end: int | None = None,
+    block_ini: int | None = None,
+    block_end: int | None = None,
+    hypervisor_address: str | None = None,
+) -> AsyncIterator[str]:
+    """Same as calculate_gamma_merkle_rewards, emitted as NDJSON lines ( one user-hypervisor item per line )"""
+
+    accumulator = await _accumulate_gamma_merkle_rewards(
+        chain=chain,
+        user_address=user_address,
+        timestamp_ini=timestamp_ini,
+        timestamp_end=timestamp_end,
+        block_ini=block_ini,
+        block_end=block_end,
+        hypervisor_address=hypervisor_address,
+    )
+
+    for row in accumulator.rows():
+        # big integers as strings
+        row["first_shares_balance"] = str(row["first_shares_balance"])
+        row["last_shares_balance"] = str(row["last_shares_balance"])
+        row["twab_points"] = str(row["twab_points"])
+        yield json.dumps(row) + "\n"
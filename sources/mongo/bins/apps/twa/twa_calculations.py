@@ -56,9 +56,13 @@ async def gamma_rewards_TWA_calculation(
     timestamp_end: int | None = None,
     block_ini: int | None = None,
     block_end: int | None = None,
+    include_details: bool = True,
 ):
     """Get the time weighted average balances of users for a given hypervisor address in a given range of blocks or timestamps
 
+        Users are only accrued on their own balance changes and at the end of the period,
+        using a running integral of time passed / totalSupply ( O(operations) ).
+
     Args:
         chain (Chain):
         hypervisor_address (str):
@@ -66,6 +70,7 @@ async def gamma_rewards_TWA_calculation(
         timestamp_end (int | None, optional): _description_. Defaults to None.
         block_ini (int | None, optional): _description_. Defaults to None.
         block_end (int | None, optional): _description_. Defaults to None.
+        include_details (bool, optional): include each user's "operations" and "calculations" lists. Defaults to True.
     """
 
     # decide whether to use timestamp or block
@@ -105,35 +110,62 @@ async def gamma_rewards_TWA_calculation(
         result_data[f"{timevar_txt}_end"] - result_data[f"{timevar_txt}_ini"]
     )
 
+    # running sum of ( time passed / totalSupply ) since timevar_ini:
+    #   a user's TWA between two points is balance * ( integral_now - integral_then )
+    time_supply_integral = 0
+    # integral value at each user's last accrual
+    users_integral = {}
+
+    def accrue_user(user_address: str, timevar: int):
+        user_data = result_data["users"][user_address]
+        _twa = user_data["final_balance"] * (
+            time_supply_integral - users_integral[user_address]
+        )
+        if include_details and _twa != 0:
+            user_data["calculations"].append(
+                {
+                    f"{timevar_txt}": timevar,
+                    "time_passed": timevar - user_data["last_accrual"],
+                    "TWA": _twa,
+                    "totalSupply": last_total_supply,
+                    "balance": user_data["final_balance"],
+                }
+            )
+        user_data["TWA"] += _twa
+        result_data["total_TWA"] += _twa
+        users_integral[user_address] = time_supply_integral
+        user_data["last_accrual"] = timevar
+
     last_timevar = timevar_ini
     last_total_supply = None
     for operation in hypervisor_operations:
-
         # easy access vars
         current_timevar = operation[timevar_txt]
-
-        # for all users already processed
+        user_address = operation["user_address"]
 
         # check if user is in the dict
-        if operation["user_address"] not in result_data["users"]:
-            result_data["users"][operation["user_address"]] = {
+        if user_address not in result_data["users"]:
+            result_data["users"][user_address] = {
                 "TWA": 0,  # time weighted average balance numerator
                 "TWA_percentage": 0,
                 "initial_balance": 0,
                 "final_balance": 0,  # this is the current user balance at any point
-                "operations": [],
-                "calculations": [],
+                "last_accrual": timevar_ini,
             }
+            if include_details:
+                result_data["users"][user_address]["operations"] = []
+                result_data["users"][user_address]["calculations"] = []
+            users_integral[user_address] = time_supply_integral
 
         # if block is lower than initial block, this is the initial balance for the user
         if current_timevar < timevar_ini:
-            result_data["users"][operation["user_address"]]["initial_balance"] = (
-                operation["shares"]["balance"]
-            )
+            result_data["users"][user_address]["initial_balance"] = operation[
+                "shares"
+            ]["balance"]
             # temporary final balance is the same as initial balance
-            result_data["users"][operation["user_address"]]["final_balance"] = (
-                operation["shares"]["balance"]
-            )
+            result_data["users"][user_address]["final_balance"] = operation["shares"][
+                "balance"
+            ]
             # set initial total supply
             result_data["totalSupply_ini"] = (
                 operation["hypervisor_status"]["totalSupply"]
@@ -142,46 +174,21 @@ async def gamma_rewards_TWA_calculation(
                 "totalSupply"
             ]
             last_total_supply = result_data["totalSupply_ini"]
-        else:
-            # this is an operation after the initial block
-            last_total_supply = last_total_supply or result_data["totalSupply_ini"] or 0
+            continue
 
-            # set all users time weighted averages
-            for user_address, user_data in result_data["users"].items():
-                if user_address == operation["user_address"]:
-                    # do not calculate TWA for the user in the current operation
-                    continue
-                elif user_data["final_balance"] == 0:
-                    # if final balance is zero, do not calculate TWA
-                    continue
-
-                _calculation_to_append = {
-                    f"{timevar_txt}": operation[timevar_txt],
-                    "time_passed": current_timevar - last_timevar,
-                    "TWA": (current_timevar - last_timevar)
-                    * (user_data["final_balance"] / last_total_supply),
-                    "totalSupply": last_total_supply,
-                    "balance": user_data["final_balance"],
-                }
-                if _calculation_to_append["TWA"] != 0:
-                    user_data["calculations"].append(_calculation_to_append)
+        # this is an operation after the initial block
+        last_total_supply = last_total_supply or result_data["totalSupply_ini"] or 0
 
-                    # add to users total TWA
-                    user_data["TWA"] += (current_timevar - last_timevar) * (
-                        user_data["final_balance"] / last_total_supply
-                    )
-                    # calculate user's TWA percentage
-                    user_data["TWA_percentage"] = (
-                        user_data["TWA"] / result_data["total_time_passed"]
-                    )
+        # advance the integral up to this operation
+        if last_total_supply:
+            time_supply_integral += (current_timevar - last_timevar) / last_total_supply
 
-                    # add to hypervisor total TWA
-                    result_data["total_TWA"] += (current_timevar - last_timevar) * (
-                        user_data["final_balance"] / last_total_supply
-                    )
+        # accrue only the user whose balance is changing
+        accrue_user(user_address=user_address, timevar=current_timevar)
 
+        if include_details:
             # append operation to the user's operations list
-            result_data["users"][operation["user_address"]]["operations"].append(
+            result_data["users"][user_address]["operations"].append(
                 {
                     "block": operation["block"],
                     "timestamp": operation["timestamp"],
@@ -193,107 +200,33 @@ async def gamma_rewards_TWA_calculation(
                 }
             )
 
-            result_data["users"][operation["user_address"]]["calculations"].append(
-                {
-                    f"{timevar_txt}": operation[timevar_txt],
-                    "time_passed": current_timevar - last_timevar,
-                    "TWA": (current_timevar - last_timevar)
-                    * (
-                        (
-                            result_data["users"][operation["user_address"]][
-                                "final_balance"
-                            ]
-                            / last_total_supply
-                        )
-                        if last_total_supply
-                        else 0
-                    ),
-                    "totalSupply": last_total_supply or 0,
-                    "balance": result_data["users"][operation["user_address"]][
-                        "final_balance"
-                    ],
-                }
-            )
-
-            # set user's time weighted balance
-            result_data["users"][operation["user_address"]]["TWA"] += (
-                current_timevar - last_timevar
-            ) * (
-                (
-                    result_data["users"][operation["user_address"]]["final_balance"]
-                    / last_total_supply
-                )
-                if last_total_supply
-                else 0
-            )
-            # calculate user's TWA percentage
-            result_data["users"][operation["user_address"]]["TWA_percentage"] = (
-                (user_data["TWA"] / result_data["total_time_passed"])
-                if result_data["total_time_passed"]
-                else 0
-            )
-
-            # add to hypervisor total TWA
-            result_data["total_TWA"] += (
-                (current_timevar - last_timevar)
-                * (
-                    result_data["users"][operation["user_address"]]["final_balance"]
-                    / last_total_supply
-                )
-                if last_total_supply
-                else 0
-            )
-
-            # set user's final balance as current balance
-            result_data["users"][operation["user_address"]]["final_balance"] = (
-                operation["shares"]["balance"]
-            )
+        # set user's final balance as current balance
+        result_data["users"][user_address]["final_balance"] = operation["shares"][
+            "balance"
+        ]
 
-            last_total_supply = operation["hypervisor_status"]["totalSupply"]
+        last_total_supply = operation["hypervisor_status"]["totalSupply"]
 
-            # set last timevar as current timevar
-            last_timevar = current_timevar
+        # set last timevar as current timevar
+        last_timevar = current_timevar
 
-            # set end total supply
-            result_data["totalSupply_end"] = operation["hypervisor_status"][
-                "totalSupply"
-            ]
+        # set end total supply
+        result_data["totalSupply_end"] = operation["hypervisor_status"]["totalSupply"]
 
     # set timevar end as last operation timevar if not set
     if not timevar_end:
         timevar_end = hypervisor_operations[-1][timevar_txt]
 
-    # last calculation if last operation is not the end
-    if last_timevar < timevar_end:
-        for user_address, user_data in result_data["users"].items():
-            _calculation_to_append = {
-                f"{timevar_txt}": timevar_end,
-                "time_passed": timevar_end - last_timevar,
-                "TWA": (timevar_end - last_timevar)
-                * (user_data["final_balance"] / last_total_supply),
-                "totalSupply": last_total_supply,
-                "balance": user_data["final_balance"],
-            }
-            if _calculation_to_append["TWA"] != 0:
-                user_data["calculations"].append(_calculation_to_append)
+    # advance the integral up to the end
+    if last_timevar < timevar_end and last_total_supply:
+        time_supply_integral += (timevar_end - last_timevar) / last_total_supply
 
-                # add to users total TWA
-                user_data["TWA"] += (timevar_end - last_timevar) * (
-                    user_data["final_balance"] / last_total_supply
-                )
-                # calculate user's TWA percentage
-                user_data["TWA_percentage"] = (
-                    user_data["TWA"] / result_data["total_time_passed"]
-                )
-                # add to hypervisor total TWA
-                result_data["total_TWA"] += (timevar_end - last_timevar) * (
-                    user_data["final_balance"] / last_total_supply
-                )
-
-    # calculate users TWA percentage
+    # accrue all users up to the end and calculate their TWA percentage
     users_to_remove = []
     for user_address, user_data in result_data["users"].items():
-        # force a 1
+        accrue_user(user_address=user_address, timevar=timevar_end)
+        user_data.pop("last_accrual")
+
         user_data["TWA_percentage"] = (
             (user_data["TWA"] / result_data["total_time_passed"])
             if result_data["total_time_passed"] != 0
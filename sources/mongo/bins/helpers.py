@@ -1,3 +1,7 @@
+import asyncio
+import logging
+import time
+
 from sources.common.general.enums import Chain, Protocol
 from sources.common.database.collection_endpoint import (
     database_global,
@@ -5,21 +9,123 @@ from sources.common.database.collection_endpoint import (
     database_perps,
     database_xtrade,
 )
+from sources.common.database.common.db_executor import mongo_executor
+from sources.common.database.common.db_managers import get_mongo_client
 
 # TODO: restruct global config and local config
 from sources.subgraph.bins.config import MONGO_DB_URL
 
+# seconds the server database names are cached
+_DATABASES_REFRESH = 300
+_DATABASES = {"names": None, "loaded_at": 0}
+# min seconds between user_chains refreshes of a chain ( triggered by reads )
+_USER_CHAINS_REFRESH = 60
+# last user_chains refresh of each chain { <chain>: <monotonic time> }
+_USER_CHAINS_REFRESHED: dict[Chain, float] = {}
+# chains with user operations merged into user_chains
+_USER_CHAINS_INDEXED: set[Chain] = set()
+# user_chains refreshes running in background { <chain>: Task }
+_USER_CHAINS_TASKS: dict[Chain, asyncio.Task] = {}
+
 # General database helpers
 
 
+def local_database_name(network: Chain) -> str:
+    return f"{network.database_name}_gamma"
+
+
 def local_database_helper(network: Chain):
     """Create a local database for a hypervisor."""
     return database_local(
         mongo_url=MONGO_DB_URL,
-        db_name=f"{network.database_name}_gamma",
+        db_name=local_database_name(network),
     )
 
 
+async def local_database_chains(chains: list[Chain]) -> list[Chain]:
+    """Chains with a local database in the server ( all of them when databases can't be listed )"""
+    if (
+        _DATABASES["names"] is None
+        or time.monotonic() - _DATABASES["loaded_at"] > _DATABASES_REFRESH
+    ):
+        try:
+            _DATABASES["names"] = set(
+                await mongo_executor.run(
+                    lambda: get_mongo_client(MONGO_DB_URL).list_database_names()
+                )
+            )
+            _DATABASES["loaded_at"] = time.monotonic()
+        except Exception as e:
+            logging.getLogger(__name__).error(f" Unable to list databases. Error: {e}")
+            return chains
+
+    return [
+        chain for chain in chains if local_database_name(chain) in _DATABASES["names"]
+    ]
+
+
+async def user_activity_chains(
+    user_address: str, chains: list[Chain] | None = None
+) -> list[Chain]:
+    """Chains to query for a user: the ones where the global user_chains index has
+        user operations of the address, plus the ones not indexed yet
+
+    Args:
+        user_address (str): user_address or shadowed_user_address
+        chains (list[Chain] | None, optional): Defaults to all chains with local database.
+    """
+    chains = await local_database_chains(
+        list(Chain) if chains is None else list(chains)
+    )
+    indexed = [_refresh_user_chains(chain) for chain in chains]
+    networks = await global_database_helper().get_user_networks(
+        user_address=user_address
+    )
+    return [
+        chain
+        for chain, is_indexed in zip(chains, indexed)
+        if not is_indexed or chain.database_name in networks
+    ]
+
+
+def _refresh_user_chains(chain: Chain) -> bool:
+    """Merge the new user operations of the chain into user_chains in the background
+        ( throttled, never awaited by reads )
+
+    Returns:
+        bool: the chain is indexed
+    """
+    if (
+        chain not in _USER_CHAINS_TASKS
+        and time.monotonic() - _USER_CHAINS_REFRESHED.get(chain, 0)
+        >= _USER_CHAINS_REFRESH
+    ):
+        _USER_CHAINS_REFRESHED[chain] = time.monotonic()
+        task = _USER_CHAINS_TASKS[chain] = asyncio.create_task(
+            _update_user_chains(chain)
+        )
+        task.add_done_callback(lambda _: _USER_CHAINS_TASKS.pop(chain, None))
+    return chain in _USER_CHAINS_INDEXED
+
+
+async def _update_user_chains(chain: Chain):
+    """Build user_chains of the chain or merge its operations since the last refresh"""
+    try:
+        since = await global_database_helper().get_user_chains_watermark(
+            network=chain.database_name
+        )
+        if since is not None:
+            _USER_CHAINS_INDEXED.add(chain)
+        await local_database_helper(network=chain).refresh_user_chains(
+            network=chain.database_name, since=since
+        )
+        _USER_CHAINS_INDEXED.add(chain)
+    except Exception as e:
+        logging.getLogger(__name__).error(
+            f" Unable to refresh {chain.database_name} user chains. Error: {e}"
+        )
+
+
 def global_database_helper():
     """Create a global database."""
     return database_global(mongo_url=MONGO_DB_URL)
@@ -4,10 +4,10 @@ import typing
 
 from datetime import datetime
 
-from fastapi import APIRouter, Query, Response, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
 from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRoute
-from fastapi_cache.decorator import cache
+from endpoint.config.cache import cache
 
 from endpoint.config.cache import DAILY_CACHE_TIMEOUT, DB_CACHE_TIMEOUT
 from endpoint.routers.template import (
@@ -236,6 +236,13 @@ class mongo_router_builder(router_builder_baseTemplate):
             generate_unique_id_function=self.generate_unique_id,
         )
 
+        router.add_api_route(
+            path=f"{self.prefix}{'/hypervisors/rewards/merkle'}",
+            endpoint=self.hypervisors_merkle_rewards,
+            methods=["GET"],
+            generate_unique_id_function=self.generate_unique_id,
+        )
+
         router.add_api_route(
             path=f"{self.prefix}{'/hypervisors/users'}",
             endpoint=self.hypervisors_users,
@@ -351,9 +358,15 @@ class mongo_router_builder(router_builder_baseTemplate):
                 timestamp=timestamp,
             )
         else:
-            return await hypervisor.get_hypervisor_prices(
+            result = await hypervisor.get_hypervisor_prices(
                 network=self.chain, hypervisor_address=hypervisor_address
             )
+            if result is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No status or usd prices found for hypervisor {hypervisor_address} on {self.chain.database_name}.",
+                )
+            return result
 
     @cache(expire=DB_CACHE_TIMEOUT)
     async def hypervisor_rewards(
@@ -697,6 +710,10 @@ class mongo_router_builder(router_builder_baseTemplate):
         block_end: int | None = Query(
             None, description="will limit the data returned to this value."
         ),
+        include_details: bool = Query(
+            True,
+            description="will include each user's operations and calculations lists",
+        ),
         # type_str: str | None = Query(
         #     "formula", enum=["formula", "spreadsheet"], description="calculation type"
         # ),
@@ -718,8 +735,57 @@ class mongo_router_builder(router_builder_baseTemplate):
             timestamp_ini=timestamp_ini,
             block_end=block_end,
             block_ini=block_ini,
+            include_details=include_details,
         )
 
+    async def hypervisors_merkle_rewards(
+        self,
+        response: Response,
+        timestamp_ini: int | None = Query(
+            None, description="will limit the data returned from this value."
+        ),
+        timestamp_end: int | None = Query(
+            None, description="will limit the data returned to this value."
+        ),
+        block_ini: int | None = Query(
+            None, description="will limit the data returned from this value."
+        ),
+        block_end: int | None = Query(
+            None, description="will limit the data returned to this value."
+        ),
+        hypervisor_address: str | None = Query(None, description="hypervisor address"),
+        user_address: str | None = Query(None, description="user address"),
+        ndjson: bool = Query(
+            False,
+            description="stream the result as newline delimited json ( one user-hypervisor item per line )",
+        ),
+    ):
+        """Returns the users time weighted average balance points and percentages of the hypervisors"""
+
+        if not (timestamp_ini and timestamp_end) and not (block_ini and block_end):
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return "Please provide timestamp_ini and timestamp_end or block_ini and block_end"
+
+        kwargs = {
+            "chain": self.chain,
+            "user_address": filter_addresses(user_address) if user_address else None,
+            "timestamp_ini": timestamp_ini,
+            "timestamp_end": timestamp_end,
+            "block_ini": block_ini,
+            "block_end": block_end,
+            "hypervisor_address": (
+                filter_addresses(hypervisor_address) if hypervisor_address else None
+            ),
+        }
+
+        if ndjson:
+            return StreamingResponse(
+                content=rewards.stream_gamma_merkle_rewards(**kwargs),
+                media_type="application/x-ndjson",
+            )
+
+        return await rewards.calculate_gamma_merkle_rewards(**kwargs)
+
 
 class MongoRouterBuilderPerps(router_builder_baseTemplate):
     def __init__(
@@ -1,16 +1,25 @@
 import asyncio
 from datetime import datetime, timezone
-from sources.common.database.collection_endpoint import database_global
 from sources.common.general.enums import Chain, text_to_chain
 from sources.common.general.utils import filter_addresses
+from sources.common.prices.current import current_prices
 from sources.strats.bins.enums import convert_chain_name
-from sources.subgraph.bins.config import MONGO_DB_URL
+
+
+async def _current_prices_snapshots(chain: Chain | None = None) -> list:
+    """Current prices snapshots of the chain ( all chains sorted by network when None )"""
+    if chain:
+        return [await current_prices.get(chain)]
+    chains = {x.database_name: x for x in Chain}
+    return await asyncio.gather(
+        *[current_prices.get(chains[network]) for network in sorted(chains)]
+    )
 
 
 async def get_current_prices(
     chain: Chain | None = None, token_addresses: list[str] | None = None
 ) -> list[dict]:
-    """Get a list of current token prices from database
+    """Get a list of current token prices from the worker prices snapshots
 
     Args:
         network (Chain): _description_
@@ -20,43 +29,33 @@ async def get_current_prices(
         list[dict]:
     """
     token_addresses = filter_addresses(token_addresses)
-    find = {}
-    if chain:
-        find = {"network": chain.database_name}
-        if token_addresses:
-            # build ids
-            ids = [f"{chain.database_name}_{address}" for address in token_addresses]
-            find["id"] = {"$in": ids}
-    if token_addresses and not "id" in find:
-        find["address"] = {"$in": token_addresses}
+    if isinstance(token_addresses, str):
+        token_addresses = [token_addresses]
 
     result = []
     current_time = datetime.now(timezone.utc).timestamp()
 
-    for item in await database_global(mongo_url=MONGO_DB_URL).get_items_from_database(
-        collection_name="current_usd_prices",
-        find=find,
-        sort=[("network", 1)],
-        projection={"_id": False, "id": False},
-        batch_size=50000,
-    ):
-        try:
-            item["seconds_old"] = current_time - item["timestamp"]
-        except:
-            item["seconds_old"] = None
+    for snapshot in await _current_prices_snapshots(chain):
+        for item in snapshot.get(token_addresses):
+            # snapshot documents are shared
+            item = item.copy()
+            try:
+                item["seconds_old"] = current_time - item["timestamp"]
+            except:
+                item["seconds_old"] = None
 
-        # change string network name to Chain object
-        try:
-            item["network"] = convert_chain_name(item["network"])
-        except:
-            pass
-        result.append(item)
+            # change string network name to Chain object
+            try:
+                item["network"] = convert_chain_name(item["network"])
+            except:
+                pass
+            result.append(item)
 
     return result
 
 
 async def get_current_token_addresses(chain: Chain | None = None) -> list[list]:
-    """comma separated list of current token addresses from database
+    """comma separated list of current token addresses from the worker prices snapshots
 
     Args:
         chain (Chain):
@@ -64,23 +63,14 @@ async def get_current_token_addresses(chain: Chain | None = None) -> list[list]:
     Returns:
         list[dict]:
     """
-    find = {}
-    if chain:
-        find = {"network": chain.database_name}
-
     result = []
-    for item in await database_global(mongo_url=MONGO_DB_URL).get_items_from_database(
-        collection_name="current_usd_prices",
-        find=find,
-        sort=[("network", 1)],
-        projection={"_id": False, "id": False},
-        batch_size=50000,
-    ):
-        # change string network name to Chain object
-        try:
-            item["network"] = convert_chain_name(item["network"])
-        except:
-            pass
+    for snapshot in await _current_prices_snapshots(chain):
+        for item in snapshot.get():
+            # change string network name to Chain object
+            try:
+                network = convert_chain_name(item["network"])
+            except:
+                network = item["network"]
 
-        result.append([item["address"], item["network"]])
+            result.append([item["address"], network])
     return result
@@ -1,10 +1,8 @@
 from fastapi import FastAPI
 from fastapi import Request
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
 
 from fastapi.middleware.cors import CORSMiddleware
-from endpoint.config.cache import CHARTS_CACHE_TIMEOUT
+from endpoint.config.cache import CHARTS_CACHE_TIMEOUT, init_cache
 from endpoint.config.middleware import DatabaseMiddleWare
 
 from sources.strats.endpoint.routers import build_routers
@@ -52,7 +50,7 @@ def create_app(
 
     @app.on_event("startup")
     async def startup():
-        FastAPICache.init(InMemoryBackend())
+        init_cache()
 
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request, exc):
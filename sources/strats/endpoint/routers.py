@@ -3,7 +3,7 @@ import re
 import typing
 from fastapi import Query, Response, APIRouter, status
 from fastapi.routing import APIRoute
-from fastapi_cache.decorator import cache
+from endpoint.config.cache import cache
 from endpoint.config.cache import DB_CACHE_TIMEOUT
 
 from endpoint.routers.template import (
@@ -87,9 +87,9 @@ class SubgraphClient:
         # error return
         return {}
 
-    async def paginate_query(self, query, paginate_variable, variables={}):
-        # if not variables:
-        #     variables = {}
+    async def paginate_query(self, query, paginate_variable, variables=None):
+        # copy: pagination state must not leak between calls
+        variables = dict(variables or {})
 
         if f"{paginate_variable}_gt" not in query:
             raise ValueError("Paginate variable missing in query")
@@ -101,7 +101,9 @@ class SubgraphClient:
         has_data = True
         params = {"query": query, "variables": variables}
         while has_data:
-            response = await async_client.post(self._url, json=params)
+            response = await async_client.post(
+                self._url, json=params, headers=self.service.headers()
+            )
             data = next(iter(response.json()["data"].values()))
             has_data = bool(data)
             if has_data:
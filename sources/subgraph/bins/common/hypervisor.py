@@ -16,7 +16,10 @@ from sources.subgraph.bins.database.managers import (
 )
 from sources.subgraph.bins.enums import Chain, Protocol
 from sources.subgraph.bins.hype_fees.fees import fees_all
-from sources.subgraph.bins.hype_fees.fees_yield import fee_returns_all
+from sources.subgraph.bins.hype_fees.fees_yield import (
+    fee_returns_all,
+    fee_returns_all_periods,
+)
 from sources.subgraph.bins.hype_fees.impermanent_divergence import (
     impermanent_divergence_all,
 )
@@ -150,17 +153,14 @@ class HypervisorsReturnsAllPeriods(ExecutionOrderWrapper):
         return result
 
     async def _subgraph(self):
-        daily, weekly, monthly = await asyncio.gather(
-            fee_returns_all(
-                self.protocol, self.chain, 1, self.hypervisors, self.current_timestamp
-            ),
-            fee_returns_all(
-                self.protocol, self.chain, 7, self.hypervisors, self.current_timestamp
-            ),
-            fee_returns_all(
-                self.protocol, self.chain, 30, self.hypervisors, self.current_timestamp
-            ),
+        all_periods = await fee_returns_all_periods(
+            self.protocol,
+            self.chain,
+            [1, 7, 30],
+            self.hypervisors,
+            self.current_timestamp,
         )
+        daily, weekly, monthly = all_periods[1], all_periods[7], all_periods[30]
 
         results = {}
         for hypervisor_id in daily.get("lp", {}).keys():
@@ -36,19 +36,18 @@ class AllData:
         self.hype_data = hype_data.data
 
     async def get_data(self):
-        async with self.client.client as session:
-            self.prices, fee_yield, _ = await asyncio.gather(
-                token_prices(self.chain, self.protocol, session),
-                fee_returns_all(
-                    protocol=self.protocol,
-                    chain=self.chain,
-                    days=1,
-                    hypervisors=self.hypervisors,
-                    current_timestamp=None,
-                    session=session,
-                ),
-                self._get_subgraph_data(session),
-            )
+        # subgraph queries share the endpoints pooled sessions
+        self.prices, fee_yield, _ = await asyncio.gather(
+            token_prices(self.chain, self.protocol),
+            fee_returns_all(
+                protocol=self.protocol,
+                chain=self.chain,
+                days=1,
+                hypervisors=self.hypervisors,
+                current_timestamp=None,
+            ),
+            self._get_subgraph_data(),
+        )
 
         self.fee_yield = fee_yield["lp"]
 
@@ -25,11 +25,11 @@ class BasicStats:
 
     async def get_data(self):
         hype_all_data = HypervisorAllData(self.chain, self.protocol)
-        async with self.client.client as session:
-            _, self.prices = await asyncio.gather(
-                hype_all_data.get_data(session=session, hypervisors=self.hypervisors),
-                token_prices(self.chain, self.protocol, session)
-            )
+        # subgraph queries share the endpoints pooled sessions
+        _, self.prices = await asyncio.gather(
+            hype_all_data.get_data(hypervisors=self.hypervisors),
+            token_prices(self.chain, self.protocol),
+        )
 
         self.hype_data = hype_all_data.data
 
@@ -5,7 +5,7 @@ from sources.subgraph.bins.common.recovery.schema import (
     RecoveryOutput,
 )
 from sources.subgraph.bins.subgraphs import SubgraphData
-from sources.subgraph.bins.subgraphs.recovery_pool import RecoveryPoolClient
+from sources.subgraph.bins.subgraphs.recovery_pool import get_recovery_pool_client
 from sources.subgraph.bins.utils import timestamp_to_date
 
 
@@ -14,7 +14,7 @@ class RecoveryInfo(SubgraphData):
         super().__init__()
         self.data: {}
         self.token = tokenAddress
-        self.client = RecoveryPoolClient()
+        self.client = get_recovery_pool_client()
 
     def query(self, days: int, timezone: str):
         ds = self.client.data_schema
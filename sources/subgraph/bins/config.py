@@ -1,6 +1,6 @@
 from collections import defaultdict
 
-from sources.common.general.config import get_config
+from sources.common.general.config import get_config, get_config_flag
 from sources.subgraph.bins.enums import Chain, Protocol, QueryType
 
 DEPLOYMENTS = [
@@ -128,6 +128,11 @@ legacy_stats = {
 
 MONGO_DB_URL = get_config("MONGO_DB_URL")
 MONGO_DB_TIMEOUTMS = int(get_config("MONGO_DB_TIMEOUTMS"))
+# create collection indexes from the workers ( False when setup_database.py takes care of it )
+MONGO_DB_CONFIGURE_INDEXES = get_config_flag("MONGO_DB_CONFIGURE_INDEXES")
+MONGO_DB_MAX_WORKERS = int(get_config("MONGO_DB_MAX_WORKERS"))
+MONGO_DB_MAX_QUEUE = int(get_config("MONGO_DB_MAX_QUEUE"))
+MONGO_DB_REQUEST_CONCURRENCY = int(get_config("MONGO_DB_REQUEST_CONCURRENCY"))
 MONGO_DB_COLLECTIONS = {
     "static": {"id": True},  # no historic
     "returns": {"id": True},  # historic
@@ -151,6 +156,19 @@ GROSS_FEES_MAX = 10**6
 TVL_MAX = 100e6
 
 GQL_CLIENT_TIMEOUT = int(get_config("GQL_CLIENT_TIMEOUT"))
+# pooled subgraph sessions: connections per host, HTTP/2 and max requests per second per service
+GQL_MAX_CONNECTIONS = int(get_config("GQL_MAX_CONNECTIONS"))
+GQL_HTTP2 = get_config_flag("GQL_HTTP2")
+GQL_RATE_LIMITS = get_config("GQL_RATE_LIMITS")
+# seconds identical lookups are shared between concurrent requests
+MEMO_SHARED_TTL = float(get_config("MEMO_SHARED_TTL"))
+# seconds between background reloads of the current prices snapshots
+CURRENT_PRICES_REFRESH = float(get_config("CURRENT_PRICES_REFRESH"))
+# all chains queries: concurrent chains and seconds to answer per chain
+FAN_OUT_CONCURRENCY = int(get_config("FAN_OUT_CONCURRENCY"))
+FAN_OUT_TIMEOUT = float(get_config("FAN_OUT_TIMEOUT"))
+# KPIs dashboard: periods whose fees and volume are calculated at the same time
+KPIS_PERIODS_CONCURRENCY = int(get_config("KPIS_PERIODS_CONCURRENCY"))
 
 # What to run first, subgraph or database
 RUN_FIRST_QUERY_TYPE = QueryType(get_config("RUN_FIRST_QUERY_TYPE"))
@@ -3,7 +3,10 @@ import time
 from gql.dsl import DSLQuery
 from httpx import HTTPStatusError
 
+from sources.common.database.block_index import get_block_index
+from sources.common.general.memo import request_memoize
 from sources.subgraph.bins import LlamaClient
+from sources.subgraph.bins.config import MEMO_SHARED_TTL
 from sources.subgraph.bins.constants import DAY_SECONDS
 from sources.subgraph.bins.enums import Chain
 from sources.subgraph.bins.hype_fees.schema import Time
@@ -24,7 +27,6 @@ class BlockRange:
         self.end: Time | None = None
         if subgraph_client:
             self._subgraph_client = subgraph_client
-        self._llama_client = LlamaClient(chain)
 
     async def set_end(self, timestamp: int | None = None) -> None:
         """Set end time and block"""
@@ -41,12 +43,7 @@ class BlockRange:
         """Set initial timestamp and block using days before current time"""
         timestamp_start = self.end.timestamp - (days_ago * DAY_SECONDS)
         try:
-            response = await self._llama_client.block_from_timestamp(
-                timestamp_start, True
-            )
-            self.initial = Time(
-                block=response["height"], timestamp=response["timestamp"]
-            )
+            self.initial = await self._get_time_from_timestamp(timestamp_start)
         except HTTPStatusError:
             # Estimate start time if not found
             self.initial = Time(
@@ -60,20 +57,49 @@ class BlockRange:
             )
 
     async def _get_time_from_timestamp(self, timestamp: int) -> Time:
-        response = await self._llama_client.block_from_timestamp(timestamp, True)
-        return Time(block=response["height"], timestamp=response["timestamp"])
+        return await _time_from_timestamp(self.chain, timestamp)
 
     async def _query_current_time(self) -> Time:
-        query = DSLQuery(
-            self._subgraph_client.data_schema.Query._meta.select(
-                self._subgraph_client.meta_fields_fragment()
-            )
+        return await _subgraph_current_time(self.chain, self._subgraph_client)
+
+
+# block lookups are computed once per request ( and shared for a few seconds )
+
+
+@request_memoize(ttl=MEMO_SHARED_TTL)
+async def _time_from_timestamp(chain: Chain, timestamp: int) -> Time:
+    response = await LlamaClient(chain).block_from_timestamp(timestamp, True)
+    return _index_time(
+        chain, Time(block=response["height"], timestamp=response["timestamp"])
+    )
+
+
+@request_memoize(ttl=MEMO_SHARED_TTL)
+async def _subgraph_current_time(
+    chain: Chain, subgraph_client: SubgraphClient
+) -> Time:
+    """Subgraph _meta block ( subgraph clients are shared, see get_subgraph_client )"""
+    query = DSLQuery(
+        subgraph_client.data_schema.Query._meta.select(
+            subgraph_client.meta_fields_fragment()
         )
+    )
 
-        response = await self._subgraph_client.execute(query)
-        timestamp = response["_meta"]["block"]["timestamp"]
-        timestamp = timestamp if timestamp else int(time.time())
+    response = await subgraph_client.execute(query)
+    timestamp = response["_meta"]["block"]["timestamp"]
+    if not timestamp:
         return Time(
             block=response["_meta"]["block"]["number"],
-            timestamp=timestamp,
+            timestamp=int(time.time()),
         )
+    return _index_time(
+        chain, Time(block=response["_meta"]["block"]["number"], timestamp=timestamp)
+    )
+
+
+def _index_time(chain: Chain, block_time: Time) -> Time:
+    """Add a known block/timestamp pair to the chain's block index"""
+    get_block_index(chain.database_name).add(
+        block=block_time.block, timestamp=block_time.timestamp
+    )
+    return block_time
@@ -8,9 +8,9 @@ from sources.common.database.common.collections_common import db_collections_com
 from sources.common.general.enums import Period, rewarderType
 from sources.subgraph.bins.common.hypervisors.all_data import AllData as HypeAllData
 from sources.subgraph.bins.config import MASTERCHEF_ADDRESSES
-from sources.subgraph.bins.enums import Chain, Protocol
+from sources.subgraph.bins.enums import Chain, Protocol, YieldType
 from sources.subgraph.bins.hype_fees.data import FeeGrowthSnapshotData
-from sources.subgraph.bins.hype_fees.fees_yield import FeesYield
+from sources.subgraph.bins.hype_fees.fees_yield import FeesYieldBatch
 from sources.subgraph.bins.hype_fees.impermanent_divergence import (
     impermanent_divergence_all,
 )
@@ -208,14 +208,15 @@ class db_returns_manager(db_collection_manager):
         await fees_data.init_time(days_ago=period_days, end_timestamp=current_timestamp)
         await fees_data.get_data()
 
-        returns_data = {}
-        hypervisor_addresses = []
-        for hypervisor_id, fees_data_item in fees_data.data.items():
-            fees_yield = FeesYield(fees_data_item, protocol, chain)
-            returns = fees_yield.calculate_returns()
-            returns_data[hypervisor_id] = returns
-            # add hype id to list
-            hypervisor_addresses.append(hypervisor_id)
+        returns_data = {
+            hypervisor_id: returns[YieldType.LP]
+            for hypervisor_id, returns in FeesYieldBatch(
+                fees_data.data, protocol, chain
+            )
+            .calculate_returns()
+            .items()
+        }
+        hypervisor_addresses = list(returns_data.keys())
 
         # calculate impermanent divergence
         imperm_data = await impermanent_divergence_all(
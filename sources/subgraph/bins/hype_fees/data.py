@@ -10,16 +10,20 @@ from sources.subgraph.bins.hype_fees.schema import (
     FeesData,
     FeesDataRange,
     HypervisorStaticInfo,
+    Time,
 )
 from sources.subgraph.bins.pricing import token_prices
-from sources.subgraph.bins.subgraphs.hype_pool import HypePoolClient
+from sources.subgraph.bins.subgraphs.hype_pool import get_hype_pool_client
+
+# fee snapshots returned per hypervisor and request
+SNAPSHOTS_PAGE_SIZE = 1000
 
 
 class FeeGrowthDataABC(ABC):
     def __init__(self, protocol: Protocol, chain: Chain) -> None:
         self.protocol = protocol
         self.chain = chain
-        self.hype_pool_client = HypePoolClient(protocol, chain)
+        self.hype_pool_client = get_hype_pool_client(protocol, chain)
         self.time_range = BlockRange(chain, self.hype_pool_client)
         self.data = {}
         self._static_data = {}
@@ -200,7 +204,8 @@ class FeeGrowthSnapshotData(FeeGrowthDataABC):
     async def get_data(self, session=None, hypervisors: list[str] | None = None) -> None:
         """Query data and tranfrom to FeesData Class"""
         query_data, self.pricing_data = await gather(
-            self._query_data(hypervisors), token_prices(self.chain, self.protocol, session)
+            self._query_data(session, hypervisors),
+            token_prices(self.chain, self.protocol, session),
         )
         self.data = self._transform_data(query_data)
 
@@ -235,33 +240,82 @@ class FeeGrowthSnapshotData(FeeGrowthDataABC):
             )
             .alias("initial")
             .select(self.hype_pool_client.hypervisor_fields_fragment()),
-            ds.Query.hypervisors(**({"first": 1000} | hypervisor_filter))
-            .alias("snapshots")
-            .select(
-                ds.Hypervisor.id,
-                ds.Hypervisor.feeSnapshots(
-                    first=1000,
-                    where={
-                        "timestamp_gte": self.time_range.initial.timestamp,
-                        "timestamp_lte": self.time_range.end.timestamp,
-                    },
-                ).select(
-                    ds.FeeSnapshot.blockNumber,
-                    ds.FeeSnapshot.timestamp,
-                    ds.FeeSnapshot.currentBlock.select(
-                        self.hype_pool_client.block_snapshot_fields_fragment()
-                    ),
-                    ds.FeeSnapshot.previousBlock.select(
-                        self.hype_pool_client.block_snapshot_fields_fragment()
-                    ),
-                ),
-            ),
+            self._snapshots_query(
+                hypervisor_filter, self.time_range.initial.timestamp
+            ).alias("snapshots"),
             ds.Query._meta.select(self.hype_pool_client.meta_fields_fragment()),
         )
 
         response = await self.hype_pool_client.execute(query, session)
+        await self._query_remaining_snapshots(response["snapshots"], session)
         return response
 
+    def _snapshots_query(self, hypervisor_filter: dict, timestamp_gte: int):
+        """Fee snapshots from timestamp_gte to the end of the range, oldest first"""
+        ds = self.hype_pool_client.data_schema
+        return ds.Query.hypervisors(**({"first": 1000} | hypervisor_filter)).select(
+            ds.Hypervisor.id,
+            ds.Hypervisor.feeSnapshots(
+                first=SNAPSHOTS_PAGE_SIZE,
+                orderBy="timestamp",
+                orderDirection="asc",
+                where={
+                    "timestamp_gte": timestamp_gte,
+                    "timestamp_lte": self.time_range.end.timestamp,
+                },
+            ).select(
+                ds.FeeSnapshot.id,
+                ds.FeeSnapshot.blockNumber,
+                ds.FeeSnapshot.timestamp,
+                ds.FeeSnapshot.currentBlock.select(
+                    self.hype_pool_client.block_snapshot_fields_fragment()
+                ),
+                ds.FeeSnapshot.previousBlock.select(
+                    self.hype_pool_client.block_snapshot_fields_fragment()
+                ),
+            ),
+        )
+
+    async def _query_remaining_snapshots(self, hypervisors_snapshots: list[dict], session=None):
+        """Page through the snapshots of the hypervisors with a full first page,
+        using the last snapshot timestamp as cursor ( appended in place )
+        """
+        pending = {
+            hypervisor["id"]: hypervisor
+            for hypervisor in hypervisors_snapshots
+            if len(hypervisor["feeSnapshots"]) >= SNAPSHOTS_PAGE_SIZE
+        }
+        while pending:
+            # one aliased query per hypervisor, each with its own cursor
+            hypervisor_ids = list(pending)
+            page = await self.hype_pool_client.execute(
+                DSLQuery(
+                    *[
+                        self._snapshots_query(
+                            {"where": {"id": hypervisor_id}},
+                            int(pending[hypervisor_id]["feeSnapshots"][-1]["timestamp"]),
+                        ).alias(f"page_{i}")
+                        for i, hypervisor_id in enumerate(hypervisor_ids)
+                    ]
+                ),
+                session,
+            )
+            for i, hypervisor_id in enumerate(hypervisor_ids):
+                snapshots = pending[hypervisor_id]["feeSnapshots"]
+                page_snapshots = (page[f"page_{i}"] or [{}])[0].get("feeSnapshots", [])
+                # snapshots sharing the cursor timestamp are returned again
+                known_ids = {
+                    snapshot["id"]
+                    for snapshot in snapshots
+                    if snapshot["timestamp"] == snapshots[-1]["timestamp"]
+                }
+                new_snapshots = [
+                    snapshot for snapshot in page_snapshots if snapshot["id"] not in known_ids
+                ]
+                snapshots.extend(new_snapshots)
+                if not new_snapshots or len(page_snapshots) < SNAPSHOTS_PAGE_SIZE:
+                    pending.pop(hypervisor_id)
+
     def _transform_data(self, query_data: dict) -> dict[str, list[FeesData]]:
         self._extract_static_data(query_data["static"])
         transformed_data = {
@@ -348,6 +402,186 @@ class FeeGrowthSnapshotData(FeeGrowthDataABC):
         return transformed_data
 
 
+class FeeGrowthSnapshotMultiData(FeeGrowthSnapshotData):
+    """Get fee growth data for multiple periods ( days ago ) at once.
+
+    The longest period snapshots contain all shorter periods ones, so only the
+    initial hypervisor state of each period is queried on top of them, in the same request.
+    """
+
+    def __init__(self, protocol: Protocol, chain: Chain) -> None:
+        super().__init__(protocol, chain)
+        self.days_list: list[int] = []
+        self.initial_times: dict[int, Time] = {}
+
+    async def init_time(self, days_list: list[int], end_timestamp: int | None = None):
+        self.days_list = sorted(set(days_list))
+        await self.time_range.set_end(end_timestamp)
+
+        # resolve each period initial time ( the longest sets the query range )
+        ranges = [BlockRange(self.chain) for _ in self.days_list]
+        for block_range in ranges:
+            block_range.end = self.time_range.end
+        await gather(
+            *[
+                block_range.set_initial_with_days_ago(days)
+                for block_range, days in zip(ranges, self.days_list)
+            ]
+        )
+        self.initial_times = {
+            days: block_range.initial for days, block_range in zip(self.days_list, ranges)
+        }
+        self.time_range.initial = self.initial_times[self.days_list[-1]]
+
+    async def _query_data(self, session=None, hypervisors: list[str] | None = None) -> dict:
+        ds = self.hype_pool_client.data_schema
+        hypervisor_filter = {"where": {"id_in": hypervisors}} if hypervisors else {}
+
+        query = DSLQuery(
+            ds.Query.hypervisors(**({"first": 1000} | hypervisor_filter))
+            .alias("static")
+            .select(
+                ds.Hypervisor.id,
+                ds.Hypervisor.symbol,
+                ds.Hypervisor.pool.select(
+                    ds.Pool.token0.select(ds.Token.id, ds.Token.decimals),
+                    ds.Pool.token1.select(ds.Token.id, ds.Token.decimals),
+                ),
+            ),
+            ds.Query.hypervisors(
+                **(
+                    {"first": 1000, "block": {"number": self.time_range.end.block}}
+                    | hypervisor_filter
+                )
+            )
+            .alias("latest")
+            .select(self.hype_pool_client.hypervisor_fields_fragment()),
+            *[
+                ds.Query.hypervisors(
+                    **(
+                        {"first": 1000, "block": {"number": initial_time.block}}
+                        | hypervisor_filter
+                    )
+                )
+                .alias(f"initial_{days}")
+                .select(self.hype_pool_client.hypervisor_fields_fragment())
+                for days, initial_time in self.initial_times.items()
+            ],
+            self._snapshots_query(
+                hypervisor_filter, self.time_range.initial.timestamp
+            ).alias("snapshots"),
+            ds.Query._meta.select(self.hype_pool_client.meta_fields_fragment()),
+        )
+
+        response = await self.hype_pool_client.execute(query, session)
+        await self._query_remaining_snapshots(response["snapshots"], session)
+        return response
+
+    def _transform_data(self, query_data: dict) -> dict[int, dict[str, list[FeesData]]]:
+        """Return the FeesData list of each hypervisor for each period
+
+        Returns:
+            dict[int, dict[str, list[FeesData]]]: { <days>: { <hypervisor id>: [FeesData, ...] } }
+        """
+        self._extract_static_data(query_data["static"])
+
+        # latest and snapshot rows are built once and shared between periods
+        latest_data = {
+            hypervisor_latest["id"]: self._init_fees_data(
+                hypervisor=hypervisor_latest,
+                hypervisor_id=hypervisor_latest["id"],
+                block=self.time_range.end.block,
+                timestamp=self.time_range.end.timestamp,
+                current_tick=hypervisor_latest["pool"]["currentTick"],
+                price_0=hypervisor_latest["pool"]["token0"]["priceUSD"],
+                price_1=hypervisor_latest["pool"]["token1"]["priceUSD"],
+                fee_growth_global_0=hypervisor_latest["pool"]["feeGrowthGlobal0X128"],
+                fee_growth_global_1=hypervisor_latest["pool"]["feeGrowthGlobal1X128"],
+            )
+            for hypervisor_latest in query_data["latest"]
+        }
+
+        # { <hypervisor id>: [ (<snapshot timestamp>, [<current block>, <previous block>]), ...] }
+        snapshots_data = {}
+        for hypervisor_snapshot in query_data["snapshots"]:
+            if hypervisor_snapshot["id"] not in latest_data:
+                continue
+            snapshots_data[hypervisor_snapshot["id"]] = [
+                (
+                    int(snapshot["timestamp"]),
+                    [
+                        self._init_fees_data(
+                            hypervisor=snapshot["currentBlock"],
+                            hypervisor_id=hypervisor_snapshot["id"],
+                            block=snapshot["blockNumber"],
+                            timestamp=snapshot["timestamp"],
+                            current_tick=snapshot["currentBlock"]["tick"],
+                            price_0=snapshot["currentBlock"]["price0"],
+                            price_1=snapshot["currentBlock"]["price1"],
+                            fee_growth_global_0=snapshot["currentBlock"][
+                                "feeGrowthGlobal0X128"
+                            ],
+                            fee_growth_global_1=snapshot["currentBlock"][
+                                "feeGrowthGlobal1X128"
+                            ],
+                        ),
+                        self._init_fees_data(
+                            hypervisor=snapshot["previousBlock"],
+                            hypervisor_id=hypervisor_snapshot["id"],
+                            block=int(snapshot["blockNumber"])
+                            - 1,  # Previous block is 1 block before
+                            timestamp=int(snapshot["timestamp"])
+                            - BLOCK_TIME_SECONDS[self.chain],
+                            current_tick=snapshot["previousBlock"]["tick"],
+                            price_0=snapshot["previousBlock"]["price0"],
+                            price_1=snapshot["previousBlock"]["price1"],
+                            fee_growth_global_0=snapshot["previousBlock"][
+                                "feeGrowthGlobal0X128"
+                            ],
+                            fee_growth_global_1=snapshot["previousBlock"][
+                                "feeGrowthGlobal1X128"
+                            ],
+                        ),
+                    ],
+                )
+                for snapshot in hypervisor_snapshot["feeSnapshots"]
+            ]
+
+        result = {}
+        for days, initial_time in self.initial_times.items():
+            result[days] = {
+                hypervisor_id: [fees_data] for hypervisor_id, fees_data in latest_data.items()
+            }
+            # Add initial row
+            for hypervisor_initial in query_data[f"initial_{days}"]:
+                if hypervisor_initial["id"] not in result[days]:
+                    continue
+                result[days][hypervisor_initial["id"]].append(
+                    self._init_fees_data(
+                        hypervisor=hypervisor_initial,
+                        hypervisor_id=hypervisor_initial["id"],
+                        block=initial_time.block,
+                        timestamp=initial_time.timestamp,
+                        current_tick=hypervisor_initial["pool"]["currentTick"],
+                        price_0=hypervisor_initial["pool"]["token0"]["priceUSD"],
+                        price_1=hypervisor_initial["pool"]["token1"]["priceUSD"],
+                        fee_growth_global_0=hypervisor_initial["pool"][
+                            "feeGrowthGlobal0X128"
+                        ],
+                        fee_growth_global_1=hypervisor_initial["pool"][
+                            "feeGrowthGlobal1X128"
+                        ],
+                    )
+                )
+            # Add the snapshots within the period
+            for hypervisor_id, snapshots in snapshots_data.items():
+                for timestamp, rows in snapshots:
+                    if timestamp >= initial_time.timestamp:
+                        result[days][hypervisor_id].extend(rows)
+
+        return result
+
+
 class ImpermanentDivergenceData(FeeGrowthDataABC):
     async def init_time(self, days_ago: int, end_timestamp: int | None = None):
         await self.time_range.set_end(end_timestamp)
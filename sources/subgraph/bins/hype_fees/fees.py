@@ -1,5 +1,8 @@
 import logging
 
+import numpy as np
+
+from sources.subgraph.bins.constants import X128
 from sources.subgraph.bins.enums import Chain, PositionType, Protocol
 from sources.subgraph.bins.hype_fees.data import FeeGrowthData
 from sources.subgraph.bins.hype_fees.schema import FeesData, UncollectedFees
@@ -111,6 +114,171 @@ class Fees:
         )
 
 
+class FeesBatch:
+    """Uncollected fees of many fees data records at once.
+
+    Same calculations as Fees, using object-dtype ( python int ) arrays so the
+    uint256 fee growth wraparound stays exact while every position is processed
+    by a single array operation.
+    """
+
+    def __init__(self, data: list[FeesData], protocol: Protocol, chain: Chain):
+        self.data = data
+        self.protocol = protocol
+        self.chain = chain
+
+    def fee_amounts(self) -> list[UncollectedFees]:
+        if not self.data:
+            return []
+
+        base_fees0, base_fees1 = self._calc_position_fees(PositionType.BASE)
+        limit_fees0, limit_fees1 = self._calc_position_fees(PositionType.LIMIT)
+
+        return [
+            UncollectedFees(
+                base_fees0_x128=base_fees0[idx],
+                base_fees1_x128=base_fees1[idx],
+                base_owed0_x128=data.base_position.tokens_owed.value0.raw,
+                base_owed1_x128=data.base_position.tokens_owed.value1.raw,
+                limit_fees0_x128=limit_fees0[idx],
+                limit_fees1_x128=limit_fees1[idx],
+                limit_owed0_x128=data.limit_position.tokens_owed.value0.raw,
+                limit_owed1_x128=data.limit_position.tokens_owed.value1.raw,
+                decimals0=data.decimals.value0,
+                decimals1=data.decimals.value1,
+                price0=data.price.value0,
+                price1=data.price.value1,
+            )
+            for idx, data in enumerate(self.data)
+        ]
+
+    def total_amounts(self) -> tuple[np.ndarray, np.ndarray]:
+        """Decimal adjusted total uncollected fees ( fees + owed of both positions )
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: float arrays of token0 and token1 amounts
+        """
+        if not self.data:
+            return np.zeros(0), np.zeros(0)
+
+        base_fees0, base_fees1 = self._calc_position_fees(PositionType.BASE)
+        limit_fees0, limit_fees1 = self._calc_position_fees(PositionType.LIMIT)
+
+        total0 = (
+            base_fees0
+            + limit_fees0
+            + self._column(lambda x: x.base_position.tokens_owed.value0.raw)
+            + self._column(lambda x: x.limit_position.tokens_owed.value0.raw)
+        )
+        total1 = (
+            base_fees1
+            + limit_fees1
+            + self._column(lambda x: x.base_position.tokens_owed.value1.raw)
+            + self._column(lambda x: x.limit_position.tokens_owed.value1.raw)
+        )
+        scale0 = self._column(lambda x: 10**x.decimals.value0)
+        scale1 = self._column(lambda x: 10**x.decimals.value1)
+
+        return (
+            (total0 / scale0).astype(np.float64) / X128,
+            (total1 / scale1).astype(np.float64) / X128,
+        )
+
+    def _column(self, getter, items: list | None = None) -> np.ndarray:
+        return np.array(
+            [getter(item) for item in (self.data if items is None else items)],
+            dtype=object,
+        )
+
+    def _calc_position_fees(
+        self, position_type: PositionType
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Uncollected fees x128 of the base or limit position of all records
+        ( 0 for records with missing data, as Fees does )
+        """
+        rows = [self._position_row(item, position_type) for item in self.data]
+        valid = np.array([row is not None for row in rows], dtype=bool)
+        # missing data rows are computed with zeros and masked out
+        rows = [row if row is not None else (0,) * 12 for row in rows]
+        (
+            current_tick,
+            tick_lower,
+            tick_upper,
+            liquidity,
+            global_growth0,
+            global_growth1,
+            outside_lower0,
+            outside_lower1,
+            outside_upper0,
+            outside_upper1,
+            inside_last0,
+            inside_last1,
+        ) = [np.array(column, dtype=object) for column in zip(*rows)]
+
+        result = []
+        for global_growth, outside_lower, outside_upper, inside_last in (
+            (global_growth0, outside_lower0, outside_upper0, inside_last0),
+            (global_growth1, outside_lower1, outside_upper1, inside_last1),
+        ):
+            fee_growth_below = np.where(
+                current_tick >= tick_lower,
+                outside_lower,
+                _sub_in_256(global_growth, outside_lower),
+            )
+            fee_growth_above = np.where(
+                current_tick >= tick_upper,
+                _sub_in_256(global_growth, outside_upper),
+                outside_upper,
+            )
+            fees_accum_now = _sub_in_256(
+                _sub_in_256(global_growth, fee_growth_below), fee_growth_above
+            )
+            fees = liquidity * _sub_in_256(fees_accum_now, inside_last)
+            result.append(np.where(valid, fees, 0))
+
+        return result[0], result[1]
+
+    @staticmethod
+    def _position_row(item: FeesData, position_type: PositionType) -> tuple | None:
+        """Fee calculation values of a record position, None when data is missing"""
+        position = (
+            item.base_position
+            if position_type == PositionType.BASE
+            else item.limit_position
+        )
+        try:
+            row = (
+                item.current_tick,
+                position.tick_lower.tick_index,
+                position.tick_upper.tick_index,
+                position.liquidity,
+                item.fee_growth_global.value0,
+                item.fee_growth_global.value1,
+                position.tick_lower.fee_growth_outside.value0,
+                position.tick_lower.fee_growth_outside.value1,
+                position.tick_upper.fee_growth_outside.value0,
+                position.tick_upper.fee_growth_outside.value1,
+                position.fee_growth_inside.value0,
+                position.fee_growth_inside.value1,
+            )
+            if not all(isinstance(value, int) for value in row):
+                raise TypeError(" fee data is not an integer")
+            return row
+        except (IndexError, TypeError):
+            logger.warning(
+                f"{position_type.value.capitalize()} fees set to 0, missing data for hype: "
+                f"{item.hypervisor}, ticks: ({position.tick_lower.tick_index}, "
+                f"{position.tick_upper.tick_index})"
+            )
+            return None
+
+
+def _sub_in_256(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """sub_in_256 over object-dtype arrays"""
+    difference = x - y
+    return np.where(difference < 0, difference + 2**256, difference)
+
+
 async def fees_all(
     protocol: Protocol,
     chain: Chain,
@@ -123,10 +291,10 @@ async def fees_all(
     await fees_data.get_data(session, hypervisors)
 
     results = {}
-    for hypervisor_id, fees_data in fees_data.data.items():
-        fees = Fees(fees_data, protocol, chain)
-        fee_amounts = fees.fee_amounts()
-
+    for (hypervisor_id, fees_data), fee_amounts in zip(
+        fees_data.data.items(),
+        FeesBatch(list(fees_data.data.values()), protocol, chain).fee_amounts(),
+    ):
         results[hypervisor_id] = {
             "symbol": fees_data.symbol,
             "baseFees0": fee_amounts.base.fees.amount.value0,
@@ -1,143 +1,182 @@
 import logging
 
 import numpy as np
-from pandas import DataFrame
 
 from sources.common.formulas.fees import calculate_gamma_fee
 from sources.subgraph.bins.constants import DAY_SECONDS, YEAR_SECONDS
 from sources.subgraph.bins.enums import Chain, Protocol, YieldType
-from sources.subgraph.bins.hype_fees.data import FeeGrowthSnapshotData
-from sources.subgraph.bins.hype_fees.fees import Fees
-from sources.subgraph.bins.hype_fees.schema import FeesData, FeesSnapshot, FeeYield
+from sources.subgraph.bins.hype_fees.data import (
+    FeeGrowthSnapshotData,
+    FeeGrowthSnapshotMultiData,
+)
+from sources.subgraph.bins.hype_fees.fees import FeesBatch
+from sources.subgraph.bins.hype_fees.schema import FeesData, FeeYield
 
 logger = logging.getLogger(__name__)
 
 YIELD_PER_DAY_MAX = 300
 
 
-class FeesYield:
-    "Calculations for fee related yields."
+class FeesYieldBatch:
+    """Vectorized fee yield calculations for many hypervisors at once.
 
-    def __init__(self, data: list[FeesData], protocol: Protocol, chain: Chain) -> None:
+    Fee growth, outlier filtering, APR and APY calculations, using one set of columnar
+    arrays for all hypervisors ( hypervisor index as group key ) and returning
+    LP and TOTAL yields in a single pass.
+    """
+
+    def __init__(
+        self, data: dict[str, list[FeesData]], protocol: Protocol, chain: Chain
+    ) -> None:
         self.data = data
         self.protocol = protocol
         self.chain = chain
 
-    def calculate_returns(self, yield_type: YieldType = YieldType.LP) -> FeeYield:
-        """Calculate APR and APY."""
-        snapshots = [self.get_fees(entry) for entry in self.data]
-        df_snapshots = DataFrame(snapshots, dtype=np.float64)
-
-        #  Require at least two rows to calculate yield
-        if len(df_snapshots) < 2:
-            logger.info("No hypervisor data - skipping calculations")
-            return FeeYield(
-                apr=0,
-                apy=0,
-                status="Insufficient Data",
-            )
-
-        df_snapshots = df_snapshots.set_index("block").sort_index()
-
-        # Apply gamma fees to total fees if calculating LP returns
-        if yield_type == YieldType.LP:
-            # fee % is 1 / fee or 1/10 if fee > 100
-            def fee_func_percentage(fee_rate):
-                return calculate_gamma_fee(fee_rate, self.protocol)
-
-            df_snapshots["gamma_fee_rate"] = df_snapshots["fee"].apply(
-                fee_func_percentage
+    def calculate_returns(self) -> dict[str, dict[YieldType, FeeYield]]:
+        """Calculate APR and APY of all hypervisors
+
+        Returns:
+            dict[str, dict[YieldType, FeeYield]]: {<hypervisor id>: {YieldType.LP: FeeYield, YieldType.TOTAL: FeeYield}}
+        """
+        hypervisor_ids = list(self.data.keys())
+        if not hypervisor_ids:
+            return {}
+
+        columns = self._build_columns()
+        group = columns["group"]
+        n_groups = len(hypervisor_ids)
+
+        # sort by hypervisor, then block
+        order = np.lexsort((columns["block"], group))
+        for key in columns:
+            columns[key] = columns[key][order]
+        group = columns["group"]
+
+        # first row of each hypervisor has no previous row to diff with
+        is_first = np.ones(len(group), dtype=bool)
+        is_first[1:] = group[1:] != group[:-1]
+        rows_per_group = np.bincount(group, minlength=n_groups)
+
+        def group_diff(values: np.ndarray) -> np.ndarray:
+            result = np.empty_like(values)
+            result[0] = np.nan
+            result[1:] = values[1:] - values[:-1]
+            result[is_first] = np.nan
+            return result
+
+        elapsed_time = group_diff(columns["timestamp"])
+
+        # gamma fee rate per unique fee value
+        unique_fees, fee_inverse = np.unique(columns["fee"], return_inverse=True)
+        gamma_fee_rate = np.array(
+            [calculate_gamma_fee(fee, self.protocol) for fee in unique_fees],
+            dtype=np.float64,
+        )[fee_inverse]
+
+        result = {hypervisor_id: {} for hypervisor_id in hypervisor_ids}
+        for yield_type in (YieldType.LP, YieldType.TOTAL):
+            fee_multiplier = (
+                1 - gamma_fee_rate if yield_type == YieldType.LP else 1.0
             )
-            df_snapshots["effective_fees_0"] = df_snapshots.total_fees_0 * (
-                1 - df_snapshots.gamma_fee_rate
+            fee0_growth = np.clip(
+                group_diff(columns["total_fees_0"] * fee_multiplier), 0, None
             )
-            df_snapshots["effective_fees_1"] = df_snapshots.total_fees_1 * (
-                1 - df_snapshots.gamma_fee_rate
+            fee1_growth = np.clip(
+                group_diff(columns["total_fees_1"] * fee_multiplier), 0, None
             )
-        else:
-            df_snapshots["effective_fees_0"] = df_snapshots.total_fees_0
-            df_snapshots["effective_fees_1"] = df_snapshots.total_fees_1
-
-        df_snapshots["elapsed_time"] = df_snapshots.timestamp.diff()
-        df_snapshots["fee0_growth"] = df_snapshots.effective_fees_0.diff().clip(lower=0)
-        df_snapshots["fee1_growth"] = df_snapshots.effective_fees_1.diff().clip(lower=0)
-
-        df_snapshots["fee_growth_usd"] = (
-            df_snapshots.fee0_growth * df_snapshots.price_0
-            + df_snapshots.fee1_growth * df_snapshots.price_1
-        )
-
-        # handle divisionByZero errors
-        df_snapshots["period_yield"] = df_snapshots.apply(
-            lambda x: (
-                np.nan if x["tvl_usd"] == 0 else x["fee_growth_usd"] / x["tvl_usd"]
-            ),
-            axis=1,
-        )
-        # df_snapshots["period_yield"] = (
-        #     df_snapshots.fee_growth_usd / df_snapshots.tvl_usd
-        # )
-        df_snapshots["yield_per_day"] = (
-            df_snapshots.period_yield * YEAR_SECONDS / df_snapshots.elapsed_time
-        )
-
-        has_outlier = (df_snapshots.yield_per_day > YIELD_PER_DAY_MAX).any()
-        df_snapshots = df_snapshots[df_snapshots.yield_per_day < YIELD_PER_DAY_MAX]
-
-        df_snapshots["total_period_seconds"] = df_snapshots.elapsed_time.cumsum()
-        df_snapshots["cum_fee_return"] = (1 + df_snapshots.period_yield).cumprod() - 1
-
-        df_returns = df_snapshots[["total_period_seconds", "cum_fee_return"]].tail(1)
-
-        # This is a failsafe for if there are outliers
-        if df_returns.empty:
-            logger.debug("Empty returns")
-            return FeeYield(
-                apr=0,
-                apy=0,
-                status="Insufficient good data",
+            fee_growth_usd = (
+                fee0_growth * columns["price_0"] + fee1_growth * columns["price_1"]
             )
 
-        # Extrapolate linearly to annual rate
-        df_returns["fee_apr"] = df_returns.cum_fee_return * (
-            YEAR_SECONDS / df_returns.total_period_seconds
-        )
-
-        # Extrapolate by compounding
-        df_returns["fee_apy"] = (
-            1
-            + df_returns.cum_fee_return
-            * (DAY_SECONDS / df_returns.total_period_seconds)
-        ) ** 365 - 1
-
-        df_returns = df_returns.fillna(0).replace({np.inf: 0, -np.inf: 0})
-
-        returns = df_returns.to_dict("records")[0]
-
-        returns["fee_apr"] = max(returns["fee_apr"], 0)
-        returns["fee_apy"] = max(returns["fee_apy"], 0)
-
-        return FeeYield(
-            apr=returns["fee_apr"] or 0,
-            apy=returns["fee_apy"] or 0,
-            status="Outlier removed" if has_outlier else "Good",
-        )
-
-    def get_fees(self, fees_data: FeesData) -> FeesSnapshot:
-        """Get fee amounts given fees data."""
-        fees = Fees(fees_data, self.protocol, self.chain)
-        fee_amounts = fees.fee_amounts()
-
-        return FeesSnapshot(
-            block=fees_data.block,
-            timestamp=fees_data.timestamp,
-            fee=fees_data.fee,
-            tvl_usd=fees_data.tvl_usd,
-            total_fees_0=fee_amounts.total.amount.value0,
-            total_fees_1=fee_amounts.total.amount.value1,
-            price_0=fees_data.price.value0,
-            price_1=fees_data.price.value1,
-        )
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # handle divisionByZero errors
+                period_yield = np.where(
+                    columns["tvl_usd"] == 0,
+                    np.nan,
+                    fee_growth_usd / columns["tvl_usd"],
+                )
+                yield_per_day = period_yield * YEAR_SECONDS / elapsed_time
+
+            has_outlier = np.bincount(
+                group,
+                weights=(yield_per_day > YIELD_PER_DAY_MAX).astype(np.float64),
+                minlength=n_groups,
+            ).astype(bool)
+            good_rows = yield_per_day < YIELD_PER_DAY_MAX
+
+            good_count = np.bincount(group[good_rows], minlength=n_groups)
+            total_period_seconds = np.bincount(
+                group[good_rows], weights=elapsed_time[good_rows], minlength=n_groups
+            )
+            # cumulative product as exp of sum of logs is not exact for negative factors:
+            #   reduce the good rows of each hypervisor instead
+            cum_fee_return = np.zeros(n_groups, dtype=np.float64)
+            good_groups = group[good_rows]
+            if len(good_groups):
+                starts = np.flatnonzero(
+                    np.concatenate(([True], good_groups[1:] != good_groups[:-1]))
+                )
+                cum_fee_return[good_groups[starts]] = (
+                    np.multiply.reduceat(1 + period_yield[good_rows], starts) - 1
+                )
+
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                # Extrapolate linearly to annual rate
+                fee_apr = cum_fee_return * (YEAR_SECONDS / total_period_seconds)
+                # Extrapolate by compounding
+                fee_apy = (
+                    1 + cum_fee_return * (DAY_SECONDS / total_period_seconds)
+                ) ** 365 - 1
+
+            fee_apr = np.clip(np.nan_to_num(fee_apr, nan=0, posinf=0, neginf=0), 0, None)
+            fee_apy = np.clip(np.nan_to_num(fee_apy, nan=0, posinf=0, neginf=0), 0, None)
+
+            for idx, hypervisor_id in enumerate(hypervisor_ids):
+                #  Require at least two rows to calculate yield
+                if rows_per_group[idx] < 2:
+                    result[hypervisor_id][yield_type] = FeeYield(
+                        apr=0, apy=0, status="Insufficient Data"
+                    )
+                # This is a failsafe for if there are outliers
+                elif good_count[idx] == 0:
+                    result[hypervisor_id][yield_type] = FeeYield(
+                        apr=0, apy=0, status="Insufficient good data"
+                    )
+                else:
+                    result[hypervisor_id][yield_type] = FeeYield(
+                        apr=float(fee_apr[idx]),
+                        apy=float(fee_apy[idx]),
+                        status="Outlier removed" if has_outlier[idx] else "Good",
+                    )
+
+        return result
+
+    def _build_columns(self) -> dict[str, np.ndarray]:
+        """Columnar arrays of all hypervisors fee snapshots"""
+        group, records = [], []
+        for idx, fees_data in enumerate(self.data.values()):
+            group += [idx] * len(fees_data)
+            records += fees_data
+
+        # uncollected fees of all snapshots of all hypervisors in one go
+        total_fees_0, total_fees_1 = FeesBatch(
+            records, self.protocol, self.chain
+        ).total_amounts()
+
+        def column(getter) -> np.ndarray:
+            return np.array([getter(item) for item in records], dtype=np.float64)
+
+        return {
+            "group": np.array(group, dtype=np.int64),
+            "block": column(lambda x: x.block),
+            "timestamp": column(lambda x: x.timestamp),
+            "fee": column(lambda x: x.fee),
+            "tvl_usd": column(lambda x: x.tvl_usd),
+            "total_fees_0": total_fees_0,
+            "total_fees_1": total_fees_1,
+            "price_0": column(lambda x: x.price.value0),
+            "price_1": column(lambda x: x.price.value1),
+        }
 
 
 async def fee_returns_all(
@@ -154,11 +193,52 @@ async def fee_returns_all(
     await fees_data.init_time(days_ago=days, end_timestamp=current_timestamp)
     await fees_data.get_data(session, hypervisors)
 
-    results = {"lp": {}, "total": {}}
-    for hypervisor_id, fees_data in fees_data.data.items():
-        fees_yield = FeesYield(fees_data, protocol, chain)
-        lp_returns = fees_yield.calculate_returns(yield_type=YieldType.LP)
+    return _fee_returns(fees_data.data, protocol, chain, return_total)
+
 
+async def fee_returns_all_periods(
+    protocol: Protocol,
+    chain: Chain,
+    days_list: list[int],
+    hypervisors: list[str] | None = None,
+    current_timestamp: int | None = None,
+    return_total: bool = False,
+    session=None,
+    return_exceptions: bool = False,
+) -> dict[int, dict[str, dict]]:
+    """Get fee returns for multiple hypervisors and periods using one data query.
+        With return_exceptions, a period failing to calculate returns its exception instead of raising.
+
+    Returns:
+        dict[int, dict[str, dict]]: { <days>: <fee_returns_all result> }
+    """
+    fees_data = FeeGrowthSnapshotMultiData(protocol, chain)
+    await fees_data.init_time(days_list=days_list, end_timestamp=current_timestamp)
+    await fees_data.get_data(session, hypervisors)
+
+    results = {}
+    for days, period_data in fees_data.data.items():
+        try:
+            results[days] = _fee_returns(period_data, protocol, chain, return_total)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            # a failing period does not fail the others
+            results[days] = e
+    return results
+
+
+def _fee_returns(
+    data: dict[str, list[FeesData]],
+    protocol: Protocol,
+    chain: Chain,
+    return_total: bool = False,
+) -> dict[str, dict]:
+    returns = FeesYieldBatch(data, protocol, chain).calculate_returns()
+
+    results = {"lp": {}, "total": {}}
+    for hypervisor_id, fees_data in data.items():
+        lp_returns = returns[hypervisor_id][YieldType.LP]
         results["lp"][hypervisor_id] = {
             "symbol": fees_data[0].symbol,
             "feeApr": lp_returns.apr,
@@ -167,7 +247,7 @@ async def fee_returns_all(
         }
 
         if return_total:
-            total_returns = fees_yield.calculate_returns(yield_type=YieldType.TOTAL)
+            total_returns = returns[hypervisor_id][YieldType.TOTAL]
             results["total"][hypervisor_id] = {
                 "symbol": fees_data[0].symbol,
                 "feeApr": total_returns.apr,
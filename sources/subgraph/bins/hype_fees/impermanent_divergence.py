@@ -3,22 +3,35 @@ import logging
 from sources.subgraph.bins.constants import X128
 from sources.subgraph.bins.enums import Chain, Protocol
 from sources.subgraph.bins.hype_fees.data import ImpermanentDivergenceData
-from sources.subgraph.bins.hype_fees.fees import Fees
-from sources.subgraph.bins.hype_fees.schema import FeesDataRange
+from sources.subgraph.bins.hype_fees.fees import FeesBatch
+from sources.subgraph.bins.hype_fees.schema import FeesDataRange, UncollectedFees
 
 logger = logging.getLogger(__name__)
 
 
 class ImpermanentDivergence:
-    def __init__(self, data: FeesDataRange, protocol: Protocol, chain: Chain):
+    def __init__(
+        self,
+        data: FeesDataRange,
+        protocol: Protocol,
+        chain: Chain,
+        fee_amounts: tuple[UncollectedFees, UncollectedFees] | None = None,
+    ):
+        """
+        Args:
+            fee_amounts (tuple[UncollectedFees, UncollectedFees] | None, optional): precalculated ( initial, latest ) uncollected fees. Defaults to None.
+        """
         self.protocol = protocol
         self.chain = chain
         self.data = data
-        self._update_tvl_with_fees()
+        self._update_tvl_with_fees(fee_amounts)
 
-    def _update_tvl_with_fees(self) -> None:
-        fees_initial = Fees(self.data.initial, self.protocol, self.chain)
-        fees_amounts_initial = fees_initial.fee_amounts()
+    def _update_tvl_with_fees(
+        self, fee_amounts: tuple[UncollectedFees, UncollectedFees] | None = None
+    ) -> None:
+        fees_amounts_initial, fees_amounts_latest = fee_amounts or FeesBatch(
+            [self.data.initial, self.data.latest], self.protocol, self.chain
+        ).fee_amounts()
 
         self.data.initial.update_tvl(
             self.data.initial.tvl.value0.raw
@@ -30,9 +43,6 @@ class ImpermanentDivergence:
             + fees_amounts_initial.total.usd.value1,
         )
 
-        fees_latest = Fees(self.data.latest, self.protocol, self.chain)
-        fees_amounts_latest = fees_latest.fee_amounts()
-
         self.data.latest.update_tvl(
             self.data.latest.tvl.value0.raw
             + (fees_amounts_latest.total.amount_x128.value0.raw // X128),
@@ -284,9 +294,25 @@ async def impermanent_divergence_all(
             # merge data
             divergence_data.data = {**temp_data, **divergence_data.data}
 
+    # uncollected fees of all hypervisors ( initial and latest ) in one go
+    fee_amounts = FeesBatch(
+        [
+            item
+            for hypervisor in divergence_data.data.values()
+            for item in (hypervisor.initial, hypervisor.latest)
+        ],
+        protocol,
+        chain,
+    ).fee_amounts()
+
     results = {}
-    for hypervisor_id, hypervisor in divergence_data.data.items():
-        divergence = ImpermanentDivergence(hypervisor, protocol, chain)
+    for idx, (hypervisor_id, hypervisor) in enumerate(divergence_data.data.items()):
+        divergence = ImpermanentDivergence(
+            hypervisor,
+            protocol,
+            chain,
+            fee_amounts=(fee_amounts[2 * idx], fee_amounts[2 * idx + 1]),
+        )
         calculation = divergence.calculate()
         results[hypervisor_id] = {
             "id": calculation["id"],
@@ -450,28 +450,6 @@ class UncollectedFees:
         )
 
 
-@dataclass
-class FeesSnapshot:
-    block: int
-    timestamp: int
-    fee: int
-    tvl_usd: float
-    total_fees_0: float
-    total_fees_1: float
-    price_0: float
-    price_1: float
-
-    def __post_init__(self):
-        self.block = int(self.block)
-        self.timestamp = int(self.timestamp)
-        self.fee = int(self.fee)
-        self.tvl_usd = float(self.tvl_usd)
-        self.total_fees_0 = float(self.total_fees_0)
-        self.total_fees_1 = float(self.total_fees_1)
-        self.price_0 = float(self.price_0)
-        self.price_1 = float(self.price_1)
-
-
 @dataclass
 class FeeYield:
     apr: float
@@ -5,8 +5,10 @@ import contextlib
 
 from gql.dsl import DSLQuery
 
+from sources.common.general.memo import request_memoize
 from sources.common.prices.helpers import get_current_prices
 from sources.subgraph.bins import LlamaClient
+from sources.subgraph.bins.config import MEMO_SHARED_TTL
 from sources.subgraph.bins.enums import Chain, Protocol
 from sources.subgraph.bins.subgraphs import SubgraphData
 from sources.subgraph.bins.subgraphs.gamma import get_gamma_client
@@ -22,8 +24,9 @@ async def gamma_price():
     return price
 
 
+@request_memoize(ttl=MEMO_SHARED_TTL, ignore=("session",))
 async def token_prices(chain: Chain, protocol: Protocol, session = None) -> dict:
-    """Get token prices"""
+    """Get token prices ( computed once per request )"""
     token_data = TokenData(chain, protocol)
 
     await token_data.get_data(session=session)
@@ -1,17 +1,27 @@
+import asyncio
 import logging
+import time
 from abc import ABC, abstractmethod
 from enum import Enum
 from functools import wraps
 from typing import Any
+from urllib.parse import urlsplit
 
+import httpx
 from gql import Client as GqlClient
-from gql.client import ReconnectingAsyncClientSession
+from gql.client import AsyncClientSession, ReconnectingAsyncClientSession
 from gql.dsl import DSLFragment, DSLQuery, DSLSchema, dsl_gql
 from gql.transport.httpx import HTTPXAsyncTransport
 from gql.transport.httpx import log as requests_logger
+from graphql import FragmentSpreadNode, GraphQLSchema, Node, Visitor, visit
+from graphql.utilities import build_ast_schema
+from graphql.language import parse
 
 from sources.subgraph.bins.config import (
     GQL_CLIENT_TIMEOUT,
+    GQL_HTTP2,
+    GQL_MAX_CONNECTIONS,
+    GQL_RATE_LIMITS,
     SUBGRAPH_STUDIO_KEY,
     SUBGRAPH_STUDIO_USER_KEY,
     GOLDSKY_PROJECT_NAME,
@@ -19,6 +29,13 @@ from sources.subgraph.bins.config import (
     SENTIO_KEY,
 )
 
+try:
+    import h2  # noqa: F401  ( optional HTTP/2 support )
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 requests_logger.setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
@@ -57,7 +74,7 @@ class StudioService(SubgraphService):
 
 class GoldskyService(SubgraphService):
     def __init__(self, subgraph_id: str):
-        super().__init__(Service.STUDIO, subgraph_id)
+        super().__init__(Service.GOLDSKY, subgraph_id)
 
     def url(self) -> str:
         base_url = "https://api.goldsky.com/api/public"
@@ -69,7 +86,7 @@ class GoldskyService(SubgraphService):
 
 class SentioService(SubgraphService):
     def __init__(self, subgraph_id: str):
-        super().__init__(Service.STUDIO, subgraph_id, SENTIO_KEY)
+        super().__init__(Service.SENTIO, subgraph_id, SENTIO_KEY)
 
     def url(self) -> str:
         base_url = "https://app.sentio.xyz/api/v1/graphql"
@@ -110,37 +127,213 @@ class AsyncGqlClient(GqlClient):
     """Subclass of gql Client that defaults to HTTPX Transport"""
 
     def __init__(
-        self, url: str, schema, execute_timeout: int, headers: dict | None = None
+        self,
+        url: str,
+        schema,
+        execute_timeout: int,
+        headers: dict | None = None,
+        **transport_kwargs,
     ) -> None:
         self.url = url
         super().__init__(
             schema=schema,
             transport=HTTPXAsyncTransport(
-                url=url, headers=headers, timeout=GQL_CLIENT_TIMEOUT
+                url=url, headers=headers, timeout=GQL_CLIENT_TIMEOUT, **transport_kwargs
             ),
             execute_timeout=execute_timeout,
         )
 
 
+class RateLimit:
+    """Non-blocking rate limit: spaces requests to at most rate_max_sec per second ( 0 = no limit )"""
+
+    def __init__(self, rate_max_sec: float):
+        self.rate_max_sec = rate_max_sec
+        self.waited_seconds = 0.0
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if not self.rate_max_sec:
+            return
+        now = time.monotonic()
+        # reserve the next free slot ( no await in between: safe within the event loop )
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate_max_sec
+        if slot > now:
+            self.waited_seconds += slot - now
+            await asyncio.sleep(slot - now)
+
+
+class SubgraphSessionPool:
+    """Long-lived gql sessions per subgraph endpoint, shared by all queries
+
+    Endpoints of the same host share one keep-alive connection pool ( GQL_MAX_CONNECTIONS,
+    HTTP/2 when GQL_HTTP2 is set and h2 is installed ) and queries are rate limited per service.
+    """
+
+    def __init__(self):
+        # { <endpoint url>: AsyncClientSession }
+        self._sessions: dict[str, AsyncClientSession] = {}
+        # { <host>: httpx.AsyncHTTPTransport }
+        self._transports: dict[str, httpx.AsyncHTTPTransport] = {}
+        self._rate_limits: dict[Service, RateLimit] = {}
+        # { <endpoint url>: {endpoint, requests, errors, in_flight} }
+        self._stats: dict[str, dict] = {}
+        self._lock = asyncio.Lock()
+
+    def _transport(self, url: str) -> httpx.AsyncHTTPTransport:
+        host = urlsplit(url).netloc
+        if host not in self._transports:
+            if GQL_HTTP2 and not HTTP2_AVAILABLE:
+                logger.warning("GQL_HTTP2 is set but h2 is not installed: using HTTP/1.1")
+            self._transports[host] = httpx.AsyncHTTPTransport(
+                http2=GQL_HTTP2 and HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=GQL_MAX_CONNECTIONS,
+                    max_keepalive_connections=GQL_MAX_CONNECTIONS,
+                ),
+            )
+        return self._transports[host]
+
+    def _rate_limit(self, service: Service) -> RateLimit:
+        if service not in self._rate_limits:
+            self._rate_limits[service] = RateLimit(
+                rate_max_sec=float(GQL_RATE_LIMITS.get(service.value, 0) or 0)
+            )
+        return self._rate_limits[service]
+
+    async def session(
+        self, service: SubgraphService, schema: GraphQLSchema
+    ) -> AsyncClientSession:
+        """Connected session of the service endpoint ( created once )"""
+        url = service.url()
+        if (session := self._sessions.get(url)) is None:
+            async with self._lock:
+                if (session := self._sessions.get(url)) is None:
+                    client = AsyncGqlClient(
+                        url=url,
+                        schema=schema,
+                        execute_timeout=GQL_CLIENT_TIMEOUT,
+                        headers=service.headers(),
+                        transport=self._transport(url),
+                    )
+                    session = self._sessions[url] = await client.connect_async()
+                    self._stats[url] = {
+                        # no api keys ( part of some urls )
+                        "endpoint": f"{service.service.value}::{service.subgraph_id}",
+                        "requests": 0,
+                        "errors": 0,
+                        "in_flight": 0,
+                    }
+        return session
+
+    async def execute(
+        self, service: SubgraphService, schema: GraphQLSchema, document
+    ) -> dict:
+        """Execute a gql document using the service endpoint session"""
+        session = await self.session(service, schema)
+        await self._rate_limit(service.service).wait()
+
+        stats = self._stats[service.url()]
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        try:
+            return await session.execute(document)
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+
+    async def close(self):
+        """Close all sessions ( app shutdown )"""
+        async with self._lock:
+            for url, session in self._sessions.items():
+                try:
+                    await session.client.close_async()
+                except Exception as e:
+                    logger.debug("Error closing subgraph session %s: %s", url, e)
+            self._sessions.clear()
+            self._transports.clear()
+
+    def stats(self) -> dict:
+        """Endpoint, connection pool and rate limit metrics"""
+        hosts = {}
+        for host, transport in self._transports.items():
+            connections = getattr(transport._pool, "connections", [])
+            idle = sum(1 for x in connections if x.is_idle())
+            hosts[host] = {
+                "connections": len(connections),
+                "active": len(connections) - idle,
+                "idle": idle,
+                "max_connections": GQL_MAX_CONNECTIONS,
+            }
+        return {
+            "endpoints": [dict(stats) for stats in self._stats.values()],
+            "hosts": hosts,
+            "rate_limits": {
+                service.value: {
+                    "rate_max_sec": limit.rate_max_sec,
+                    "waited_seconds": limit.waited_seconds,
+                }
+                for service, limit in self._rate_limits.items()
+            },
+        }
+
+
+# process-wide subgraph sessions
+subgraph_sessions = SubgraphSessionPool()
+
+
+# parsed schemas { <schema path>: (GraphQLSchema, DSLSchema) }
+_SCHEMAS: dict[str, tuple[GraphQLSchema, DSLSchema]] = {}
+
+
+def get_schema(schema_path: str) -> tuple[GraphQLSchema, DSLSchema]:
+    """Parse a schema file once per process"""
+    if schema_path not in _SCHEMAS:
+        with open(schema_path, encoding="utf-8") as schema_file:
+            schema = build_ast_schema(parse(schema_file.read()))
+        _SCHEMAS[schema_path] = (schema, DSLSchema(schema))
+    return _SCHEMAS[schema_path]
+
+
+class _FragmentSpreads(Visitor):
+    """Collect the fragment names spread in an ast"""
+
+    def __init__(self):
+        super().__init__()
+        self.names: set[str] = set()
+
+    def enter_fragment_spread(self, node: FragmentSpreadNode, *_):
+        self.names.add(node.name.value)
+
+
+def _fragment_spreads(node: Node) -> set[str]:
+    visitor = _FragmentSpreads()
+    visit(node, visitor)
+    return visitor.names
+
+
 class SubgraphClient:
-    """Subgraph base client to manage query execution and shared fragments"""
+    """Subgraph base client to manage query execution and shared fragments
+
+    Clients are shared between requests ( see get_subgraph_client ): each query only
+    includes the fragments it uses and runs in the endpoint pooled session ( subgraph_sessions ).
+    """
 
     def __init__(self, schema_path: str, subgraph_id: str) -> None:
-        with open(schema_path, encoding="utf-8") as schema_file:
-            schema = schema_file.read()
+        self.schema, self.data_schema = get_schema(schema_path)
 
         self.parse_subgraph_id(subgraph_id)
 
-        self.client = AsyncGqlClient(
-            url=self.service.url(),
-            schema=schema,
-            execute_timeout=GQL_CLIENT_TIMEOUT,
-            headers=self.service.headers(),
-        )
-        self.data_schema = DSLSchema(self.client.schema)
         self._fragment_dependencies: list[DSLFragment] = []
         self._fragments_used: list[str] = []
 
+    async def session(self) -> AsyncClientSession:
+        """Pooled long-lived session of this subgraph endpoint"""
+        return await subgraph_sessions.session(self.service, self.schema)
+
     def parse_subgraph_id(self, subgraph_id: str) -> None:
         """Parse out service and subgraph ID"""
         service, parsed_id = subgraph_id.split("::")
@@ -158,18 +351,29 @@ class SubgraphClient:
     async def execute(
         self, query: DSLQuery, session: AsyncGqlClient | None = None
     ) -> dict:
-        """Executes query and returns result"""
-        gql = dsl_gql(*self._fragment_dependencies, query)
+        """Executes query and returns result
 
-        logger.debug("Subgraph call to %s", self.client.url)
+        Queries always run in the endpoint pooled session: session is kept for compatibility
+        """
+        gql = dsl_gql(*self._query_fragments(query), query)
 
-        if session:
-            result = await session.execute(gql)
-        else:
-            async with self.client as session:
-                result = await session.execute(gql)
+        logger.debug(
+            "Subgraph call to %s::%s", self.service.service.value, self.subgraph_id
+        )
+
+        return await subgraph_sessions.execute(self.service, self.schema, gql)
 
-        return result
+    def _query_fragments(self, query: DSLQuery) -> list[DSLFragment]:
+        """Fragments used by the query ( and by those fragments )"""
+        fragments = {frag.name: frag for frag in self._fragment_dependencies}
+        used = set()
+        pending = [query.executable_ast]
+        while pending:
+            for name in _fragment_spreads(pending.pop()) - used:
+                if name in fragments:
+                    used.add(name)
+                    pending.append(fragments[name].executable_ast)
+        return [frag for frag in self._fragment_dependencies if frag.name in used]
 
     @fragment
     def meta_fields_fragment(self) -> DSLFragment:
@@ -181,6 +385,18 @@ class SubgraphClient:
         return frag
 
 
+# shared clients { (<client class>, *<client args>): SubgraphClient }
+_CLIENTS: dict[tuple, SubgraphClient] = {}
+
+
+def get_subgraph_client(client_class: type[SubgraphClient], *args) -> SubgraphClient:
+    """Get or init a shared subgraph client ( i.e. per protocol and chain )"""
+    key = (client_class, *args)
+    if key not in _CLIENTS:
+        _CLIENTS[key] = client_class(*args)
+    return _CLIENTS[key]
+
+
 class SubgraphData(ABC):
     """Abstract base class for subgraph data."""
 
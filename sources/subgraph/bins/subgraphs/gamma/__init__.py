@@ -17,9 +17,8 @@ class GammaClient(SubgraphClient):
         )
 
 
-def get_gamma_client(protocol: Protocol, chain: Chain):
-    """Get or init GammaClient as required"""
-    if gamma_clients.get(protocol, {}).get(chain):
-        return gamma_clients[protocol][chain]
-    else:
-        return GammaClient(protocol, chain)
+def get_gamma_client(protocol: Protocol, chain: Chain) -> GammaClient:
+    """Get or init the shared GammaClient"""
+    if not (client := gamma_clients[protocol].get(chain)):
+        client = gamma_clients[protocol][chain] = GammaClient(protocol, chain)
+    return client
@@ -4,7 +4,11 @@ from gql.dsl import DSLFragment
 
 from sources.subgraph.bins.config import dex_hypepool_subgraph_ids
 from sources.subgraph.bins.enums import Chain, Protocol
-from sources.subgraph.bins.subgraphs import SubgraphClient, fragment
+from sources.subgraph.bins.subgraphs import (
+    SubgraphClient,
+    fragment,
+    get_subgraph_client,
+)
 
 
 class HypePoolClient(SubgraphClient):
@@ -135,3 +139,8 @@ class HypePoolClient(SubgraphClient):
         )
 
         return frag
+
+
+def get_hype_pool_client(protocol: Protocol, chain: Chain) -> HypePoolClient:
+    """Get or init the shared HypePoolClient"""
+    return get_subgraph_client(HypePoolClient, protocol, chain)
@@ -1,6 +1,6 @@
 from sources.subgraph.bins.config import RECOVERY_POOL
 from sources.subgraph.bins.enums import Chain, Protocol
-from sources.subgraph.bins.subgraphs import SubgraphClient
+from sources.subgraph.bins.subgraphs import SubgraphClient, get_subgraph_client
 
 
 class RecoveryPoolClient(SubgraphClient):
@@ -10,3 +10,8 @@ class RecoveryPoolClient(SubgraphClient):
             subgraph_id=RECOVERY_POOL,
             schema_path="sources/subgraph/bins/subgraphs/recovery_pool/schema.graphql",
         )
+
+
+def get_recovery_pool_client() -> RecoveryPoolClient:
+    """Get or init the shared RecoveryPoolClient"""
+    return get_subgraph_client(RecoveryPoolClient)
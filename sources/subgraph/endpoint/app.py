@@ -5,18 +5,19 @@ from collections.abc import AsyncIterator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
+from endpoint.config.cache import CacheWarmer, init_cache
 
+from sources.common.database.common.db_managers import close_mongo_clients
 from sources.subgraph.endpoint.routers import build_routers, build_routers_compatible
 from sources.subgraph.bins.config import gamma_clients, DEPLOYMENTS, RUN_MODE
+from sources.subgraph.bins.subgraphs import subgraph_sessions
 from sources.subgraph.bins.subgraphs.gamma import GammaClient
 
 logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Define actions for lifespan of app"""
     if RUN_MODE != "DEV":
         for i, (protocol, chain) in enumerate(DEPLOYMENTS):
@@ -29,8 +30,16 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
             )
             gamma_clients[protocol][chain] = GammaClient(protocol, chain)
     logger.info("Initiating FastAPI cache")
-    FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+    init_cache(prefix="fastapi-cache")
+    cache_warmer = CacheWarmer(app)
+    cache_warmer.start()
     yield
+    logger.info("Stopping cache warm-up")
+    await cache_warmer.stop()
+    logger.info("Closing pooled database connections")
+    close_mongo_clients()
+    logger.info("Closing pooled subgraph sessions")
+    await subgraph_sessions.close()
 
 
 def create_app(
@@ -1,10 +1,11 @@
 import asyncio
 from fastapi import APIRouter, Response, status, Query
-from fastapi_cache.decorator import cache
+from endpoint.config.cache import cache
 
 from endpoint.config.cache import (
     ALLDATA_CACHE_TIMEOUT,
     APY_CACHE_TIMEOUT,
+    CACHE_STALE_TIMEOUT,
     CHARTS_CACHE_TIMEOUT,
     DASHBOARD_CACHE_TIMEOUT,
     DB_CACHE_TIMEOUT,
@@ -310,7 +311,7 @@ class subgraph_router_builder(router_builder_generalTemplate):
         )
 
     #    hypervisors
-    @cache(expire=ALLDATA_CACHE_TIMEOUT)
+    @cache(expire=ALLDATA_CACHE_TIMEOUT, stale=CACHE_STALE_TIMEOUT)
     async def hypervisors_aggregate_stats(self, response: Response):
         result = agg_stats.AggregateStats(
             protocol=self.dex, chain=self.chain, response=response
@@ -341,7 +342,7 @@ class subgraph_router_builder(router_builder_generalTemplate):
             protocol=self.dex, chain=self.chain, response=response
         )
 
-    @cache(expire=ALLDATA_CACHE_TIMEOUT)
+    @cache(expire=ALLDATA_CACHE_TIMEOUT, stale=CACHE_STALE_TIMEOUT)
     async def hypervisors_all_data(self, response: Response):
         all_data = hypervisor.AllData(
             protocol=self.dex, chain=self.chain, response=response
@@ -443,7 +444,7 @@ class subgraph_router_builder(router_builder_generalTemplate):
     async def hypervisors_rewards(self, response: Response):
         return await masterchef.info(protocol=self.dex, chain=self.chain)
 
-    @cache(expire=ALLDATA_CACHE_TIMEOUT)
+    @cache(expire=ALLDATA_CACHE_TIMEOUT, stale=CACHE_STALE_TIMEOUT)
     async def hypervisors_rewards2(self, response: Response):
         masterchef_v2_info = masterchef_v2.AllRewards2(
             protocol=self.dex, chain=self.chain, response=response
@@ -548,7 +549,7 @@ class subgraph_router_builder_compatible(subgraph_router_builder):
         result = GammaYield(Chain.ETHEREUM, days=30)
         return await result.output()
 
-    @cache(expire=DASHBOARD_CACHE_TIMEOUT)
+    @cache(expire=DASHBOARD_CACHE_TIMEOUT, stale=CACHE_STALE_TIMEOUT)
     async def dashboard(self, response: Response, period: str = "weekly"):
         result = Dashboard(period.lower())
 
@@ -629,7 +630,7 @@ class subgraph_router_builder_allDeployments(router_builder_baseTemplate):
 
         return router
 
-    @cache(expire=DASHBOARD_CACHE_TIMEOUT)
+    @cache(expire=DASHBOARD_CACHE_TIMEOUT, stale=CACHE_STALE_TIMEOUT)
     async def aggregate_stats(
         self,
         response: Response,
@@ -676,7 +677,7 @@ class subgraph_router_builder_allDeployments(router_builder_baseTemplate):
         result = GammaYield(Chain.ETHEREUM, days=30)
         return await result.output()
 
-    @cache(expire=DASHBOARD_CACHE_TIMEOUT)
+    @cache(expire=DASHBOARD_CACHE_TIMEOUT, stale=CACHE_STALE_TIMEOUT)
     async def dashboard(self, response: Response, period: str = "weekly"):
         result = Dashboard(period.lower())
 
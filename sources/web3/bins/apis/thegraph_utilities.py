@@ -1,3 +1,4 @@
+import asyncio
 import sys
 
 import datetime as dt
@@ -11,6 +12,11 @@ from sources.web3.bins.cache import cache_utilities
 RATE_LIMIT_THEGRAPH = net_utilities.rate_limit(
     rate_max_sec=4
 )  # thegraph global rate limiter
+RATE_LIMIT_THEGRAPH_ASYNC = net_utilities.async_rate_limit(
+    rate_max_sec=4
+)  # thegraph global rate limiter ( non-blocking )
+# "database unavailable" retries of a page ( waiting 5, 10, 20... seconds )
+UNAVAILABLE_MAX_RETRY = 5
 
 
 ## GLOBAL ##
@@ -172,6 +178,162 @@ class thegraph_scraper_helper:
         # return
         return result
 
+    async def get_all_results_async(
+        self, network: str, query_name: str, **kwargs
+    ) -> list:
+        """Non-blocking get_all_results
+
+        Pages are requested using the last item id as cursor ( id_gt ) instead of skip when the query
+        is ordered by id ( no orderby nor skip kwargs defined ), so that every page costs the same to thegraph.
+
+        network:str = "ethereum"
+        query_name:str = "uniswapV3Hypervisors" or "accounts"
+
+        kwargs=
+            where:str = " id : '0x0000000000' "
+            orderby:str= "timestamp"
+            orderDirection:str= "asc" or "desc"
+            block:str = "number: { 15432282 } "
+        """
+        result = None
+
+        # check cache, if enabled
+        if self._CACHE is not None:
+            result = self._CACHE.get_data(
+                network=network, query_name=query_name, **kwargs
+            )
+
+        if result is None:
+            try:
+                result = await self._get_pages_async(
+                    network=network, query_name=query_name, **kwargs
+                )
+            except Exception:
+                logging.getLogger(__name__).exception(
+                    f"Unexpected error while retrieving query {query_name}      .error: {sys.exc_info()[0]}"
+                )
+                result = []
+
+            # save it to cache, if enabled
+            if (
+                self._CACHE is not None
+                and not self._CACHE.add_data(
+                    data=result, network=network, query_name=query_name, **kwargs
+                )
+                and "block" in kwargs
+            ):
+                # not saved to cache
+                logging.getLogger(__name__).warning(
+                    f"Could not save thegraph data to cache ->  network:{network} query:{query_name} "
+                )
+
+        # convert result
+        if self._CONVERT:
+            for itm in result:
+                self._converter(itm, query_name, network)
+
+        return result
+
+    async def get_all_results_networks(
+        self, networks: list[str], query_name: str, **kwargs
+    ) -> dict[str, list]:
+        """Run the same query concurrently in multiple networks
+
+        Returns:
+            dict[str, list]: { <network>: <results> }
+        """
+        results = await asyncio.gather(
+            *[
+                self.get_all_results_async(
+                    network=network, query_name=query_name, **kwargs
+                )
+                for network in networks
+            ]
+        )
+        return dict(zip(networks, results))
+
+    async def _get_pages_async(self, network: str, query_name: str, **kwargs) -> list:
+        """Query all pages of a query, using the id cursor when possible"""
+        result = []
+        _url = self._url_constructor(network, query_name)
+        _skip = kwargs.get("skip", 0)
+        # cursor pagination when results are ordered by id
+        _cursor = "skip" not in kwargs and kwargs.get("orderby", "id") in ("", "id")
+        _last_id = None
+        _unavailable_retry = 0
+
+        while True:
+            if _cursor:
+                _kwargs = {**kwargs, "orderby": "id", "orderDirection": "asc"}
+                if _last_id is not None:
+                    _kwargs["where"] = ", ".join(
+                        x for x in (kwargs.get("where", ""), f'id_gt: "{_last_id}"') if x
+                    )
+                _filter = self._filter_constructor(**_kwargs)
+                _query, path_to_data = self._query_constructor(
+                    skip=0, name=query_name, filter=_filter
+                )
+            else:
+                _query, path_to_data = self._query_constructor(
+                    skip=_skip, name=query_name, filter=self._filter_constructor(**kwargs)
+                )
+
+            # wait till sufficient time has been passed between queries
+            await RATE_LIMIT_THEGRAPH_ASYNC.continue_when_safe()
+            _response = await net_utilities.async_post_request(
+                url=_url,
+                query=_query,
+                retry=0,
+                max_retry=2,
+                wait_secs=5,
+                timeout_secs=self.timeout_secs,
+            )
+
+            _data = _response
+            try:
+                for key in path_to_data:
+                    _data = _data[key]
+            except (KeyError, TypeError, IndexError):
+                if (
+                    "database unavailable" in str(_response.get("errors", "")).lower()
+                    and _unavailable_retry < UNAVAILABLE_MAX_RETRY
+                ):
+                    # connection error: wait and loop again
+                    _wait_secs = 5 * 2**_unavailable_retry
+                    _unavailable_retry += 1
+                    logging.getLogger(__name__).error(
+                        f" Seems like subgraph isnt available temporarily. Retrying in {_wait_secs}sec."
+                    )
+                    await asyncio.sleep(_wait_secs)
+                    continue
+
+                logging.getLogger(__name__).error(
+                    f" Unexpected error retrieving data path  query name:{query_name}   data:{_response}"
+                )
+                break
+
+            if not _data:
+                # exit loop
+                break
+
+            _unavailable_retry = 0
+            # add to result
+            result.extend(_data)
+            # check if we are done
+            if len(_data) < 1000:
+                # qtty is less than window ("first" var at query)
+                break
+
+            # modify pagination var
+            if _cursor and len(path_to_data) == 2 and "id" in _data[-1]:
+                _last_id = _data[-1]["id"]
+            else:
+                # nested or id-less data: use skip
+                _cursor = False
+                _skip += len(_data)
+
+        return result
+
     @property
     def networks(self) -> list[str]:
         """available networks
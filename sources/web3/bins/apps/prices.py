@@ -1,5 +1,6 @@
 import asyncio
 
+from sources.common.general.enums import text_to_chain
 from sources.common.prices.helpers import get_prices
 from sources.web3.bins.mixed.price_utilities import price_scraper
 
@@ -69,17 +70,19 @@ async def get_token_price_usd(token_address: str, network: str, block: int) -> f
         float: token price in usd
     """
 
-    # TODO: try getting price from database first, if block is set
+    # try getting price from database first, if block is set
     if block:
-        if price := get_prices(
-            token_addresses=[token_address], network=network, block=block
+        if price := await get_prices(
+            token_addresses=[token_address],
+            network=text_to_chain(network),
+            block=block,
         ):
-            return price[0]["price"]
+            return price[token_address]["price"]
 
     price_helper = price_scraper(cache=False)
 
     try:
-        price_token = price_helper.get_price(
+        price_token = await price_helper.get_price_async(
             network=network,
             token_id=token_address,
             block=block,
@@ -105,8 +108,8 @@ async def get_prices_usd(
         dict: token price in usd
     """
 
-    if prices := get_prices(
-        token_addresses=token_addresses, network=network, block=block
+    if prices := await get_prices(
+        token_addresses=token_addresses, network=text_to_chain(network), block=block
     ):
         return prices
 
@@ -1,4 +1,4 @@
-from sources.common.general.config import get_config
+from sources.common.general.config import get_config, get_config_flag
 from sources.common.general.enums import Chain
 
 
@@ -7,6 +7,12 @@ CONFIGURATION = {"cache": {"save_path": "data/cache"}}  # load_configuration()
 # load rpc providers
 CONFIGURATION["WEB3_PROVIDER_URLS"] = get_config("WEB3_PROVIDER_URLS")
 CONFIGURATION["WEB3_PROVIDER_DEFAULT_ORDER"] = get_config("WEB3_PROVIDER_DEFAULT_ORDER")
+# multicall batching
+CONFIGURATION["WEB3_MULTICALL_ENABLED"] = get_config_flag("WEB3_MULTICALL_ENABLED")
+CONFIGURATION["WEB3_MULTICALL_MAX_CALLS"] = int(get_config("WEB3_MULTICALL_MAX_CALLS"))
+# rpc provider pool
+CONFIGURATION["WEB3_RPC_TIMEOUT"] = float(get_config("WEB3_RPC_TIMEOUT"))
+CONFIGURATION["WEB3_RPC_HEDGE"] = get_config_flag("WEB3_RPC_HEDGE")
 
 # check configuration
 # check_configuration_file(CONFIGURATION)
@@ -43,6 +49,11 @@ def get_from_memory(key) -> list:
 
 WEB3_CHAIN_IDS = {chain.database_name: chain.id for chain in Chain}
 
+# Multicall3 is deployed at the same address on most chains ( https://www.multicall3.com )
+#   networks not listed in MULTICALL3_ADDRESSES use the default one
+MULTICALL3_DEFAULT_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL3_ADDRESSES = {}
+
 
 STATIC_REGISTRY_ADDRESSES = {
     "ethereum": {
@@ -1,6 +1,12 @@
-from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 
+from sources.common.database.common.db_managers import get_mongo_client
+from sources.subgraph.bins.config import MONGO_DB_CONFIGURE_INDEXES
+
+# collections already configured (indexes created) by this process:  (url, db_name, coll_name)
+#   web3 collections configurations use their own format ( {<field>: <uniqueness>} )
+_CONFIGURED_COLLECTIONS: set[tuple[str, str, str]] = set()
+
 
 class MongoDbManager:
     def __init__(self, url: str, db_name: str, collections: dict):
@@ -20,47 +26,48 @@ class MongoDbManager:
                                }
         """
 
-        # connect to mongo database
+        # use the shared ( pooled ) client for this url
+        self._url = url
         try:
-            self.mongo_client = MongoClient(url)
+            self.mongo_client = get_mongo_client(url=url)
         except ConnectionFailure as e:
             raise ValueError(f"Failed not connect to {url}") from e
         self.database = self.mongo_client[db_name]
 
-        # Retrieve database collection names
-        self.database_collections = self.database.list_collection_names()
-
         # define collection configurations
         self.collections_config = collections
 
-        # Setup collections and their indexes
+        # Setup collections and their indexes ( only once per process )
         self.configure_collections()
 
     def __enter__(self):
         return self
 
     def __exit__(self, type, value, traceback):
-        # xception handling here
-        self.mongo_client.close()
+        # the client is shared between managers: closed at app shutdown (close_mongo_clients)
+        pass
 
     def configure_collections(self):
         """define collection names and create indexes"""
-        for coll_name, fields in self.collections_config.items():
-            for field, unique in fields.items():
-                self.database[coll_name].create_index(field, unique=unique)
+        for coll_name in self.collections_config.keys():
+            self.create_collection(coll_name=coll_name)
 
     def create_collection(self, coll_name: str, **indexes):
-        """Creates a collection if it does not exist.
+        """Creates the collection indexes if not already done by this process.
         Arguments:
            indexes = [ <collection field name>:str = <unique>:bool  ]
         """
+        _key = (self._url, self.database.name, coll_name)
+        if _key in _CONFIGURED_COLLECTIONS or not MONGO_DB_CONFIGURE_INDEXES:
+            # already configured or indexes are setup externally ( setup_database.py )
+            return
 
-        if coll_name not in self.database_collections:
-            for field, unique in indexes.items():
-                self.database[coll_name].create_index(field, unique=unique)
+        for field, unique in (
+            indexes or self.collections_config.get(coll_name, {})
+        ).items():
+            self.database[coll_name].create_index(field, unique=unique)
 
-            # refresh database collection names
-            self.database_collections = self.database.list_collection_names()
+        _CONFIGURED_COLLECTIONS.add(_key)
 
     def add_item(self, coll_name: str, dbFilter: dict, data: dict, upsert=True):
         """Add or Update item
@@ -1,12 +1,30 @@
+import asyncio
 import sys
 import datetime as dt
+import httpx
 import requests
 import logging
 import time
 import threading
+import weakref
 
 from requests import exceptions as req_exceptions
 
+# shared async clients ( keep-alive connections ) { <event loop>: httpx.AsyncClient }
+#   a client connection pool is bound to the loop it was first used in
+_ASYNC_CLIENTS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Shared async client of the running event loop"""
+    loop = asyncio.get_running_loop()
+    if (client := _ASYNC_CLIENTS.get(loop)) is None:
+        client = _ASYNC_CLIENTS[loop] = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=1),
+            timeout=30,
+        )
+    return client
+
 
 #
 def post_request(
@@ -88,6 +106,50 @@ def get_request(
         )
 
 
+async def async_post_request(
+    url: str,
+    query: str,
+    retry: int = 0,
+    max_retry: int = 2,
+    wait_secs: int = 5,
+    timeout_secs: int = 10,
+) -> dict:
+    """Non-blocking post_request"""
+    try:
+        request = await get_async_client().post(
+            url=url, json={"query": query}, timeout=timeout_secs
+        )
+        return request.json()
+    except httpx.ConnectError as err:
+        logging.getLogger(__name__).warning(f"Connection to {url} has been closed...")
+    except httpx.TimeoutException as err:
+        logging.getLogger(__name__).warning(f"Connection to {url} has timed out...")
+    except Exception:
+        logging.getLogger(__name__).exception(
+            f"Unexpected error while posting request at {url} .error: {sys.exc_info()[0]}"
+        )
+
+    # check if retry is needed
+    if retry < max_retry:
+        logging.getLogger(__name__).warning(
+            f"    Waiting {wait_secs} seconds to retry {url} query for the {retry} time."
+        )
+
+        await asyncio.sleep(wait_secs)
+        # retry
+        return await async_post_request(
+            url=url,
+            query=query,
+            retry=retry + 1,
+            max_retry=max_retry,
+            wait_secs=wait_secs,
+            timeout_secs=timeout_secs,
+        )
+
+    # return empty dict
+    return {}
+
+
 class rate_limit:
     def __init__(self, rate_max_sec: float):
         self.rate_max_sec: float = rate_max_sec
@@ -142,3 +204,20 @@ class rate_limit:
 
         # keep track
         self.hit()
+
+
+class async_rate_limit:
+    """Non-blocking rate limiter: spaces calls evenly to at most rate_max_sec per second"""
+
+    def __init__(self, rate_max_sec: float):
+        self.rate_max_sec: float = rate_max_sec
+        self._next_slot: float = 0
+
+    async def continue_when_safe(self):
+        """Wait here ( without blocking the event loop ) till rate is in bounds"""
+        now = time.monotonic()
+        # reserve the next free slot ( no await in between: safe within the event loop )
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate_max_sec
+        if slot > now:
+            await asyncio.sleep(slot - now)
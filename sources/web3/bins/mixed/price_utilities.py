@@ -1,3 +1,4 @@
+import asyncio
 import contextlib
 from datetime import datetime
 import sys
@@ -73,12 +74,86 @@ class price_scraper:
         return: price_usd_token
         """
 
-        # result var
-        _price = None
+        # make address lower case
+        token_id = token_id.lower()
+
+        # cache and geckoterminal
+        _price = self._get_price_first_sources(network, token_id, block, of)
+
+        if _price in [None, 0]:
+            # get a list of thegraph_connectors
+            thegraph_connectors = self._get_connector_candidates(network=network)
+
+            for dex, connector in thegraph_connectors.items():
+                logging.getLogger(LOG_NAME).debug(
+                    f" Trying to get {network}'s token {token_id} price at block {block} from {dex} subgraph"
+                )
+                with contextlib.suppress(Exception):
+                    _price = self._get_price_from_thegraph(
+                        thegraph_connector=connector,
+                        dex=dex,
+                        network=network,
+                        token_id=token_id,
+                        block=block,
+                        of=of,
+                    )
+
+                    if _price not in [None, 0]:
+                        # exit for loop
+                        break
+
+        # coingecko and save cache
+        return self._get_price_last_sources(network, token_id, block, of, _price)
+
+    async def get_price_async(
+        self, network: str, token_id: str, block: int = 0, of: str = "USD"
+    ) -> float:
+        """Non-blocking get_price: subgraphs are queried with the async scraper
+            and the remaining sources run in a worker thread
+
+        return: price_usd_token
+        """
 
         # make address lower case
         token_id = token_id.lower()
 
+        # cache and geckoterminal
+        _price = await asyncio.to_thread(
+            self._get_price_first_sources, network, token_id, block, of
+        )
+
+        if _price in [None, 0]:
+            # get a list of thegraph_connectors
+            thegraph_connectors = self._get_connector_candidates(network=network)
+
+            for dex, connector in thegraph_connectors.items():
+                logging.getLogger(LOG_NAME).debug(
+                    f" Trying to get {network}'s token {token_id} price at block {block} from {dex} subgraph"
+                )
+                with contextlib.suppress(Exception):
+                    _price = await self._get_price_from_thegraph_async(
+                        thegraph_connector=connector,
+                        dex=dex,
+                        network=network,
+                        token_id=token_id,
+                        block=block,
+                        of=of,
+                    )
+
+                    if _price not in [None, 0]:
+                        # exit for loop
+                        break
+
+        # coingecko and save cache
+        return await asyncio.to_thread(
+            self._get_price_last_sources, network, token_id, block, of, _price
+        )
+
+    def _get_price_first_sources(
+        self, network: str, token_id: str, block: int, of: str
+    ) -> float | None:
+        """Get price from cache or geckoterminal"""
+
         # try return price from cached values
         try:
             _price = self.cache.get_data(
@@ -106,27 +181,12 @@ class price_scraper:
                     f" Could not get {network}'s token {token_id} price at block {block} from geckoterminal. error-> {e}"
                 )
 
-        if _price in [None, 0]:
-            # get a list of thegraph_connectors
-            thegraph_connectors = self._get_connector_candidates(network=network)
-
-            for dex, connector in thegraph_connectors.items():
-                logging.getLogger(LOG_NAME).debug(
-                    f" Trying to get {network}'s token {token_id} price at block {block} from {dex} subgraph"
-                )
-                with contextlib.suppress(Exception):
-                    _price = self._get_price_from_thegraph(
-                        thegraph_connector=connector,
-                        dex=dex,
-                        network=network,
-                        token_id=token_id,
-                        block=block,
-                        of=of,
-                    )
+        return _price
 
-                    if _price not in [None, 0]:
-                        # exit for loop
-                        break
+    def _get_price_last_sources(
+        self, network: str, token_id: str, block: int, of: str, _price: float | None
+    ) -> float | None:
+        """Get price from coingecko when not found yet and save it to cache"""
 
         # coingecko
         if (
@@ -189,23 +249,55 @@ class price_scraper:
                 f" Cannot find {of} price method to be gathered from"
             )
 
-        _where_query = f""" id: "{token_id}" """
+        _data = thegraph_connector.get_all_results(
+            network=network,
+            query_name="tokens",
+            **self._thegraph_price_filter(token_id=token_id, block=block),
+        )
 
-        if block != 0:
-            # get price at block
-            _block_query = f""" number: {block}"""
-            _data = thegraph_connector.get_all_results(
-                network=network,
-                query_name="tokens",
-                where=_where_query,
-                block=_block_query,
-            )
-        else:
-            # get current block price
-            _data = thegraph_connector.get_all_results(
-                network=network, query_name="tokens", where=_where_query
+        return self._price_from_thegraph_data(
+            _data=_data, dex=dex, network=network, token_id=token_id, block=block
+        )
+
+    async def _get_price_from_thegraph_async(
+        self,
+        thegraph_connector,
+        dex: str,
+        network: str,
+        token_id: str,
+        block: int,
+        of: str,
+    ) -> float:
+        if of != "USD":
+            raise NotImplementedError(
+                f" Cannot find {of} price method to be gathered from"
             )
 
+        _data = await thegraph_connector.get_all_results_async(
+            network=network,
+            query_name="tokens",
+            **self._thegraph_price_filter(token_id=token_id, block=block),
+        )
+
+        return self._price_from_thegraph_data(
+            _data=_data, dex=dex, network=network, token_id=token_id, block=block
+        )
+
+    def _thegraph_price_filter(self, token_id: str, block: int) -> dict:
+        """thegraph tokens query filter kwargs"""
+        if block != 0:
+            # get price at block
+            return {
+                "where": f""" id: "{token_id}" """,
+                "block": f""" number: {block}""",
+            }
+        # get current block price
+        return {"where": f""" id: "{token_id}" """}
+
+    def _price_from_thegraph_data(
+        self, _data: list, dex: str, network: str, token_id: str, block: int
+    ) -> float:
+        """Unit usd price from thegraph tokens query result"""
         # process query
         try:
             # get the first item in data list
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+from functools import cache
+from typing import Awaitable, Callable
+
+from web3 import Web3
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+from sources.web3.bins.configuration import (
+    CONFIGURATION,
+    MULTICALL3_ADDRESSES,
+    MULTICALL3_DEFAULT_ADDRESS,
+)
+from sources.web3.bins.w3.registry import get_abi
+
+logger = logging.getLogger(__name__)
+
+# eth_call executor: ( transaction, block ) -> return data
+EthCall = Callable[[dict, int], Awaitable[bytes]]
+
+
+class multicall_unavailable(Exception):
+    """The aggregated call could not be executed ( not deployed at that block, rpc errors ... )"""
+
+
+class multicall3:
+    """Multicall3 contract: encodes and decodes aggregate3 calls executed with a given eth_call"""
+
+    def __init__(self, address: str):
+        self.address = Web3.to_checksum_address(address)
+        self._contract = Web3().eth.contract(
+            address=self.address,
+            abi=get_abi(filename="multicall3", folder_path="sources/common/abis"),
+        )
+
+    async def aggregate3(
+        self, calls: list[tuple[str, bytes]], block: int, eth_call: EthCall
+    ) -> list[tuple[bool, bytes]]:
+        """Execute a list of ( target address, calldata ) calls allowing failures
+
+        Returns:
+            list[tuple[bool, bytes]]: ( success, return data ) of each call
+        """
+        return_data = await eth_call(
+            {
+                "to": self.address,
+                "data": self._contract.encodeABI(
+                    fn_name="aggregate3",
+                    args=[[(target, True, calldata) for target, calldata in calls]],
+                ),
+            },
+            block,
+        )
+        if not return_data:
+            raise multicall_unavailable(
+                f" Multicall3 {self.address} returned no data at block {block}"
+            )
+        return self._contract.w3.codec.decode(["(bool,bytes)[]"], return_data)[0]
+
+
+class multicall3_local:
+    """Local test double of the Multicall3 contract: executes each call with eth_call,
+    following aggregate3 allowFailure semantics ( for chains without Multicall3 or for testing )
+    """
+
+    async def aggregate3(
+        self, calls: list[tuple[str, bytes]], block: int, eth_call: EthCall
+    ) -> list[tuple[bool, bytes]]:
+        result = []
+        for target, calldata in calls:
+            try:
+                result.append(
+                    (True, await eth_call({"to": target, "data": calldata}, block))
+                )
+            except Exception as e:
+                logger.debug(f" local multicall failed calling {target}: {e}")
+                result.append((False, b""))
+        return result
+
+
+@cache
+def get_multicall_contract(network: str) -> multicall3 | multicall3_local:
+    address = MULTICALL3_ADDRESSES.get(network, MULTICALL3_DEFAULT_ADDRESS)
+    return multicall3_local() if address == "local" else multicall3(address=address)
+
+
+class multicall_batcher:
+    """Pending calls of one network and block, executed together in aggregate3 calls"""
+
+    def __init__(
+        self,
+        network: str,
+        block: int,
+        eth_call: EthCall,
+        contract: multicall3 | multicall3_local,
+        max_calls: int,
+    ):
+        self.network = network
+        self.block = block
+        self._eth_call = eth_call
+        self._contract = contract
+        self._max_calls = max_calls
+        self._calls: list[tuple[str, bytes]] = []
+        self._futures: list[asyncio.Future] = []
+
+    def add(self, target: str, calldata: bytes) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._calls.append((target, calldata))
+        self._futures.append(future)
+        return future
+
+    async def execute(self):
+        await asyncio.gather(
+            *[
+                self._execute_chunk(i, i + self._max_calls)
+                for i in range(0, len(self._calls), self._max_calls)
+            ]
+        )
+
+    async def _execute_chunk(self, ini: int, end: int):
+        futures = self._futures[ini:end]
+        try:
+            results = await self._contract.aggregate3(
+                calls=self._calls[ini:end], block=self.block, eth_call=self._eth_call
+            )
+        except Exception as e:
+            if isinstance(e, multicall_unavailable):
+                _mark_unavailable(network=self.network, block=self.block)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(multicall_unavailable(str(e)))
+            return
+
+        _mark_available(network=self.network, block=self.block)
+
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# networks blocks where Multicall3 is known not to be deployed { <network>: <max block> }
+_UNAVAILABLE: dict[str, int] = {}
+# networks blocks where Multicall3 is known to work { <network>: <min block> }
+_AVAILABLE: dict[str, int] = {}
+# batchers collecting calls { (<network>, <block>): multicall_batcher }
+_PENDING: dict[tuple[str, int], multicall_batcher] = {}
+# running batch tasks ( keep a reference till done )
+_TASKS: set[asyncio.Task] = set()
+
+
+def _mark_available(network: str, block: int):
+    if block < _AVAILABLE.get(network, block + 1):
+        _AVAILABLE[network] = block
+
+
+def _mark_unavailable(network: str, block: int):
+    """Stop batching calls of a network up to a block ( Multicall3 not deployed yet ).
+    Failures at or after a block known to work are not deployment related: ignored
+    """
+    if block >= _AVAILABLE.get(network, block + 1):
+        return
+    if block > _UNAVAILABLE.get(network, -1):
+        logger.debug(
+            f" Multicall3 not available on {network} up to block {block}: calls are not batched"
+        )
+        _UNAVAILABLE[network] = block
+
+
+def multicall_available(network: str, block: int) -> bool:
+    return CONFIGURATION["WEB3_MULTICALL_ENABLED"] and block > _UNAVAILABLE.get(
+        network, -1
+    )
+
+
+async def _execute_batch(key: tuple[str, int]):
+    # let the calls fired in the same loop iteration ( asyncio.gather ) join the batch
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    await _PENDING.pop(key).execute()
+
+
+async def multicall(
+    network: str, block: int, target: str, calldata: bytes, eth_call: EthCall
+) -> tuple[bool, bytes]:
+    """Execute a contract call together with all concurrent calls of the same network and block
+
+    Args:
+        network (str):
+        block (int):
+        target (str): contract address
+        calldata (bytes): encoded function call
+        eth_call (EthCall): eth_call executor used for the aggregated call
+
+    Returns:
+        tuple[bool, bytes]: success and return data of the call
+
+    Raises:
+        multicall_unavailable: when the aggregated call can't be executed
+    """
+    key = (network, block)
+    if not (batcher := _PENDING.get(key)):
+        batcher = _PENDING[key] = multicall_batcher(
+            network=network,
+            block=block,
+            eth_call=eth_call,
+            contract=get_multicall_contract(network),
+            max_calls=CONFIGURATION["WEB3_MULTICALL_MAX_CALLS"],
+        )
+        task = asyncio.create_task(_execute_batch(key))
+        _TASKS.add(task)
+        task.add_done_callback(_TASKS.discard)
+
+    return await batcher.add(target=target, calldata=calldata)
+
+
+def decode_function_result(codec, fn_abi: dict, return_data: bytes):
+    """Decode a contract function return data the same way web3 contract calls do"""
+    output_types = get_abi_output_types(fn_abi)
+    normalized_data = map_abi_data(
+        BASE_RETURN_NORMALIZERS, output_types, codec.decode(output_types, return_data)
+    )
+    if len(normalized_data) == 1:
+        return normalized_data[0]
+    return normalized_data
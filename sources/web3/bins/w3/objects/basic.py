@@ -11,8 +11,15 @@ from web3.middleware import async_geth_poa_middleware, async_simple_cache_middle
 
 import asyncio
 
+from sources.common.database.block_index import get_block_index
 from sources.web3.bins.configuration import CONFIGURATION
-from sources.web3.bins.general import file_utilities
+from sources.web3.bins.w3.multicall import (
+    decode_function_result,
+    multicall,
+    multicall_available,
+)
+from sources.web3.bins.w3.registry import get_abi, get_contract, get_web3
+from sources.web3.bins.w3.rpc_pool import get_rpc_pool
 
 
 class web3wrap:
@@ -63,12 +70,19 @@ class web3wrap:
             self._abi_filename = abi_filename
         if abi_path != "":
             self._abi_path = abi_path
-        # load abi
-        self._abi = file_utilities.load_json(
-            filename=self._abi_filename, folder_path=self._abi_path
-        )
+        # load abi ( preloaded registry )
+        self._abi = get_abi(filename=self._abi_filename, folder_path=self._abi_path)
 
     def setup_w3(self, network: str, web3Url: str | None = None) -> Web3:
+        # shared connection per network and rpc url
+        return get_web3(
+            network=network,
+            web3Url=web3Url
+            or CONFIGURATION["WEB3_PROVIDER_URLS"].get("public", "private")[network],
+            builder=lambda: self._create_w3(network=network, web3Url=web3Url),
+        )
+
+    def _create_w3(self, network: str, web3Url: str | None = None) -> Web3:
         # setup web3
         result = AsyncWeb3(
             AsyncHTTPProvider(
@@ -92,8 +106,11 @@ class web3wrap:
 
     def setup_contract(self, contract_address: str, contract_abi: str):
         # set contract
-        self._contract = self._w3.eth.contract(
-            address=contract_address, abi=contract_abi
+        self._contract = get_contract(
+            w3=self._w3,
+            network=self._network,
+            address=contract_address,
+            abi=contract_abi,
         )
 
     # CUSTOM PROPERTIES
@@ -160,8 +177,9 @@ class web3wrap:
         inexact_mode="before",
         eq_timestamp_position="first",
     ) -> int:
-        """Will
-           At least 15 queries are needed to come close to a timestamp block number
+        """Block number of a timestamp
+           Uses the chain's block/timestamp index and only queries the chain to fill the gap
+           between the closest known blocks
 
         Args:
            timestamp (dt.datetime.timestamp): _description_
@@ -175,124 +193,19 @@ class web3wrap:
         if int(timestamp) == 0:
             raise ValueError("Timestamp cannot be zero!")
 
-        # check min timestamp
-        min_block = await self._getBlockData(1)
-        if min_block.timestamp > timestamp:
-            return 1
-
-        queries_cost = 0
-        found_exact = False
-
-        block_curr = await self._getBlockData("latest")
-        first_step = math.ceil(block_curr.number * 0.85)
-
-        # make sure we have positive block result
-        while (block_curr.number + first_step) <= 0:
-            first_step -= 1
-        # calc blocks to go up/down closer to goal
-        block_past = await self._getBlockData(block_curr.number - (first_step))
-        blocks_x_timestamp = (
-            abs(block_curr.timestamp - block_past.timestamp) / first_step
+        return await get_block_index(self._network).block_from_timestamp(
+            timestamp=int(timestamp),
+            get_block=self._getBlockData,
+            inexact_mode=inexact_mode,
+            eq_timestamp_position=eq_timestamp_position,
         )
 
-        block_step = (block_curr.timestamp - timestamp) / blocks_x_timestamp
-        block_step_sign = -1
-
-        _startime = dt.datetime.now(dt.timezone.utc)
-
-        while block_curr.timestamp != timestamp:
-            queries_cost += 1
-
-            # make sure we have positive block result
-            while (block_curr.number + (block_step * block_step_sign)) <= 0:
-                if queries_cost != 1:
-                    # change sign and lower steps
-                    block_step_sign *= -1
-                # first time here, set lower block steps
-                block_step /= 2
-            # go to block
-            try:
-                block_curr = await self._getBlockData(
-                    math.floor(block_curr.number + (block_step * block_step_sign))
-                )
-            except exceptions.BlockNotFound:
-                # diminish step
-                block_step /= 2
-                continue
-
-            blocks_x_timestamp = (
-                (
-                    abs(block_curr.timestamp - block_past.timestamp)
-                    / abs(block_curr.number - block_past.number)
-                )
-                if abs(block_curr.number - block_past.number) != 0
-                else 0
-            )
-            if blocks_x_timestamp != 0:
-                block_step = math.ceil(
-                    abs(block_curr.timestamp - timestamp) / blocks_x_timestamp
-                )
-
-            if block_curr.timestamp < timestamp:
-                # block should be higher than current
-                block_step_sign = 1
-            elif block_curr.timestamp > timestamp:
-                # block should be lower than current
-                block_step_sign = -1
-            else:
-                # got it
-                found_exact = True
-                # exit loop
-                break
-
-            # set block past
-            block_past = block_curr
-
-            # 15sec while loop safe exit (an eternity to find the block)
-            if (dt.datetime.now(dt.timezone.utc) - _startime).total_seconds() > 15:
-                if inexact_mode == "before":
-                    # select block smaller than objective
-                    while block_curr.timestamp > timestamp:
-                        block_curr = await self._getBlockData(block_curr.number - 1)
-                elif inexact_mode == "after":
-                    # select block greater than objective
-                    while block_curr.timestamp < timestamp:
-                        block_curr = await self._getBlockData(block_curr.number + 1)
-                else:
-                    raise ValueError(
-                        f" Inexact method chosen is not valid:->  {inexact_mode}"
-                    )
-                # exit loop
-                break
-
-        # define result
-        result = block_curr.number
-
-        # get blocks with same timestamp
-        sametimestampBlocks = await self.get_sameTimestampBlocks(
-            block_curr, queries_cost
-        )
-        if len(sametimestampBlocks) > 0:
-            if eq_timestamp_position == "first":
-                result = sametimestampBlocks[0]
-            elif eq_timestamp_position == "last":
-                result = sametimestampBlocks[-1]
-
-        # log result
-        if found_exact:
-            logging.getLogger(__name__).debug(
-                f" Took {queries_cost} on-chain queries to find block number {block_curr.number} of timestamp {timestamp}"
-            )
-
-        else:
-            logging.getLogger(__name__).warning(
-                f" Could not find the exact block number from timestamp -> took {queries_cost} on-chain queries to find block number {block_curr.number} ({block_curr.timestamp}) closest to timestamp {timestamp}  -> original-found difference {timestamp - block_curr.timestamp}"
-            )
-
-        # return closest block found
-        return result
-
     async def timestampFromBlockNumber(self, block: int) -> int:
+        if block >= 1 and (
+            timestamp := get_block_index(self._network).timestamp(block)
+        ):
+            return timestamp
+
         block_obj = None
         if block < 1:
             block_obj = await self._getBlockData("latest")
@@ -445,30 +358,33 @@ class web3wrap:
 
     # universal failover execute funcion
     async def call_function(self, function_name: str, rpcUrls: list[str], *args):
-        # loop choose url
-        for rpcUrl in rpcUrls:
-            try:
-                # create web3 conn
-                chain_connection = self.setup_w3(network=self._network, web3Url=rpcUrl)
-                # set root w3 conn
-                self._w3 = chain_connection
-                # create contract
-                contract = chain_connection.eth.contract(
-                    address=self._address, abi=self._abi
-                )
-                # execute function
-                return await getattr(contract.functions, function_name)(*args).call(
-                    block_identifier=await self.block
-                )
-
-            except Exception as e:
-                # not working rpc
-                logging.getLogger(__name__).debug(
-                    f" can't call function {function_name} using {rpcUrl} rpc: {e}"
-                )
+        async def _call(rpcUrl: str):
+            # create web3 conn
+            chain_connection = self.setup_w3(network=self._network, web3Url=rpcUrl)
+            # create contract
+            contract = get_contract(
+                w3=chain_connection,
+                network=self._network,
+                address=self._address,
+                abi=self._abi,
+            )
+            # execute function
+            result = await getattr(contract.functions, function_name)(*args).call(
+                block_identifier=await self.block
+            )
+            # set root w3 conn
+            self._w3 = chain_connection
+            return result
 
-        # no rpcUrl worked
-        return None
+        # choose the healthiest rpc urls first
+        try:
+            return await get_rpc_pool(self._network).execute(rpcUrls, _call)
+        except Exception as e:
+            # no rpcUrl worked
+            logging.getLogger(__name__).debug(
+                f" can't call function {function_name} using any rpc: {e}"
+            )
+            return None
 
     async def call_function_autoRpc(
         self,
@@ -486,6 +402,17 @@ class web3wrap:
             Any or None: depending on the function called
         """
 
+        # batch with all concurrent calls of the same block
+        if not rpcKey_names and multicall_available(
+            network=self._network, block=await self.block
+        ):
+            try:
+                return await self._call_function_multicall(function_name, *args)
+            except Exception as e:
+                logging.getLogger(__name__).debug(
+                    f" can't multicall function {function_name} on {self._network} {self.address} block {self._block}: {e}"
+                )
+
         result = await self.call_function(
             function_name,
             self.get_rpcUrls(rpcKey_names=rpcKey_names),
@@ -500,6 +427,38 @@ class web3wrap:
 
         return None
 
+    async def _call_function_multicall(self, function_name: str, *args):
+        """Call a function through the Multicall3 batching layer
+
+        Raises:
+            Exception: when the call can't be batched or fails ( use call_function then )
+        """
+        fn_abi = self._contract.get_function_by_name(function_name).abi
+        success, return_data = await multicall(
+            network=self._network,
+            block=await self.block,
+            target=self._address,
+            calldata=self._contract.encodeABI(fn_name=function_name, args=args),
+            eth_call=self._eth_call,
+        )
+        if not success:
+            raise ValueError(f" {function_name} call reverted")
+        return decode_function_result(self._w3.codec, fn_abi, return_data)
+
+    async def _eth_call(self, transaction: dict, block: int) -> bytes:
+        """eth_call using the configured rpc urls till one works"""
+
+        async def _call(rpcUrl: str) -> bytes:
+            _w3 = self.setup_w3(network=self._network, web3Url=rpcUrl)
+            return await _w3.eth.call(transaction, block_identifier=block)
+
+        try:
+            return await get_rpc_pool(self._network).execute(self.get_rpcUrls(), _call)
+        except Exception as e:
+            raise ValueError(
+                f" No rpc worked calling {transaction['to']} at block {block}: {e}"
+            ) from e
+
     def get_rpcUrls(
         self, rpcKey_names: list[str] | None = None, shuffle: bool = True
     ) -> list[str]:
@@ -541,18 +500,18 @@ class web3wrap:
             dict: transaction receipt
         """
 
-        # execute query till it works
-        for rpcUrl in self.get_rpcUrls():
-            try:
-                _w3 = self.setup_w3(network=self._network, web3Url=rpcUrl)
-                return await _w3.eth.get_transaction_receipt(txHash)
-            except Exception as e:
-                logging.getLogger(__name__).debug(
-                    f" error getting transaction receipt using {rpcUrl} rpc: {e}"
-                )
-                continue
+        async def _call(rpcUrl: str):
+            _w3 = self.setup_w3(network=self._network, web3Url=rpcUrl)
+            return await _w3.eth.get_transaction_receipt(txHash)
 
-        return None
+        # execute query till it works
+        try:
+            return await get_rpc_pool(self._network).execute(self.get_rpcUrls(), _call)
+        except Exception as e:
+            logging.getLogger(__name__).debug(
+                f" error getting transaction receipt using any rpc: {e}"
+            )
+            return None
 
     async def _getBlockData(self, block: int | str) -> types.BlockData:
         """Get block data
@@ -562,18 +521,18 @@ class web3wrap:
 
         """
 
-        # execute query till it works
-        for rpcUrl in self.get_rpcUrls():
-            try:
-                _w3 = self.setup_w3(network=self._network, web3Url=rpcUrl)
-                return await _w3.eth.get_block(block)
-            except Exception as e:
-                logging.getLogger(__name__).debug(
-                    f" error getting block data using {rpcUrl} rpc: {e}"
-                )
-                continue
+        async def _call(rpcUrl: str) -> types.BlockData:
+            _w3 = self.setup_w3(network=self._network, web3Url=rpcUrl)
+            return await _w3.eth.get_block(block)
 
-        return None
+        # execute query till it works
+        try:
+            return await get_rpc_pool(self._network).execute(self.get_rpcUrls(), _call)
+        except Exception as e:
+            logging.getLogger(__name__).debug(
+                f" error getting block data using any rpc: {e}"
+            )
+            return None
 
 
 class erc20(web3wrap):
@@ -0,0 +1,138 @@
+import logging
+import os
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Callable
+
+from web3 import AsyncWeb3
+from web3.contract import AsyncContract
+
+from sources.web3.bins.general import file_utilities
+
+logger = logging.getLogger(__name__)
+
+ABIS_PATH = "sources/common/abis"
+
+
+# ABI registry
+
+
+def _load_abis(root_path: str = ABIS_PATH) -> MappingProxyType:
+    """Load all ABI json files found in root_path ( and subfolders )
+
+    Returns:
+        MappingProxyType: { (<folder path>, <filename without extension>): <abi> }
+    """
+    result = {}
+    for folder_path, _, filenames in os.walk(root_path):
+        for filename in filenames:
+            if not filename.endswith(".json"):
+                continue
+            name = filename[: -len(".json")]
+            folder_path = folder_path.replace(os.sep, "/")
+            if (
+                abi := file_utilities.load_json(filename=name, folder_path=folder_path)
+            ) is not None:
+                result[(folder_path, name)] = tuple(abi)
+    return MappingProxyType(result)
+
+
+# preloaded ABIs ( immutable )
+_ABIS = _load_abis()
+# ABIs loaded from outside the ABIs path
+_EXTRA_ABIS: dict[tuple[str, str], tuple] = {}
+# registry key of each registry ABI { id(<abi>): (<folder path>, <filename>) }
+#   registry ABIs are never released, so their ids are never reused
+_ABI_KEYS: dict[int, tuple[str, str]] = {id(abi): key for key, abi in _ABIS.items()}
+
+
+def get_abi(filename: str, folder_path: str) -> tuple | None:
+    """ABI of a json file, without file I/O when preloaded
+
+    Args:
+        filename (str): filename without extension
+        folder_path (str): folder path
+
+    Returns:
+        tuple | None: abi items
+    """
+    key = (folder_path.rstrip("/"), filename)
+    if (abi := _ABIS.get(key)) is not None:
+        return abi
+
+    if key not in _EXTRA_ABIS:
+        abi = file_utilities.load_json(filename=filename, folder_path=folder_path)
+        if abi is None:
+            return None
+        _EXTRA_ABIS[key] = tuple(abi)
+        _ABI_KEYS[id(_EXTRA_ABIS[key])] = key
+    return _EXTRA_ABIS[key]
+
+
+def abi_key(abi: tuple | list) -> tuple[str, str] | None:
+    """Registry key ( folder path, filename ) of an ABI returned by get_abi
+
+    Returns:
+        tuple[str, str] | None: None when the ABI is not a registry one
+    """
+    if (key := _ABI_KEYS.get(id(abi))) is None:
+        return None
+    if (_ABIS.get(key) or _EXTRA_ABIS.get(key)) is not abi:
+        return None
+    return key
+
+
+# Web3 connections and contract factories
+
+# { (<network>, <web3Url>): AsyncWeb3 }
+_WEB3: dict[tuple, AsyncWeb3] = {}
+# { (<network>, <web3Url>, <abi key>, <address>): AsyncContract } ( LRU order )
+_CONTRACTS: OrderedDict[tuple, AsyncContract] = OrderedDict()
+# max contract objects kept
+_CONTRACTS_MAX = 5000
+
+
+def _url_key(web3Url) -> str | tuple | None:
+    return tuple(web3Url) if isinstance(web3Url, list) else web3Url
+
+
+def get_web3(
+    network: str, web3Url: str | list | None, builder: Callable[[], AsyncWeb3]
+) -> AsyncWeb3:
+    """Shared web3 connection of a network and rpc url
+
+    Args:
+        network (str):
+        web3Url (str | list | None): rpc url
+        builder (Callable[[], AsyncWeb3]): creates the connection when not cached
+    """
+    key = (network, _url_key(web3Url))
+    if (result := _WEB3.get(key)) is None:
+        result = _WEB3[key] = builder()
+    return result
+
+
+def get_contract(
+    w3: AsyncWeb3, network: str, address: str, abi: tuple | list
+) -> AsyncContract:
+    """Contract object of an address, shared while using a registry web3 connection
+
+    Args:
+        w3 (AsyncWeb3): web3 connection
+        network (str):
+        address (str): checksum address
+        abi (tuple | list): abi ( only registry ABIs are cached, by registry key )
+    """
+    web3Url = _url_key(w3.provider.endpoint_uri)
+    if _WEB3.get((network, web3Url)) is not w3 or (_abi_key := abi_key(abi)) is None:
+        # not a registry connection ( custom web3 ) or abi
+        return w3.eth.contract(address=address, abi=abi)
+
+    key = (network, web3Url, _abi_key, address)
+    if (result := _CONTRACTS.get(key)) is None:
+        result = _CONTRACTS[key] = w3.eth.contract(address=address, abi=abi)
+        if len(_CONTRACTS) > _CONTRACTS_MAX:
+            _CONTRACTS.popitem(last=False)
+    else:
+        _CONTRACTS.move_to_end(key)
+    return result
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from web3.exceptions import ContractLogicError
+
+from sources.web3.bins.configuration import CONFIGURATION
+
+logger = logging.getLogger(__name__)
+
+# exponential moving average weight of the latest latency
+_EWMA_WEIGHT = 0.2
+# consecutive errors to open the circuit of a provider
+_CIRCUIT_ERRORS = 3
+# seconds a provider circuit stays open ( doubled on each consecutive opening )
+_CIRCUIT_COOLDOWN = 30
+_CIRCUIT_COOLDOWN_MAX = 600
+
+
+class rpc_provider:
+    """Health metrics of one rpc url"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.latency = None  # ewma seconds
+        self.circuit_open_until = 0
+        self.circuit_openings = 0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.circuit_open_until
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0
+
+    @property
+    def score(self) -> float:
+        """Expected cost of a request, lower is better ( untested providers first ):
+        latency plus errors weighted as timeouts
+        """
+        if self.latency is None:
+            return 0
+        return self.latency + self.error_rate * CONFIGURATION["WEB3_RPC_TIMEOUT"]
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self.consecutive_errors = 0
+        self.circuit_openings = 0
+        self.latency = (
+            latency
+            if self.latency is None
+            else (_EWMA_WEIGHT * latency + (1 - _EWMA_WEIGHT) * self.latency)
+        )
+
+    def record_error(self, latency: float):
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_errors += 1
+        self.latency = (
+            latency
+            if self.latency is None
+            else (_EWMA_WEIGHT * latency + (1 - _EWMA_WEIGHT) * self.latency)
+        )
+        if self.consecutive_errors >= _CIRCUIT_ERRORS:
+            # open circuit
+            cooldown = min(
+                _CIRCUIT_COOLDOWN * 2**self.circuit_openings, _CIRCUIT_COOLDOWN_MAX
+            )
+            self.circuit_open_until = time.monotonic() + cooldown
+            self.circuit_openings += 1
+            self.consecutive_errors = 0
+            logger.debug(f" rpc {self.url} circuit open for {cooldown} seconds")
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.error_rate,
+            "latency": self.latency,
+            "available": self.available,
+            "circuit_open_seconds": max(
+                0, int(self.circuit_open_until - time.monotonic())
+            ),
+        }
+
+
+class rpc_provider_pool:
+    """Rpc urls of a network ordered by health score
+
+    Providers are tried from best to worst score, skipping the ones with an open circuit
+    ( unless all of them are ). Optionally, the request is hedged: when the best provider
+    is slower than usual, the second best is queried too and the first answer wins.
+    """
+
+    def __init__(self, network: str):
+        self.network = network
+        self._providers: dict[str, rpc_provider] = {}
+
+    def _provider(self, url: str) -> rpc_provider:
+        if (provider := self._providers.get(url)) is None:
+            provider = self._providers[url] = rpc_provider(url=url)
+        return provider
+
+    def ordered(self, rpcUrls: list[str]) -> list[rpc_provider]:
+        """Providers of the given urls, best first ( open circuits last )"""
+        providers = [self._provider(url) for url in rpcUrls]
+        # sorted is stable: providers with equal score keep the given ( shuffled ) order
+        return sorted(providers, key=lambda x: (not x.available, x.score))
+
+    async def execute(
+        self,
+        rpcUrls: list[str],
+        func: Callable[[str], Awaitable[Any]],
+        hedge: bool | None = None,
+    ) -> Any:
+        """Execute func(rpcUrl) with the best providers till one works
+
+        Args:
+            rpcUrls (list[str]): candidate rpc urls
+            func (Callable[[str], Awaitable[Any]]): request using an rpc url
+            hedge (bool | None, optional): hedge the first attempt. Defaults to WEB3_RPC_HEDGE config.
+
+        Raises:
+            ContractLogicError: when the call reverts ( no other provider is tried )
+            Exception: last error when no provider worked
+        """
+        if hedge is None:
+            hedge = CONFIGURATION["WEB3_RPC_HEDGE"]
+
+        providers = self.ordered(rpcUrls)
+        last_error = ValueError(f" No rpc urls available for {self.network}")
+
+        if hedge and len(providers) > 1:
+            try:
+                return await self._hedged(providers[0], providers[1], func)
+            except ContractLogicError:
+                # reverts are the same in all providers
+                raise
+            except Exception as e:
+                last_error = e
+                providers = providers[2:]
+
+        for provider in providers:
+            try:
+                return await self._attempt(provider, func)
+            except ContractLogicError:
+                raise
+            except Exception as e:
+                last_error = e
+
+        raise last_error
+
+    async def _attempt(
+        self, provider: rpc_provider, func: Callable[[str], Awaitable[Any]]
+    ) -> Any:
+        _startime = time.monotonic()
+        try:
+            result = await asyncio.wait_for(
+                func(provider.url), timeout=CONFIGURATION["WEB3_RPC_TIMEOUT"]
+            )
+        except ContractLogicError:
+            # the call reverted: the provider did its job
+            provider.record_success(time.monotonic() - _startime)
+            raise
+        except Exception as e:
+            provider.record_error(time.monotonic() - _startime)
+            logger.debug(f" {self.network} rpc {provider.url} failed: {e}")
+            raise
+        provider.record_success(time.monotonic() - _startime)
+        return result
+
+    async def _hedged(
+        self,
+        first: rpc_provider,
+        second: rpc_provider,
+        func: Callable[[str], Awaitable[Any]],
+    ) -> Any:
+        """Query first and, when it takes longer than usual, also second. First answer wins"""
+        first_task = asyncio.ensure_future(self._attempt(first, func))
+        tasks = {first_task}
+        try:
+            # give the best provider twice its usual latency before hedging
+            done, _ = await asyncio.wait(
+                tasks, timeout=max(0.05, 2 * (first.latency or 0.5))
+            )
+            if not done or first_task.exception() is not None:
+                tasks.add(asyncio.ensure_future(self._attempt(second, func)))
+
+            last_error = None
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {url: provider.stats() for url, provider in self._providers.items()}
+
+
+# process-wide pools { <network>: rpc_provider_pool }
+_POOLS: dict[str, rpc_provider_pool] = {}
+
+
+def get_rpc_pool(network: str) -> rpc_provider_pool:
+    if network not in _POOLS:
+        _POOLS[network] = rpc_provider_pool(network=network)
+    return _POOLS[network]
+
+
+def rpc_pools_stats() -> dict:
+    """Health metrics of all rpc providers used { <network>: { <url>: {...} } }"""
+    return {network: pool.stats() for network, pool in _POOLS.items()}
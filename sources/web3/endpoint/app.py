@@ -1,9 +1,7 @@
 from fastapi import FastAPI
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
 
 from fastapi.middleware.cors import CORSMiddleware
-from endpoint.config.cache import CHARTS_CACHE_TIMEOUT
+from endpoint.config.cache import CHARTS_CACHE_TIMEOUT, init_cache
 
 from sources.web3.endpoint.routers import build_routers
 
@@ -45,6 +43,6 @@ def create_app(
 
     @app.on_event("startup")
     async def startup():
-        FastAPICache.init(InMemoryBackend())
+        init_cache()
 
     return app
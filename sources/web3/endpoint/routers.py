@@ -2,7 +2,7 @@ import asyncio
 import re
 from fastapi import Response, APIRouter, status, Query
 from fastapi.routing import APIRoute
-from fastapi_cache.decorator import cache
+from endpoint.config.cache import cache
 from endpoint.routers.template import router_builder_baseTemplate
 
 import typing
@@ -0,0 +1,196 @@
+import asyncio
+import sys
+
+import pytest
+from fastapi_cache import FastAPICache
+from fastapi_cache.types import Backend
+from starlette.responses import Response
+
+from endpoint.config import cache as cache_module
+from endpoint.config.cache import cache, stable_key_builder, uncached_result
+
+
+class fake_redis:
+    """In-process stand-in of the redis commands used by the response cache"""
+
+    def __init__(self):
+        self.values: dict[str, bytes] = {}
+
+    async def set(self, key: str, value, nx: bool = False, px: int | None = None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def exists(self, key: str) -> int:
+        return int(key in self.values)
+
+    async def eval(self, script: str, numkeys: int, key: str, token: str) -> int:
+        # delete the lock only when holding it
+        if self.values.get(key) == token:
+            del self.values[key]
+            return 1
+        return 0
+
+
+class fake_redis_backend(Backend):
+    """Shared backend of several workers, with a controllable clock"""
+
+    def __init__(self):
+        self.redis = fake_redis()
+        self.now = 0
+        self.items: dict[str, tuple[bytes, int | None]] = {}
+
+    async def get_with_ttl(self, key: str):
+        if (item := self.items.get(key)) is None:
+            return 0, None
+        value, expire_at = item
+        if expire_at is None:
+            return -1, value
+        if expire_at <= self.now:
+            return 0, None
+        return expire_at - self.now, value
+
+    async def get(self, key: str):
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: int | None = None):
+        self.items[key] = (value, self.now + expire if expire else None)
+
+    async def clear(self, namespace: str | None = None, key: str | None = None):
+        self.items.clear()
+        return 0
+
+
+@pytest.fixture
+def backend(monkeypatch) -> fake_redis_backend:
+    backend = fake_redis_backend()
+    FastAPICache.init(backend, prefix="test", key_builder=stable_key_builder)
+    monkeypatch.setattr(cache_module, "_IN_FLIGHT", {})
+    monkeypatch.setattr(cache_module, "CACHE_LOCK_TIMEOUT", 2)
+    yield backend
+    FastAPICache.reset()
+
+
+def _cache_key() -> str:
+    return next(key for key in FastAPICache.get_backend().items)
+
+
+def test_concurrent_misses_compute_once(backend):
+    calls = []
+
+    @cache(expire=60)
+    async def route(response: Response) -> dict:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": len(calls)}
+
+    async def _requests():
+        responses = [Response() for _ in range(5)]
+        results = await asyncio.gather(*[route(response=x) for x in responses])
+        return results, responses
+
+    results, responses = asyncio.run(_requests())
+
+    assert calls == [1]
+    assert results == [{"value": 1}] * 5
+    assert {x.headers["X-FastAPI-Cache"] for x in responses} == {"MISS"}
+    # the computing worker released its lock
+    assert not [key for key in backend.redis.values if key.endswith(":lock")]
+
+
+def test_waits_for_the_worker_holding_the_lock(backend):
+    calls = []
+
+    @cache(expire=60)
+    async def route(response: Response) -> dict:
+        calls.append(1)
+        return {"worker": "this"}
+
+    async def _requests():
+        # learn the cache key, then let another worker hold its lock
+        await route(response=Response())
+        key = _cache_key()
+        backend.items.clear()
+        calls.clear()
+        await backend.redis.set(f"{key}:lock", "other worker", nx=True)
+
+        async def _other_worker():
+            await asyncio.sleep(0.1)
+            await backend.set(key, b'{"worker": "other"}', 60)
+            await backend.redis.eval("", 1, f"{key}:lock", "other worker")
+
+        result, _ = await asyncio.gather(route(response=Response()), _other_worker())
+        return result
+
+    assert asyncio.run(_requests()) == {"worker": "other"}
+    assert calls == []
+
+
+def test_expired_value_is_served_while_refreshing(backend):
+    calls = []
+
+    @cache(expire=10, stale=60)
+    async def route(response: Response) -> dict:
+        calls.append(1)
+        return {"value": len(calls)}
+
+    async def _requests():
+        first = await route(response=Response())
+        # expired, within the stale window
+        backend.now += 20
+        response = Response()
+        stale = await route(response=response)
+        # let the background refresh finish
+        await asyncio.sleep(0.01)
+        fresh_response = Response()
+        fresh = await route(response=fresh_response)
+        return first, stale, response, fresh, fresh_response
+
+    first, stale, response, fresh, fresh_response = asyncio.run(_requests())
+
+    assert first == {"value": 1}
+    assert stale == {"value": 1}
+    assert response.headers["X-FastAPI-Cache"] == "STALE"
+    assert response.headers["Cache-Control"] == "max-age=0"
+    assert fresh == {"value": 2}
+    assert fresh_response.headers["X-FastAPI-Cache"] == "HIT"
+    assert calls == [1, 1]
+
+
+def test_uncached_result_is_not_stored(backend):
+    calls = []
+
+    @cache(expire=60)
+    async def route(response: Response) -> list:
+        calls.append(1)
+        if len(calls) == 1:
+            raise uncached_result([1], headers={"X-Partial-Chains": "polygon"})
+        return [1, 2]
+
+    async def _requests():
+        responses = [Response() for _ in range(3)]
+        # concurrent requests share the partial result
+        partial = await asyncio.gather(*[route(response=x) for x in responses[:2]])
+        full = await route(response=responses[2])
+        return partial, full, responses
+
+    partial, full, responses = asyncio.run(_requests())
+
+    assert partial == [[1], [1]]
+    for response in responses[:2]:
+        assert response.headers["X-Partial-Chains"] == "polygon"
+        assert response.headers["Cache-Control"] == "no-store"
+    assert full == [1, 2]
+    assert "X-Partial-Chains" not in responses[2].headers
+    assert calls == [1, 1]
+
+
+def test_redis_backend_without_redis_package_fails(monkeypatch):
+    monkeypatch.setattr(cache_module, "CACHE_BACKEND", "redis")
+    monkeypatch.setattr(cache_module, "_BACKEND", None)
+    # redis package not importable
+    monkeypatch.setitem(sys.modules, "redis", None)
+
+    with pytest.raises(RuntimeError):
+        cache_module.get_cache_backend()
@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+
+from sources.web3.bins.configuration import CONFIGURATION
+from sources.web3.bins.w3 import multicall as multicall_module
+from sources.web3.bins.w3.multicall import (
+    EthCall,
+    multicall,
+    multicall3,
+    multicall3_local,
+    multicall_available,
+    multicall_unavailable,
+)
+
+NETWORK = "test_network"
+TARGET = "0x0000000000000000000000000000000000000001"
+
+
+class counting_multicall3_local(multicall3_local):
+    """multicall3_local recording the size of each aggregated call"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def aggregate3(self, calls, block, eth_call):
+        self.batches.append(len(calls))
+        return await super().aggregate3(calls=calls, block=block, eth_call=eth_call)
+
+
+@pytest.fixture(autouse=True)
+def multicall_state(monkeypatch):
+    monkeypatch.setitem(CONFIGURATION, "WEB3_MULTICALL_ENABLED", True)
+    monkeypatch.setitem(CONFIGURATION, "WEB3_MULTICALL_MAX_CALLS", 3)
+    monkeypatch.setattr(multicall_module, "_UNAVAILABLE", {})
+    monkeypatch.setattr(multicall_module, "_AVAILABLE", {})
+    monkeypatch.setattr(multicall_module, "_PENDING", {})
+
+
+async def _eth_call(transaction: dict, block: int) -> bytes:
+    if transaction["data"] == b"revert":
+        raise ValueError("execution reverted")
+    return transaction["data"] + block.to_bytes(1, "big")
+
+
+def test_concurrent_calls_are_batched(monkeypatch):
+    contract = counting_multicall3_local()
+    monkeypatch.setattr(multicall_module, "get_multicall_contract", lambda _: contract)
+
+    async def _calls():
+        return await asyncio.gather(
+            *[
+                multicall(
+                    network=NETWORK,
+                    block=block,
+                    target=TARGET,
+                    calldata=bytes([i]),
+                    eth_call=_eth_call,
+                )
+                for block in (1, 2)
+                for i in range(4)
+            ]
+        )
+
+    results = asyncio.run(_calls())
+
+    assert results == [
+        (True, bytes([i, block])) for block in (1, 2) for i in range(4)
+    ]
+    # one batch per block, split in chunks of WEB3_MULTICALL_MAX_CALLS
+    assert sorted(contract.batches) == [1, 1, 3, 3]
+
+
+def test_failed_call_does_not_fail_the_batch(monkeypatch):
+    contract = counting_multicall3_local()
+    monkeypatch.setattr(multicall_module, "get_multicall_contract", lambda _: contract)
+
+    async def _calls():
+        return await asyncio.gather(
+            *[
+                multicall(
+                    network=NETWORK,
+                    block=1,
+                    target=TARGET,
+                    calldata=calldata,
+                    eth_call=_eth_call,
+                )
+                for calldata in (b"a", b"revert", b"b")
+            ]
+        )
+
+    assert asyncio.run(_calls()) == [(True, b"a\x01"), (False, b""), (True, b"b\x01")]
+    assert contract.batches == [3]
+
+
+def _deployed_at(block: int) -> EthCall:
+    """eth_call of a chain where Multicall3 is deployed at <block>"""
+    contract = multicall3(address=multicall_module.MULTICALL3_DEFAULT_ADDRESS)
+    codec = contract._contract.w3.codec
+
+    async def _eth_call(transaction: dict, call_block: int) -> bytes:
+        # eth_call to an address without code returns no data
+        if call_block < block:
+            return b""
+        return codec.encode(["(bool,bytes)[]"], [[(True, b"a")]])
+
+    return _eth_call
+
+
+def _call(block: int, eth_call: EthCall) -> tuple[bool, bytes]:
+    return asyncio.run(
+        multicall(
+            network=NETWORK,
+            block=block,
+            target=TARGET,
+            calldata=b"a",
+            eth_call=eth_call,
+        )
+    )
+
+
+def test_blocks_before_multicall3_deployment_are_not_batched(monkeypatch):
+    monkeypatch.setattr(
+        multicall_module,
+        "get_multicall_contract",
+        lambda _: multicall3(address=multicall_module.MULTICALL3_DEFAULT_ADDRESS),
+    )
+    eth_call = _deployed_at(block=100)
+
+    assert multicall_available(NETWORK, block=50)
+    with pytest.raises(multicall_unavailable):
+        _call(block=50, eth_call=eth_call)
+    # only blocks up to the failed one
+    assert not multicall_available(NETWORK, block=40)
+    assert not multicall_available(NETWORK, block=50)
+    assert multicall_available(NETWORK, block=51)
+    assert multicall_available("other_network", block=50)
+
+    assert _call(block=200, eth_call=eth_call) == (True, b"a")
+    assert _call(block=100, eth_call=eth_call) == (True, b"a")
+    assert multicall_available(NETWORK, block=100)
+
+
+def test_failures_after_a_working_block_do_not_disable_batching(monkeypatch):
+    monkeypatch.setattr(
+        multicall_module,
+        "get_multicall_contract",
+        lambda _: multicall3(address=multicall_module.MULTICALL3_DEFAULT_ADDRESS),
+    )
+    assert _call(block=100, eth_call=_deployed_at(block=100)) == (
+        True,
+        b"a",
+    )
+
+    async def _no_data(transaction: dict, block: int) -> bytes:
+        # rpc returning no data ( not a deployment issue )
+        return b""
+
+    with pytest.raises(multicall_unavailable):
+        _call(block=300, eth_call=_no_data)
+    assert multicall_available(NETWORK, block=300)
+    # before the lowest block known to work
+    with pytest.raises(multicall_unavailable):
+        _call(block=80, eth_call=_no_data)
+    assert not multicall_available(NETWORK, block=80)
+    assert multicall_available(NETWORK, block=81)
+
+
+def test_local_contract_from_configuration(monkeypatch):
+    monkeypatch.setitem(multicall_module.MULTICALL3_ADDRESSES, NETWORK, "local")
+    multicall_module.get_multicall_contract.cache_clear()
+    try:
+        assert isinstance(
+            multicall_module.get_multicall_contract(NETWORK), multicall3_local
+        )
+    finally:
+        multicall_module.get_multicall_contract.cache_clear()